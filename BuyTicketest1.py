@@ -3,116 +3,83 @@
 # 不得将其用于商业目的或在12306.cn上自动购买真实车票
 # -----------------------------------------------------------------------------------
 
-import time
-import requests
-import pandas as pd
+import argparse
 from datetime import datetime
 import json
 import urllib.parse  # 用于URL编码
 import webbrowser  # 用于打开浏览器（登录用）
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import getpass  # 用于隐藏密码输入
 
-# --- 配置 ---
-# 使用更完整的请求头字典是模仿真实浏览器的常见做法。
-# Accept-Language 设置为中文，因为我们是在模拟访问中文网站
-BASE_HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",  # 优先中文，兼容英文
-    "Accept-Encoding": "gzip, deflate, br",
-    "Connection": "keep-alive",
-    "Upgrade-Insecure-Requests": "1",
-    "Sec-Fetch-Dest": "document",
-    "Sec-Fetch-Mode": "navigate",
-    "Sec-Fetch-Site": "none",
-    "Cache-Control": "max-age=0"
-}
-
-# 全局变量存储车站代码
-station_codes = {}
+from config import BASE_URL, RESULTS_EXPORT_FILE, CHROME_HEADLESS, CHROME_PROFILE_DIR, CHROME_BLOCK_RESOURCES, PROFILE_DIR
+from http_client import BASE_HEADERS, shared_session
+from exporters import export_records, train_records, can_append, appendable_extensions
+from station_cache import load_station_table
+from province_store import get_provinces_data, save_provinces_data  # 两个脚本共用的省份数据（本地数据集 + 增量更新）
+from station_index import StationIndex
+from selector_registry import SelectorRegistry
+from page_waits import arm, wait_for, wait_for_url, selector_condition
+from results_table import extract_results
+from session_bridge import SessionBridge
+from browser import is_headless, launch_chrome, load_page, set_resource_blocking
+from startup import Startup
+from ticket_parser import available_trains, print_available_trains
+from train_filter import TrainFilter
+from train_details import enrich, print_train_details
+from tracing import span, traced
+
+
+# 全局变量存储车站索引
+station_index = None
+# 页面元素定位器（记住上次命中的选择器）
+selectors = SelectorRegistry()
+
+# 页面等待条件（JavaScript 表达式，在页面中每次 DOM 变化时计算）
+PAGE_READY_CONDITION = ("document.title.indexOf('12306') >= 0 || document.getElementById('from_station_text') "
+                        "|| document.getElementById('from_station')")
+RESULTS_CONDITION = selector_condition("#queryLeftTable tbody tr")
+LOGIN_CONDITION = ("Array.prototype.some.call(document.querySelectorAll('a'), "
+                   "function (a) { return a.textContent.trim() === '我的12306'; })")
 
 
 # --- 核心函数 ---
 
-def get_provinces_data():
-    """从12306获取并保存省份数据。"""
-    url = "https://kyfw.12306.cn/otn/userCommon/allProvince"
-    try:
-        session = requests.Session()
-        response = session.get(url=url, headers=BASE_HEADERS, timeout=10)
-        response.raise_for_status()
-        content_json = response.json()
-
-        print("Waiting 3 seconds to prevent detection...")
-        time.sleep(3)
-
-        content_list = pd.json_normalize(content_json['data'], errors='ignore')
-
-        if not content_list.empty:
-            curr_time = datetime.now()
-            timestamp = datetime.strftime(curr_time, '%Y-%m-%d_%H-%M-%S')
-            filename = f"national_train_agency_provinces-{timestamp}.xlsx"
-            content_list.to_excel(filename, index=False)
-            print(f"Province data saved to {filename}!")
-
-            rows, cols = content_list.shape
-            print(f"Retrieved data shape: {rows} rows, {cols} columns.")
-            return content_list, session
-        else:
-            print("No province data found in the response.")
-            return None, session
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching province  {e}")
-        return None, None
-    except KeyError as e:
-        print(f"Error parsing JSON response: Missing key {e}")
-        return None, None
-    except Exception as e:  # 捕获其他潜在错误
-        print(f"An unknown error occurred: {e}")
-        return None, None
-
-
-def get_station_codes(session):
-    """获取热门车站代码字典。实际应用中可能需要更完整的列表或实时查询。"""
-    global station_codes  # 使用全局变量
-    # 注意：12306的热门车站列表API可能会变化，需要根据实际情况调整
-    url = "https://kyfw.12306.cn/otn/resources/js/framework/station_name.js"
-    try:
-        response = session.get(url, headers=BASE_HEADERS)
-        response.raise_for_status()
-        # 响应内容类似：var station_names ='@bjb|北京北|VAP|beijingbei|bjb|0@bjd|北京东|BOP|beijingdong|bjd|1@bji|北京|BJP|beijing|bj|2@...';
-        raw_data = response.text
-        # 提取车站信息
-        if raw_data.startswith("var station_names ='"):
-            # 移除前缀和后缀
-            stations_str = raw_data[20:-3]
-            # 分割每个车站
-            stations_list = stations_str.split('@')
-            station_codes = {}
-            for station in stations_list:
-                if station:
-                    parts = station.split('|')
-                    if len(parts) >= 5:  # 确保有足够的部分
-                        # 简体中文站名: parts[1], 代码: parts[2]
-                        station_codes[parts[1]] = parts[2]
-            print(f"Loaded codes for {len(station_codes)} stations.")
-            return station_codes
-        else:
-            print("Failed to parse station code data.")
-            return {}
-    except Exception as e:
-        print(f"Error fetching station codes: {e}")
-        return {}
-
-
-def get_user_input(station_codes_dict):
-    """获取用户输入的行程详情。"""
+@traced("stations.get_index")
+def get_station_index(session):
+    """获取车站索引（站名、电报码、拼音）。车站表缓存在本地，过期后才会重新验证（见 station_cache）。"""
+    global station_index  # 使用全局变量
+    # 注意：12306的车站列表API可能会变化，需要根据实际情况调整
+    # 响应内容类似：var station_names ='@bjb|北京北|VAP|beijingbei|bjb|0@bjd|北京东|BOP|beijingdong|bjd|1@bji|北京|BJP|beijing|bj|2@...';
+    stations = load_station_table(session, BASE_HEADERS)
+    if not stations:
+        print("Failed to load station code data.")
+        return None
+    with span("stations.index", stations=len(stations)):
+        station_index = StationIndex(stations)
+    print(f"Loaded codes for {len(station_index)} stations.")
+    return station_index
+
+
+def prompt_station(station_index, prompt):
+    """循环提示输入车站，直到能唯一确定一个车站，返回 (站名, 电报码)。"""
+    while True:
+        text = input(prompt).strip()
+        station = station_index.resolve(text)
+        if station:
+            return station.name, station.code
+        # 尝试模糊匹配（按相关度排序）
+        matches = station_index.search(text)
+        if matches:
+            print(f"No exact match found. Similar stations: {[m.name for m in matches]} (showing first {len(matches)})")
+            # 可以让用户选择，这里简化处理
+        print("Station not found. Please check the name.")
+
+
+@traced("input.user")
+def get_user_input(station_index):
+    """
+    获取用户输入的行程详情。
+    station_index 也可以是一个返回车站索引的函数（并行启动时），在输入完日期、真正需要时才调用。
+    """
     print("\n--- Ticket Booking Details ---")
     while True:
         date_str = input("Enter travel date (YYYY-MM-DD): ")
@@ -123,236 +90,219 @@ def get_user_input(station_codes_dict):
         except ValueError:
             print("Invalid date format. Please use YYYY-MM-DD.")
 
-    # 获取出发站和到达站代码
-    from_station_name = ""
-    to_station_name = ""
-    from_station_code = ""
-    to_station_code = ""
-
-    while not from_station_code:
-        from_station_name = input("Enter departure station (e.g., Beijing): ").strip()
-        from_station_code = station_codes_dict.get(from_station_name, "")
-        if not from_station_code:
-            # 尝试模糊匹配
-            matches = [name for name in station_codes_dict.keys() if from_station_name in name]
-            if matches:
-                print(f"No exact match found. Similar stations: {matches[:5]} (showing first 5)")
-                # 可以让用户选择，这里简化处理
-            print("Station not found. Please check the name.")
-
-    while not to_station_code:
-        to_station_name = input("Enter arrival station (e.g., Shanghai): ").strip()
-        to_station_code = station_codes_dict.get(to_station_name, "")
-        if not to_station_code:
-            matches = [name for name in station_codes_dict.keys() if to_station_name in name]
-            if matches:
-                print(f"No exact match found. Similar stations: {matches[:5]} (showing first 5)")
-            print("Station not found. Please check the name.")
+    if callable(station_index):
+        station_index = station_index()
+        if not station_index:
+            return None
+
+    # 获取出发站和到达站代码（支持中文站名、电报码、全拼或简拼）
+    from_station_name, from_station_code = prompt_station(station_index, "Enter departure station (e.g., 北京 / beijing / BJP): ")
+    to_station_name, to_station_code = prompt_station(station_index, "Enter arrival station (e.g., 上海 / shanghai / SHH): ")
 
     print(
         f"Query Info: Date={date_str}, From={from_station_name}({from_station_code}), To={to_station_name}({to_station_code})")
     return date_str, from_station_code, to_station_code, from_station_name, to_station_name
 
 
-def get_station_code_by_name(station_dict, station_name):
-    """根据站名从字典中查找代码。"""
-    for name, code in station_dict.items():
-        if name == station_name:
-            return code
-    return None  # 如果找不到，返回 None
-
-
-def search_tickets_selenium(driver, date, from_station_name, to_station_name, station_codes_dict):
-    """使用Selenium在浏览器中完成车票查询和预订流程。"""
-    print(f"\nUsing Selenium to search for tickets on {date} from {from_station_name} to {to_station_name}...")
-
+def get_station_code_by_name(station_index, station_name):
+    """根据站名从车站索引中查找代码。"""
+    return station_index.get(station_name)  # 如果找不到，返回 None
+
+
+def query_in_browser(driver, date, from_station_name, to_station_name, station_index):
+    """
+    在查询页面上填写出发站、到达站和日期并点击查询，等待结果表格出现。
+    页面元素找不到时抛出 TimeoutException 或 NoSuchElementException。
+    """
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+    query_url = f"{BASE_URL}/otn/leftTicket/init"
+    print(f"Navigating to {query_url}...")
+    # 查询页面不需要图片、字体和统计脚本
+    if CHROME_BLOCK_RESOURCES:
+        set_resource_blocking(driver, True)
+    load_seconds = load_page(driver, query_url, "page.leftTicket_init")
+    print(f"Query page loaded in {load_seconds:.2f} s.")
+
+    # 2. 等待页面加载，使用更通用的等待条件
+    print("Waiting for page to load completely...")
+    # 等待页面标题包含特定内容，或关键元素之一出现（页面内的 MutationObserver 触发，见 page_waits）
+    with span("wait.page_ready", kind="wait", timeout=30) as s:
+        s.set(page_ms=wait_for(driver, PAGE_READY_CONDITION, 30, message="Query page did not load."))
+    print("Page loaded.")
+
+    # 3. 定位输入框 - 每个字段的所有候选定位器在一次脚本调用中同时探测（见 selector_registry），
+    # 上次命中的定位器排在最前面
+    print("Locating input fields...")
+
+    # 出发站输入框 (文本显示框)；找不到时退回到隐藏的代码输入框
+    from_input_text = None
+    from_input_code = None
     try:
-        # 1. 导航到查询页面
-        query_url = "https://kyfw.12306.cn/otn/leftTicket/init"
-        print(f"Navigating to {query_url}...")
-        driver.get(query_url)
-
-        # 2. 等待页面加载，使用更通用的等待条件
-        print("Waiting for page to load completely...")
-        # 等待页面标题包含特定内容，或等待某个页面结构元素出现
-        WebDriverWait(driver, 30).until(
-            lambda d: "12306" in d.title or d.find_element(By.ID, "from_station_text") or d.find_element(By.ID,
-                                                                                                         "from_station")
-            # 等待标题或关键元素之一出现
-        )
-        print("Page loaded.")
-
-        # 3. 尝试定位输入框 - 使用更灵活的定位方法
-        print("Locating input fields...")
-
-        # 尝试查找出发站输入框 (文本显示框)
-        from_input_text = None
-        from_input_code = None
+        with span("wait.from_station_text", kind="wait", timeout=10):
+            from_input_text = selectors.find(driver, "from_station_text", timeout=10)
+    except TimeoutException:
+        print("Warning: Could not locate 'from_station_text' element. The page structure might have changed.")
+        from_input_code = selectors.probe(driver, "from_station")
+        if from_input_code is None:
+            print("Could not locate 'from_station' code input either.")
+            raise TimeoutException("Could not find departure station input fields.")
+
+    # 到达站输入框 (文本显示框)
+    to_input_text = selectors.probe(driver, "to_station_text")
+    to_input_code = None
+    if to_input_text is None:
+        print("Warning: Could not locate 'to_station_text' element. The page structure might have changed.")
+        to_input_code = selectors.probe(driver, "to_station")
+        if to_input_code is None:
+            print("Could not locate 'to_station' code input either.")
+            raise TimeoutException("Could not find destination station input fields.")
+
+    # 日期输入框
+    date_input = selectors.probe(driver, "train_date")
+    if date_input is None:
+        print("Could not locate 'train_date' element.")
+        raise TimeoutException("Could not find date input field.")
+
+    # 4. 填充表单 - 根据找到的元素进行操作
+    print(f"Entering departure: {from_station_name}")
+    if from_input_text:
+        from_input_text.clear()
+        from_input_text.send_keys(from_station_name)
+        # 等待并点击车站列表中的匹配项（候选 XPATH 见 selector_registry.SELECTORS）
         try:
-            # 尝试最常见的ID
-            from_input_text = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "from_station_text"))
-            )
+            with span("wait.from_station_suggestion", kind="wait", timeout=10):
+                station_suggestion = selectors.find(driver, "from_station_suggestion", timeout=10,
+                                                    name=from_station_name)
+            station_suggestion.click()
+            print(f"Selected departure station: {from_station_name}")
         except TimeoutException:
-            print("Could not find 'from_station_text' by ID. Trying alternative selectors...")
-            # 尝试其他可能的选择器 (需要根据实际页面结构调整)
-            try:
-                from_input_text = driver.find_element(By.CSS_SELECTOR,
-                                                      "input[placeholder='请输入出发地']")  # 根据placeholder
-            except NoSuchElementException:
-                try:
-                    from_input_text = driver.find_element(By.CSS_SELECTOR, "input#from_station_text")  # 确认ID
-                except NoSuchElementException:
-                    # 如果都找不到，可能需要等待更长时间或页面有其他加载逻辑
+            print(
+                f"Warning: Could not click on the station suggestion for '{from_station_name}'. It might auto-select or require manual selection.")
+            # 如果找不到，尝试填充隐藏的代码框 (如果存在)
+            if from_input_code:
+                from_code = get_station_code_by_name(station_index, from_station_name)
+                if from_code:
+                    driver.execute_script(f"arguments[0].value = '{from_code}';", from_input_code)
+                    print(f"Filled departure station code: {from_code}")
+                else:
                     print(
-                        "Warning: Could not locate 'from_station_text' element. The page structure might have changed.")
-                    # 尝试查找隐藏的代码输入框
-                    try:
-                        from_input_code = driver.find_element(By.ID, "from_station")
-                    except NoSuchElementException:
-                        print("Could not locate 'from_station' code input either.")
-                        raise TimeoutException("Could not find departure station input fields.")
-
-        # 尝试查找到达站输入框 (文本显示框)
-        to_input_text = None
-        to_input_code = None
-        try:
-            to_input_text = driver.find_element(By.ID, "to_station_text")
-        except NoSuchElementException:
-            print("Could not find 'to_station_text' by ID. Trying alternative selectors...")
-            try:
-                to_input_text = driver.find_element(By.CSS_SELECTOR,
-                                                    "input[placeholder='请输入目的地']")  # 根据placeholder
-            except NoSuchElementException:
-                try:
-                    to_input_text = driver.find_element(By.CSS_SELECTOR, "input#to_station_text")  # 确认ID
-                except NoSuchElementException:
-                    print("Warning: Could not locate 'to_station_text' element. The page structure might have changed.")
-                    try:
-                        to_input_code = driver.find_element(By.ID, "to_station")
-                    except NoSuchElementException:
-                        print("Could not locate 'to_station' code input either.")
-                        raise TimeoutException("Could not find destination station input fields.")
-
-        # 尝试查找日期输入框
-        date_input = None
-        try:
-            date_input = driver.find_element(By.ID, "train_date")
-        except NoSuchElementException:
-            print("Could not find 'train_date' by ID. Trying alternative selectors...")
-            try:
-                date_input = driver.find_element(By.CSS_SELECTOR, "input#train_date")  # 确认ID
-            except NoSuchElementException:
-                print("Could not locate 'train_date' element.")
-                raise TimeoutException("Could not find date input field.")
-
-        # 4. 填充表单 - 根据找到的元素进行操作
-        print(f"Entering departure: {from_station_name}")
-        if from_input_text:
-            from_input_text.clear()
-            from_input_text.send_keys(from_station_name)
-            # 等待并点击车站列表中的匹配项
-            # **重要**: 你需要使用浏览器开发者工具 (F12) 找到准确的XPATH或CSS选择器
-            # 示例XPATH: //div[@id='panel_cfx_fromStation']//li[contains(., '北京')]//a
-            # 示例CSS: #panel_cfx_fromStation li:contains('北京') a (注意: :contains 在CSS中不标准，Selenium支持)
-            # 请将 '北京' 替换为 {from_station_name}
-            station_suggestion_xpath = f"//div[@id='panel_cfx_fromStation']//li[contains(., '{from_station_name}')]//a"
-            # 例如，如果车站列表在 #citem_fromStation 中
-            # station_suggestion_xpath = f"//div[@id='citem_fromStation']//li[contains(., '{from_station_name}')]//a"
-            try:
-                station_suggestion = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, station_suggestion_xpath))
-                )
-                station_suggestion.click()
-                print(f"Selected departure station: {from_station_name}")
-            except TimeoutException:
-                print(
-                    f"Warning: Could not click on the station suggestion for '{from_station_name}'. It might auto-select or require manual selection.")
-                # 如果找不到，尝试填充隐藏的代码框 (如果存在)
-                if from_input_code:
-                    from_code = get_station_code_by_name(station_codes_dict, from_station_name)
-                    if from_code:
-                        driver.execute_script(f"arguments[0].value = '{from_code}';", from_input_code)
-                        print(f"Filled departure station code: {from_code}")
-                    else:
-                        print(
-                            f"Warning: Could not find code for station '{from_station_name}'. Cannot fill code input.")
-        elif from_input_code:  # 如果只找到了代码输入框
-            from_code = get_station_code_by_name(station_codes_dict, from_station_name)
-            if from_code:
-                driver.execute_script(f"arguments[0].value = '{from_code}';", from_input_code)
-                print(f"Filled departure station code: {from_code}")
-            else:
-                print(f"Warning: Could not find code for station '{from_station_name}'. Cannot fill code input.")
-                raise TimeoutException("Could not fill departure station.")
-
-        print(f"Entering destination: {to_station_name}")
-        if to_input_text:
-            to_input_text.clear()
-            to_input_text.send_keys(to_station_name)
-            # **重要**: 你需要使用浏览器开发者工具 (F12) 找到准确的XPATH或CSS选择器
-            # 示例XPATH: //div[@id='panel_cfx_toStation']//li[contains(., '上海')]//a
-            station_suggestion_to_xpath = f"//div[@id='panel_cfx_toStation']//li[contains(., '{to_station_name}')]//a"
-            try:
-                station_suggestion_to = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, station_suggestion_to_xpath))
-                )
-                station_suggestion_to.click()
-                print(f"Selected destination station: {to_station_name}")
-            except TimeoutException:
-                print(
-                    f"Warning: Could not click on the station suggestion for '{to_station_name}'. It might auto-select or require manual selection.")
-                if to_input_code:
-                    to_code = get_station_code_by_name(station_codes_dict, to_station_name)
-                    if to_code:
-                        driver.execute_script(f"arguments[0].value = '{to_code}';", to_input_code)
-                        print(f"Filled destination station code: {to_code}")
-                    else:
-                        print(f"Warning: Could not find code for station '{to_station_name}'. Cannot fill code input.")
-        elif to_input_code:
-            to_code = get_station_code_by_name(station_codes_dict, to_station_name)
-            if to_code:
-                driver.execute_script(f"arguments[0].value = '{to_code}';", to_input_code)
-                print(f"Filled destination station code: {to_code}")
-            else:
-                print(f"Warning: Could not find code for station '{to_station_name}'. Cannot fill code input.")
-                raise TimeoutException("Could not fill destination station.")
-
-        print(f"Entering date: {date}")
-        if date_input:
-            # 尝试移除只读属性并直接输入
-            driver.execute_script("arguments[0].removeAttribute('readonly');", date_input)
-            date_input.clear()
-            date_input.send_keys(date)
-            # 有时需要点击日期输入框来触发日历选择器，然后选择日期
-            # date_input.click()
-            # 然后可能需要在日历中选择日期，这比较复杂，直接输入通常更可靠
-            print(f"Filled date: {date}")
+                        f"Warning: Could not find code for station '{from_station_name}'. Cannot fill code input.")
+    elif from_input_code:  # 如果只找到了代码输入框
+        from_code = get_station_code_by_name(station_index, from_station_name)
+        if from_code:
+            driver.execute_script(f"arguments[0].value = '{from_code}';", from_input_code)
+            print(f"Filled departure station code: {from_code}")
         else:
-            raise TimeoutException("Could not find date input field.")
+            print(f"Warning: Could not find code for station '{from_station_name}'. Cannot fill code input.")
+            raise TimeoutException("Could not fill departure station.")
 
-        # 5. 点击查询按钮
-        print("Clicking query button...")
-        query_button = driver.find_element(By.ID, "query_ticket")
+    print(f"Entering destination: {to_station_name}")
+    if to_input_text:
+        to_input_text.clear()
+        to_input_text.send_keys(to_station_name)
+        try:
+            with span("wait.to_station_suggestion", kind="wait", timeout=10):
+                station_suggestion_to = selectors.find(driver, "to_station_suggestion", timeout=10,
+                                                       name=to_station_name)
+            station_suggestion_to.click()
+            print(f"Selected destination station: {to_station_name}")
+        except TimeoutException:
+            print(
+                f"Warning: Could not click on the station suggestion for '{to_station_name}'. It might auto-select or require manual selection.")
+            if to_input_code:
+                to_code = get_station_code_by_name(station_index, to_station_name)
+                if to_code:
+                    driver.execute_script(f"arguments[0].value = '{to_code}';", to_input_code)
+                    print(f"Filled destination station code: {to_code}")
+                else:
+                    print(f"Warning: Could not find code for station '{to_station_name}'. Cannot fill code input.")
+    elif to_input_code:
+        to_code = get_station_code_by_name(station_index, to_station_name)
+        if to_code:
+            driver.execute_script(f"arguments[0].value = '{to_code}';", to_input_code)
+            print(f"Filled destination station code: {to_code}")
+        else:
+            print(f"Warning: Could not find code for station '{to_station_name}'. Cannot fill code input.")
+            raise TimeoutException("Could not fill destination station.")
+
+    print(f"Entering date: {date}")
+    if date_input:
+        # 尝试移除只读属性并直接输入
+        driver.execute_script("arguments[0].removeAttribute('readonly');", date_input)
+        date_input.clear()
+        date_input.send_keys(date)
+        # 有时需要点击日期输入框来触发日历选择器，然后选择日期
+        # date_input.click()
+        # 然后可能需要在日历中选择日期，这比较复杂，直接输入通常更可靠
+        print(f"Filled date: {date}")
+    else:
+        raise TimeoutException("Could not find date input field.")
+
+    # 5. 点击查询按钮
+    # 点击之前先安装结果表格的观察器，表格一有新行就能立即返回（上一次查询留下的行不算）
+    arm(driver, "results", RESULTS_CONDITION)
+    print("Clicking query button...")
+    with span("click.query_ticket"):
+        query_button = selectors.probe(driver, "query_ticket")
+        if query_button is None:
+            raise NoSuchElementException("Could not find the query button.")
         query_button.click()
 
-        # 6. 等待查询结果加载 - 使用更通用的等待条件
-        print("Waiting for search results...")
-        # 等待不再显示加载动画，或者车次列表出现
-        # 12306页面可能有加载提示，例如包含 '查询中' 或 'search-loading' 类的元素
-        # WebDriverWait(driver, 20).until_not(
-        #     EC.presence_of_element_located((By.CLASS_NAME, "search-loading")) # 假设加载时有此类
-        # )
-        # 或者等待结果表格出现 - 等待查询按钮不再可点击（表示正在查询）然后查询完成
-        WebDriverWait(driver, 20).until_not(
-            EC.element_to_be_clickable((By.ID, "query_ticket"))  # 等待查询按钮变为不可点击或禁用
-        )
-        # 再等待结果表格行出现
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "#queryLeftTable tbody tr"))  # 等待结果表格行出现
-        )
+    # 6. 等待查询结果加载：结果表格出现新行时页面内的回调立即返回
+    print("Waiting for search results...")
+    with span("wait.results_table", kind="wait", timeout=20) as s:
+        s.set(page_ms=wait_for(driver, RESULTS_CONDITION, 20, key="results",
+                               message="Search results did not appear."))
+
+
+@traced("selenium.search")
+def search_tickets_selenium(driver, date, from_station_name, to_station_name, station_index, bridge=None,
+                            details=False):
+    """
+    使用Selenium在浏览器中完成车票查询和预订流程。
+    bridge 为登录后的 SessionBridge：打开页面前把 HTTP 会话中变化的 Cookie 写回浏览器；
+    details 为 True 时通过 HTTP 会话查询有票车次的经停站（页面上没有经停序号，不查询票价）。
+    无头浏览器只用于查询：预订前换成可见窗口（见 show_browser）。
+    返回 (是否完成, driver)，driver 为最后使用的浏览器，由调用者关闭。
+    """
+    # Selenium 只在浏览器流程中使用，延迟导入以加快启动
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+    print(f"\nUsing Selenium to search for tickets on {date} from {from_station_name} to {to_station_name}...")
+
+    try:
+        # 1. 导航到查询页面（先同步 HTTP 会话收到的 Cookie，两边的登录状态保持一致）
+        if bridge:
+            bridge.push()
+        # 2-6. 填写表单、查询并等待结果
+        query_in_browser(driver, date, from_station_name, to_station_name, station_index)
 
         print("\n--- Search Results Loaded ---")
+        # 一次读出整个结果表格，转换为与 HTTP 查询相同的结果集，共用筛选和导出
+        trains = extract_results(driver, station_index)
+        if RESULTS_EXPORT_FILE and len(trains):
+            with span("results.export", rows=len(trains)):
+                export_records(train_records(trains, train_date=date, queried_at=datetime.now().isoformat(timespec='seconds')),
+                               RESULTS_EXPORT_FILE, append=True, name="trains")
+        rows = TrainFilter().apply(trains)
+        available = available_trains(trains, rows)
+        if available:
+            print_available_trains(available)
+            if details and bridge:
+                # 只读查询走 HTTP 会话（带登录 Cookie），不打开页面
+                bridge.pull()
+                print_train_details(available, enrich(bridge.session, trains, rows, date, fares=False))
+        else:
+            print(f"{len(trains)} trains listed, none with tickets available.")
+        if is_headless(driver):
+            # 预订需要用户在窗口中操作，换成可见的浏览器并重新显示查询结果
+            driver, launch_seconds = show_browser(driver, bridge)
+            print(f"Opened a browser window for booking in {launch_seconds:.2f} s.")
+            query_in_browser(driver, date, from_station_name, to_station_name, station_index)
+        # 后续的预订页面可能需要图片（验证码等），恢复正常加载
+        if CHROME_BLOCK_RESOURCES:
+            set_resource_blocking(driver, False)
         print("The search results are now displayed in the browser.")
         print("Please select the desired train and click the '预订' (Book) button.")
         print("The script will wait for you to complete the booking process up to the payment page.")
@@ -360,9 +310,9 @@ def search_tickets_selenium(driver, date, from_station_name, to_station_name, st
         # 7. 等待用户在浏览器中完成后续操作（选择车次、乘客、座位、提交订单）
         # 例如，等待跳转到确认页面
         try:
-            WebDriverWait(driver, 300).until(
-                EC.url_contains("confirmPassenger")  # 等待跳转到确认乘客页面
-            )
+            # 等待跳转到确认乘客页面（导航钩子，地址一变化就返回）
+            with span("wait.confirm_passenger", kind="wait", timeout=300) as s:
+                s.set(page_ms=wait_for_url(driver, "confirmPassenger", 300))
             print("\n--- Booking Process Reached Confirmation Page ---")
             print("You have reached the order confirmation page in the browser.")
             print("Please select passengers, seat type, and complete the order submission manually.")
@@ -370,7 +320,7 @@ def search_tickets_selenium(driver, date, from_station_name, to_station_name, st
             print(
                 "\nPress Enter in this terminal after you have completed the booking and payment steps in the browser...")
             input()  # 等待用户完成浏览器中的操作
-            return True
+            return True, driver
         except TimeoutException:
             print("\n--- Timeout ---")
             print("Did not reach the confirmation page within the expected time. Please check the browser.")
@@ -378,7 +328,7 @@ def search_tickets_selenium(driver, date, from_station_name, to_station_name, st
                 "Press Enter in this terminal after you have completed the booking and payment steps in the browser...")
             input()
             # 即使超时，也假设用户完成了操作
-            return True
+            return True, driver
 
     except (TimeoutException, NoSuchElementException) as e:
         print(f"Error during Selenium booking process: {e}")
@@ -387,42 +337,85 @@ def search_tickets_selenium(driver, date, from_station_name, to_station_name, st
         print("The script has paused. Please check the browser window for the current state.")
         print("Press Enter in this terminal to continue and close the browser...")
         input()
-        return False
+        return False, driver
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         print("The booking process may need manual intervention.")
         print("The script has paused. Please check the browser window for the current state.")
         print("Press Enter in this terminal to continue and close the browser...")
         input()
-        return False
-
+        return False, driver
+
+
+def show_browser(driver, bridge=None):
+    """
+    把无头浏览器换成可见的浏览器，返回 (driver, 启动耗时秒数)。
+    用户数据目录同一时间只能被一个 Chrome 使用，所以先关闭无头浏览器；
+    关闭前把它的 Cookie 交给 HTTP 会话，启动后再全部写入新的浏览器（会话 Cookie 不会保存在用户数据目录中）。
+    """
+    if bridge is None:
+        bridge = SessionBridge(driver, shared_session())
+    bridge.pull()
+    driver.quit()
+    driver, launch_seconds = launch_chrome(headless=False)
+    bridge.switch(driver)
+    bridge.push()
+    return driver, launch_seconds
+
+
+def open_login_page():
+    """
+    启动 Chrome；用户数据目录中的会话仍有效时直接复用，否则打开登录页。
+    不打印也不等待用户，可以在后台线程中与其他启动步骤并行执行。
+    返回 (driver, 是否已登录, 启动耗时秒数, 页面加载耗时秒数)。
+    """
+    driver, launch_seconds = launch_chrome()
+    try:
+        # 复用之前手动登录的会话
+        if CHROME_PROFILE_DIR and saved_session_valid(driver):
+            return driver, True, launch_seconds, 0.0
+        if CHROME_HEADLESS:
+            # 无头模式下无法手动登录，重新打开可见窗口
+            driver.quit()
+            driver, relaunch_seconds = launch_chrome(headless=False)
+            launch_seconds += relaunch_seconds
+        login_url = f"{BASE_URL}/otn/resources/login.html"
+        load_seconds = load_page(driver, login_url, "page.login")
+    except Exception:
+        driver.quit()
+        raise
+    return driver, False, launch_seconds, load_seconds
 
-def login_to_12306_selenium():
-    """处理登录过程：使用Selenium打开浏览器让用户手动登录。"""
-    print("\n--- Manual Login Required ---")
-    print("A browser window will open for you to log in to 12306.cn.")
-    print("Please complete the login process in the browser.")
 
+@traced("selenium.login")
+def login_to_12306_selenium(open_browser=open_login_page):
+    """
+    处理登录过程：使用Selenium打开浏览器让用户手动登录（用户数据目录中的会话仍有效时直接复用）。
+    open_browser 返回 open_login_page 的结果；并行启动时传入等待后台步骤的函数。
+    """
     # 使用Selenium打开浏览器
     try:
-        # --- 重要：请在此处配置你的ChromeDriver路径 ---
-        # service = Service('/path/to/chromedriver') # Linux/Mac
-        # service = Service('C:\\path\\to\\chromedriver.exe') # Windows
-        # driver = webdriver.Chrome(service=service)
-        # 或者，如果ChromeDriver在系统PATH中
-        driver = webdriver.Chrome()
+        # Selenium 只在浏览器流程中使用，延迟导入以加快启动
+        from selenium.common.exceptions import TimeoutException
 
-        login_url = "https://kyfw.12306.cn/otn/resources/login.html"
-        driver.get(login_url)
+        driver, logged_in, launch_seconds, load_seconds = open_browser()
+        print(f"Chrome started in {launch_seconds:.2f} s.")
+        if logged_in:
+            print("Reusing the logged-in session from the browser profile. Proceeding with booking...")
+            return True, driver
+
+        print("\n--- Manual Login Required ---")
+        print("A browser window has opened for you to log in to 12306.cn.")
+        print("Please complete the login process in the browser.")
+        print(f"Login page loaded in {load_seconds:.2f} s.")
 
         print("Browser opened. Please log in and wait for the main page to load.")
 
         # 等待用户完成登录（可以检测登录后的元素）
         try:
             # 等待"我的12306"元素出现，表示登录成功
-            WebDriverWait(driver, 300).until(
-                EC.presence_of_element_located((By.LINK_TEXT, "我的12306"))
-            )
+            with span("wait.login", kind="wait", timeout=300) as s:
+                s.set(page_ms=wait_for(driver, LOGIN_CONDITION, 300, message="Login was not detected."))
             print("Login detected in browser. Proceeding with booking...")
             return True, driver
         except TimeoutException:
@@ -439,35 +432,96 @@ def login_to_12306_selenium():
         return True, None  # 假设用户已登录，但不返回driver，后续步骤可能失败
 
 
+def saved_session_valid(driver, timeout=3):
+    """
+    检查浏览器配置中保存的会话是否仍然有效。
+    先把浏览器的 Cookie 交给共享会话，通过 login/checkUser 检查（见 session_bridge）；
+    读不到浏览器的 Cookie 或接口无法判断时，打开个人中心页面检查。
+    """
+    from selenium.common.exceptions import TimeoutException
+
+    bridge = SessionBridge(driver, shared_session())
+    copied = bridge.pull()
+    if copied == 0:
+        # 浏览器中没有 12306 的 Cookie，一定未登录
+        return False
+    if copied is not None:
+        logged_in = bridge.check_user()
+        if logged_in is not None:
+            return logged_in
+    load_page(driver, f"{BASE_URL}/otn/view/index.html", "page.index")
+    try:
+        with span("wait.saved_session", kind="wait", timeout=timeout):
+            wait_for(driver, LOGIN_CONDITION, timeout)
+        return True
+    except TimeoutException:
+        return False
+
+
 # --- 主执行流程 ---
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="12306 ticket booking in the browser (educational purposes only).")
+    parser.add_argument("--details", action="store_true",
+                        help="also show stop lists for the listed trains, looked up over HTTP with the login cookies")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, metavar="DIR",
+                        help=f"profile CPU (cProfile) and memory (tracemalloc) per phase and write the reports to DIR "
+                             f"(default: {PROFILE_DIR})")
+    args = parser.parse_args()
+    if RESULTS_EXPORT_FILE and not can_append(RESULTS_EXPORT_FILE):
+        # 每次查询的结果都追加到这个文件，只能重写的格式会丢掉之前的结果
+        parser.error(f"TICKET_RESULTS_EXPORT={RESULTS_EXPORT_FILE}: results are appended after every query, "
+                     f"use one of: {', '.join(appendable_extensions())}")
+    if args.profile:
+        # 只在 --profile 时导入
+        import profiling
+        profiling.enable(args.profile)
+
     print("12306 Ticket Booking Automation Script (Educational Purposes Only)")
     print("=" * 70)
 
-    # 1. 初始化会话 (用于获取车站代码)
-    main_session = requests.Session()
+    # 1. 初始化会话 (用于获取车站代码；共享会话，带连接池、超时、重试和限速)
+    main_session = shared_session()
 
-    # 2. 获取车站代码
-    print("Loading station codes...")
-    station_codes = get_station_codes(main_session)
-    if not station_codes:
+    # 2. 并行启动：加载车站代码的同时启动 Chrome 并打开登录页（见 startup）
+    print("Loading station codes and starting the browser...")
+    startup = Startup()
+    startup.start("stations", get_station_index, main_session)
+    startup.start("browser", open_login_page)
+
+    # 3. 用户输入（输入日期时车站表可能仍在加载，需要时才等待）
+    user_input = get_user_input(lambda: startup.get("stations"))
+    if not user_input:
         print("Failed to load station codes. Exiting script.")
+        try:
+            driver = startup.get("browser")[0]
+            driver.quit()
+        except Exception:
+            pass
         exit()
+    travel_date, from_code, to_code, from_name, to_name = user_input
+    station_index = startup.get("stations")
 
-    # 3. 用户输入
-    travel_date, from_code, to_code, from_name, to_name = get_user_input(station_codes)
-
-    # 4. 登录 (预订所必需) - 使用Selenium
-    is_logged_in, driver = login_to_12306_selenium()
-    if not is_logged_in:
+    # 4. 登录 (预订所必需) - 使用Selenium，浏览器已在后台启动
+    logged_in, driver = login_to_12306_selenium(lambda: startup.get("browser"))
+    startup.shutdown(wait=False)
+    if not logged_in:
         print("Login failed or was cancelled. Exiting.")
         if driver:
             driver.quit()
         exit()
 
-    # 5. 使用Selenium进行查询和预订
+    # 5. 把浏览器的登录 Cookie 交给 HTTP 会话，之后的只读查询不需要打开页面（见 session_bridge）
+    bridge = None
+    if driver:
+        bridge = SessionBridge(driver, main_session)
+        copied = bridge.pull()
+        if copied is not None:
+            print(f"Copied {copied} login cookies to the HTTP session.")
+
+    # 6. 使用Selenium进行查询和预订
     if driver:
-        booking_success = search_tickets_selenium(driver, travel_date, from_name, to_name, station_codes)
+        booking_success, driver = search_tickets_selenium(driver, travel_date, from_name, to_name, station_index,
+                                                          bridge, details=args.details)
 
         if booking_success:
             print("\n--- Booking Process Completed ---")
@@ -477,7 +531,7 @@ if __name__ == '__main__':
             print("\n--- Booking Process Failed ---")
             print("Could not complete the booking process in the browser.")
 
-        # 6. 关闭浏览器
+        # 7. 关闭浏览器
         print("Closing browser...")
         driver.quit()
     else:
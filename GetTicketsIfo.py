@@ -3,102 +3,61 @@
 # 不得将其用于商业目的或在12306.cn上自动购买真实车票
 # -----------------------------------------------------------------------------------
 
-import time
 import requests
-import pandas as pd
 from datetime import datetime
 import json
 import urllib.parse # 用于URL编码
+import webbrowser # 用于打开浏览器（登录用）
+import argparse
+
+from config import BASE_URL, RESULTS_EXPORT_FILE, PROFILE_DIR
+from http_client import BASE_HEADERS, shared_session
+from exporters import export_records, train_records, can_append, appendable_extensions, can_export, export_extensions
+from station_cache import load_station_table
+from station_index import StationIndex
+from province_store import get_provinces_data, save_provinces_data  # 两个脚本共用的省份数据（本地数据集 + 增量更新）
+from tracing import span, traced
+from ticket_parser import parse_query_response, available_trains, print_available_trains, QueryLayoutError
+from train_filter import TrainFilter
+from ticket_query import query_left_tickets
+from batch_query import read_itinerary_rows, resolve_itineraries, run_batch, parse_seat_classes
+from availability_sweep import AvailabilitySweep, date_range
+from transfer_planner import transfer_graph, print_journeys
+from train_details import enrich, print_train_details
 
-# --- 配置 ---
-# 使用更完整的请求头字典是模仿真实浏览器的常见做法。
-# Accept-Language 设置为中文，因为我们是在模拟访问中文网站
-BASE_HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8", # 优先中文，兼容英文
-    "Accept-Encoding": "gzip, deflate, br",
-    "Connection": "keep-alive",
-    "Upgrade-Insecure-Requests": "1",
-    "Sec-Fetch-Dest": "document",
-    "Sec-Fetch-Mode": "navigate",
-    "Sec-Fetch-Site": "none",
-    "Cache-Control": "max-age=0"
-}
 
 # --- 核心函数 ---
 
-def get_provinces_data():
-    """从12306获取并保存省份数据。"""
-    # 修正：移除URL末尾的空格
-    url = "https://kyfw.12306.cn/otn/userCommon/allProvince"
-    try:
-        session = requests.Session()
-        response = session.get(url=url, headers=BASE_HEADERS, timeout=10)
-        response.raise_for_status()
-        content_json = response.json()
-
-        print("Waiting 3 seconds to prevent detection...")
-        time.sleep(3)
-
-        content_list = pd.json_normalize(content_json['data'], errors='ignore')
-
-        if not content_list.empty:
-            curr_time = datetime.now()
-            timestamp = datetime.strftime(curr_time, '%Y-%m-%d_%H-%M-%S')
-            filename = f"national_train_agency_provinces-{timestamp}.xlsx"
-            content_list.to_excel(filename, index=False)
-            print(f"Province data saved to {filename}!")
-
-            rows, cols = content_list.shape
-            print(f"Retrieved data shape: {rows} rows, {cols} columns.")
-            return content_list, session
-        else:
-            print("No province data found in the response.")
-            return None, session
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching province data: {e}")
-        return None, None
-    except KeyError as e:
-        print(f"Error parsing JSON response: Missing key {e}")
-        return None, None
-    except Exception as e: # 捕获其他潜在错误
-        print(f"An unknown error occurred: {e}")
-        return None, None
-
-def get_station_codes(session):
-    """获取热门车站代码字典。实际应用中可能需要更完整的列表或实时查询。"""
-    # 注意：12306的热门车站列表API可能会变化，需要根据实际情况调整
-    # 修正：移除URL末尾的空格
-    url = "https://kyfw.12306.cn/otn/resources/js/framework/station_name.js"
-    try:
-        response = session.get(url, headers=BASE_HEADERS)
-        response.raise_for_status()
-        # 响应内容类似：var station_names ='@bjb|北京北|VAP|beijingbei|bjb|0@bjd|北京东|BOP|beijingdong|bjd|1@bji|北京|BJP|beijing|bj|2@...';
-        raw_data = response.text
-        # 提取车站信息
-        if raw_data.startswith("var station_names ='"):
-            # 移除前缀和后缀
-            stations_str = raw_data[20:-3]
-            # 分割每个车站
-            stations_list = stations_str.split('@')
-            station_dict = {}
-            for station in stations_list:
-                if station:
-                    parts = station.split('|')
-                    if len(parts) >= 5: # 确保有足够的部分
-                         # 简体中文站名: parts[1], 代码: parts[2]
-                        station_dict[parts[1]] = parts[2]
-            print(f"Loaded codes for {len(station_dict)} stations.")
-            return station_dict
-        else:
-            print("Failed to parse station code data.")
-            return {}
-    except Exception as e:
-        print(f"Error fetching station codes: {e}")
-        return {}
+@traced("stations.get_index")
+def get_station_index(session):
+    """获取车站索引（站名、电报码、拼音）。车站表缓存在本地，过期后才会重新验证（见 station_cache）。"""
+    # 注意：12306的车站列表API可能会变化，需要根据实际情况调整
+    # 响应内容类似：var station_names ='@bjb|北京北|VAP|beijingbei|bjb|0@bjd|北京东|BOP|beijingdong|bjd|1@bji|北京|BJP|beijing|bj|2@...';
+    stations = load_station_table(session, BASE_HEADERS)
+    if not stations:
+        print("Failed to load station code data.")
+        return None
+    with span("stations.index", stations=len(stations)):
+        index = StationIndex(stations)
+    print(f"Loaded codes for {len(index)} stations.")
+    return index
 
-def get_user_input(station_codes):
+def prompt_station(station_index, prompt):
+    """循环提示输入车站，直到能唯一确定一个车站，返回 (站名, 电报码)。"""
+    while True:
+        text = input(prompt).strip()
+        station = station_index.resolve(text)
+        if station:
+            return station.name, station.code
+        # 尝试模糊匹配（按相关度排序）
+        matches = station_index.search(text)
+        if matches:
+            print(f"No exact match found. Similar stations: {[m.name for m in matches]} (showing first {len(matches)})")
+            # 可以让用户选择，这里简化处理
+        print("Station not found. Please check the name.")
+
+@traced("input.user")
+def get_user_input(station_index):
     """获取用户输入的行程详情。"""
     print("\n--- Ticket Booking Details ---")
     while True:
@@ -110,117 +69,59 @@ def get_user_input(station_codes):
         except ValueError:
             print("Invalid date format. Please use YYYY-MM-DD.")
 
-    # 获取出发站和到达站代码
-    from_station_name = ""
-    to_station_name = ""
-    from_station_code = ""
-    to_station_code = ""
-
-    while not from_station_code:
-        from_station_name = input("Enter departure station (e.g., Beijing): ").strip()
-        from_station_code = station_codes.get(from_station_name, "")
-        if not from_station_code:
-             # 尝试模糊匹配
-            matches = [name for name in station_codes.keys() if from_station_name in name]
-            if matches:
-                print(f"No exact match found. Similar stations: {matches[:5]} (showing first 5)")
-                # 可以让用户选择，这里简化处理
-            print("Station not found. Please check the name.")
-
-    while not to_station_code:
-        to_station_name = input("Enter arrival station (e.g., Shanghai): ").strip()
-        to_station_code = station_codes.get(to_station_name, "")
-        if not to_station_code:
-            matches = [name for name in station_codes.keys() if to_station_name in name]
-            if matches:
-                print(f"No exact match found. Similar stations: {matches[:5]} (showing first 5)")
-            print("Station not found. Please check the name.")
+    # 获取出发站和到达站代码（支持中文站名、电报码、全拼或简拼）
+    from_station_name, from_station_code = prompt_station(station_index, "Enter departure station (e.g., 北京 / beijing / BJP): ")
+    to_station_name, to_station_code = prompt_station(station_index, "Enter arrival station (e.g., 上海 / shanghai / SHH): ")
 
     print(f"Query Info: Date={date_str}, From={from_station_name}({from_station_code}), To={to_station_name}({to_station_code})")
     return date_str, from_station_code, to_station_code, from_station_name, to_station_name
 
-def search_tickets(session, date, from_code, to_code):
-    """搜索可用的车票。"""
-    # 实际的查询API URL (可能需要根据12306更新进行调整)
-    # 查询Z开头的车次
-    # 修正：移除URL末尾的空格
-    search_url = f"https://kyfw.12306.cn/otn/leftTicket/queryZ"
-    # 查询其他车次
-    # search_url_other = f"https://kyfw.12306.cn/otn/leftTicket/query"
-
-    # 查询参数
-    params = {
-        'leftTicketDTO.train_date': date,
-        'leftTicketDTO.from_station': from_code,
-        'leftTicketDTO.to_station': to_code,
-        'purpose_codes': 'ADULT' # 成人票
-    }
-
+def search_tickets(session, date, from_code, to_code, details=False):
+    """
+    搜索可用的车票。同一日期和车站的重复查询会使用缓存（见 query_cache）。
+    details 为 True 时同时列出各车次的票价和经停站（见 train_details，同样有缓存）。
+    """
     print(f"\nSearching for tickets on {date} from {from_code} to {to_code}...")
     # --- 反爬虫措施 ---
-    print("Applying anti-crawler delay...")
-    time.sleep(2) # 添加延迟
+    # 查询接口的请求间隔由 http_client 的限速器保证（至少 2 秒），不再固定 sleep
 
     try:
-        # 发送GET请求
-        response = session.get(search_url, params=params, headers=BASE_HEADERS)
-        response.raise_for_status()
-        result = response.json()
+        # 发送GET请求（缓存命中时不发送）
+        result = query_left_tickets(session, date, from_code, to_code)
 
         # 检查响应状态
         if result.get('status') == True and result.get('httpstatus') == 200:
-            data = result.get('data', {}).get('result', [])
+            # 按 data.result + data.map 整批解析为列式结果集（见 ticket_parser）
+            with span("parse.query") as s:
+                trains = parse_query_response(result)
+                s.set(rows=len(trains))
+            if RESULTS_EXPORT_FILE and len(trains):
+                with span("results.export", rows=len(trains)):
+                    export_records(train_records(trains, train_date=date, queried_at=datetime.now().isoformat(timespec='seconds')),
+                                   RESULTS_EXPORT_FILE, append=True, name="trains")
             # 修正：补全 if 语句
-            if not data:
+            if not len(trains):
                 print("No train information found for the query.")
                 return None
 
             print("\n--- Search Results ---")
-            available_trains = []
-            # 12306返回的字段信息通常在 'data.map' 中定义
-            # 例如: secretStr, buttonTextInfo, queryLeftNewDTO.*
-            for i, item in enumerate(data):
-                 # item 是一个包含多个字段的字符串，用 '|' 分隔
-                 # 需要根据实际情况解析。这是一个简化示例。
-                 # 实际上，'item' 是一个很长的 '|' 分隔的字符串，需要根据 map 来解析。
-                 # 这里假设我们只关心前几个关键字段（实际远不止这些）
-                fields = item.split('|')
-                if len(fields) > 30: # 确保字段足够
-                    secret_str = fields[0] # 预订所需密钥
-                    train_no = fields[3] # 车次
-                    from_station_code_in_result = fields[6]
-                    to_station_code_in_result = fields[7]
-                    start_time = fields[8] # 发车时间
-                    arrive_time = fields[9] # 到达时间
-                    duration = fields[10] # 历时
-                    # 座位信息通常从索引 26 开始，不同座位类型对应不同索引
-                    # 例如：二等座(26), 一等座(25), 商务座(32) 等
-                    # 这里只检查二等座是否有票
-                    second_class_seat = fields[26]
-
-                    # 简单判断是否有票 (数字表示票数，'无'表示无票，'有'表示有票但数量>=30)
-                    if second_class_seat != '无' and second_class_seat != '':
-                        available_trains.append({
-                            'index': i+1,
-                            'secretStr': secret_str,
-                            'train_no': train_no,
-                            'start_time': start_time,
-                            'arrive_time': arrive_time,
-                            'duration': duration,
-                            'second_class': second_class_seat
-                        })
-                        print(f"{i+1}. Train: {train_no}, Departs: {start_time}, Arrives: {arrive_time}, Duration: {duration}, 2nd Class: {second_class_seat}")
-
-            if not available_trains:
+            rows = TrainFilter().apply(trains)
+            available = available_trains(trains, rows)
+            print_available_trains(available)
+            if details and available:
+                print_train_details(available, enrich(session, trains, rows, date))
+
+            if not available:
                 print("No available trains with tickets found.")
+                print_transfer_options(date, from_code, to_code)
                 return None
 
             # 用户选择车次
             while True:
                 try:
                     choice = int(input("Please select a train number to book: "))
-                    if 1 <= choice <= len(available_trains):
-                        selected_train = available_trains[choice - 1]
+                    if 1 <= choice <= len(available):
+                        selected_train = available[choice - 1]
                         print(f"Selected train: {selected_train['train_no']}")
                         return selected_train # 返回选中的车次信息
                     else:
@@ -233,12 +134,15 @@ def search_tickets(session, date, from_code, to_code):
             print(f"Search failed: {', '.join(messages) if isinstance(messages, list) else messages}")
             return None
 
+    except json.JSONDecodeError as e:
+        # 12306 拒绝请求时常返回 HTML 页面而不是 JSON
+        print(f"Error decoding JSON response from ticket search: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         print(f"Network error during ticket search: {e}")
         return None
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON response from ticket search: {e}")
-        print(f"Response content snippet: {response.text[:200]}...")
+    except QueryLayoutError as e:
+        print(f"Unexpected ticket result layout (12306 may have changed its format): {e}")
         return None
     except Exception as e:
         print(f"An unknown error occurred during ticket search: {e}")
@@ -253,7 +157,7 @@ def login_to_12306(session):
 
     # 更新为正确的12306登录页面URL
     # login_url = "https://kyfw.12306.cn/otn/login/init" # 旧的或可能的URL
-    login_url = "https://kyfw.12306.cn/otn/resources/login.html" # 使用你提供的URL
+    login_url = f"{BASE_URL}/otn/resources/login.html" # 使用你提供的URL
 
     try:
         # 尝试打开浏览器
@@ -264,17 +168,20 @@ def login_to_12306(session):
         print(f"Please manually open your browser and go to: {login_url}")
 
     # 等待用户登录
-    input("\nPress 'Enter' in this terminal AFTER you have successfully logged in and closed the login tab...")
+    with span("input.login"):
+        input("\nPress 'Enter' in this terminal AFTER you have successfully logged in and closed the login tab...")
 
     print("Checking login status...")
     # 检查登录状态 (通过访问一个需要登录的页面或API)
     # 例如，访问 'checkUser' API
-    check_url = "https://kyfw.12306.cn/otn/login/checkUser" # 检查用户状态的API
+    check_url = f"{BASE_URL}/otn/login/checkUser" # 检查用户状态的API
     check_data = {'_json_att': ''} # 通常需要这个参数
 
     try:
         # 使用 POST 请求检查用户状态
-        check_response = session.post(check_url, headers=BASE_HEADERS, data=check_data, timeout=10)
+        with span("http.checkUser") as s:
+            check_response = session.post(check_url, headers=BASE_HEADERS, data=check_data, timeout=10)
+            s.http(check_response)
         check_response.raise_for_status()
         check_result = check_response.json()
 
@@ -286,8 +193,10 @@ def login_to_12306(session):
         else:
             # 如果 checkUser API 不可用或返回格式变了，尝试另一种方式
             # 访问个人中心首页，未登录会重定向或返回特定内容
-            my12306_url = "https://kyfw.12306.cn/otn/view/index.html"
-            my12306_response = session.get(my12306_url, headers=BASE_HEADERS, timeout=10)
+            my12306_url = f"{BASE_URL}/otn/view/index.html"
+            with span("http.view_index") as s:
+                my12306_response = session.get(my12306_url, headers=BASE_HEADERS, timeout=10)
+                s.http(my12306_response)
             my12306_response.raise_for_status()
             # 检查返回内容是否包含登录用户的特征（例如“我的12306”）或不包含未登录的特征（例如“您好，请登录”）
             if "我的12306" in my12306_response.text and "您好，请登录" not in my12306_response.text:
@@ -349,7 +258,7 @@ def book_ticket(session, selected_train_info):
     # --- 示例：提交订单请求 (submitOrderRequest) ---
     print("Submitting order request...")
     # 修正：移除URL末尾的空格
-    submit_url = "https://kyfw.12306.cn/otn/leftTicket/submitOrderRequest"
+    submit_url = f"{BASE_URL}/otn/leftTicket/submitOrderRequest"
     submit_data = {
         'secretStr': urllib.parse.unquote(selected_train_info['secretStr']), # 注意需要URL解码
         'train_date': '', # 需要从查询结果或其他地方获取
@@ -367,9 +276,11 @@ def book_ticket(session, selected_train_info):
     submit_data['query_from_station_name'] = 'Beijing'
     submit_data['query_to_station_name'] = 'Shanghai'
 
-    time.sleep(1) # 反爬虫延迟
+    # 反爬虫延迟由 http_client 的限速器保证（submitOrderRequest 至少间隔 1 秒）
     try:
-        submit_response = session.post(submit_url, data=submit_data, headers=BASE_HEADERS)
+        with span("http.submitOrderRequest") as s:
+            submit_response = session.post(submit_url, data=submit_data, headers=BASE_HEADERS)
+            s.http(submit_response)
         submit_response.raise_for_status()
         submit_result = submit_response.json()
         print(f"Submit order response: {submit_result}")
@@ -395,26 +306,145 @@ def book_ticket(session, selected_train_info):
     # return True # 占位符
 
 
+def run_batch_mode(session, station_index, itinerary_file, output_file, all_trains=False):
+    """批量查询模式：解析行程文件中的所有行程，依次查询并把结果写入 output_file，不进行预订。"""
+    try:
+        itineraries, errors = resolve_itineraries(read_itinerary_rows(itinerary_file), station_index,
+                                                  default_min_seats=0 if all_trains else 1)
+    except (OSError, ValueError) as e:
+        print(f"Error reading itinerary file {itinerary_file}: {e}")
+        return False
+    for error in errors:
+        print(error)
+    if not itineraries:
+        print("No valid itineraries to query.")
+        return False
+    print(f"\nQuerying {len(itineraries)} itineraries ({len(errors)} skipped)...")
+    count = run_batch(session, itineraries, output_file)
+    print(f"Wrote {count} train records to {output_file}.")
+    return True
+
+def run_sweep_mode(session, station_index, from_text, to_text, start_date, end_date, seats=None, output_file=None):
+    """日期范围扫描模式：逐日查询一个车站对，打印 日期 × 座位类别 的有票车次数，可选导出完整矩阵。"""
+    stations = [station_index.resolve(text) for text in (from_text, to_text)]
+    if not all(stations):
+        print(f"Station not found: {', '.join(t for t, st in zip((from_text, to_text), stations) if not st)}")
+        return False
+    try:
+        dates = date_range(start_date, end_date)
+        seat_classes = parse_seat_classes(seats)
+    except ValueError as e:
+        print(f"Invalid sweep arguments: {e}")
+        return False
+    print(f"\nSweeping {len(dates)} dates from {stations[0].name} to {stations[1].name}...")
+    sweep = AvailabilitySweep(session, stations[0].code, stations[1].code, seat_classes=seat_classes)
+    queried = sweep.run(dates)
+    print(f"{len(queried)} dates queried, {len(dates) - len(queried)} served from cache.")
+    for train_date, reason in sorted(sweep.failed.items()):
+        print(f"{train_date}: search failed: {reason}")
+    sweep.matrix.print_summary()
+    if output_file:
+        count = export_records(sweep.matrix.to_records(), output_file, name="availability")
+        print(f"Wrote {count} availability records to {output_file}.")
+    return not sweep.failed
+
+
+def print_transfer_options(date, from_code, to_code, seat_classes=None):
+    """在已缓存的查询结果中规划换乘行程并打印，返回找到的行程（不发送请求）。"""
+    transfer_graph.update()
+    journeys = transfer_graph.plan(from_code, to_code, date, seat_classes=seat_classes)
+    journeys = [journey for journey in journeys if len(journey.legs) > 1]
+    if journeys:
+        print("\n--- Connecting Itineraries (from cached results) ---")
+        print_journeys(journeys, transfer_graph, date)
+    return journeys
+
+def run_transfer_mode(station_index, from_text, to_text, train_date, seats=None):
+    """换乘规划模式：只使用查询缓存中的结果（例如之前的批量查询或日期扫描），不发送请求。"""
+    stations = [station_index.resolve(text) for text in (from_text, to_text)]
+    if not all(stations):
+        print(f"Station not found: {', '.join(t for t, st in zip((from_text, to_text), stations) if not st)}")
+        return False
+    try:
+        datetime.strptime(train_date, '%Y-%m-%d')
+        seat_classes = parse_seat_classes(seats)
+    except ValueError as e:
+        print(f"Invalid transfer arguments: {e}")
+        return False
+    print(f"\nPlanning from {stations[0].name} to {stations[1].name} on {train_date} using cached results...")
+    transfer_graph.update()
+    journeys = transfer_graph.plan(stations[0].code, stations[1].code, train_date, seat_classes=seat_classes)
+    if not journeys:
+        print(f"No itineraries found among {len(transfer_graph)} cached train segments. "
+              "Run --batch or --sweep for the candidate legs first (with TICKET_QUERY_CACHE_DISK to keep them).")
+        return False
+    print_journeys(journeys, transfer_graph, train_date)
+    return True
+
+
 # --- 主执行流程 ---
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="12306 ticket query and booking (educational purposes only).")
+    parser.add_argument("--batch", metavar="ITINERARIES",
+                        help="query every itinerary in this CSV / JSON Lines file without prompting, then exit (no booking)")
+    parser.add_argument("--sweep", nargs=4, metavar=("FROM", "TO", "START_DATE", "END_DATE"),
+                        help="query every date in a range for one station pair and print an availability summary")
+    parser.add_argument("--transfers", nargs=3, metavar=("FROM", "TO", "DATE"),
+                        help="plan direct and connecting itineraries from cached query results (no requests)")
+    parser.add_argument("--seats", help="seat classes for --sweep or --transfers, e.g. 'second first' (default: all)")
+    parser.add_argument("--output",
+                        help="results file for --batch (default: batch_results.jsonl) or --sweep; "
+                             "the extension selects the format")
+    parser.add_argument("--details", action="store_true",
+                        help="also show fares and stop lists for the listed trains (cached)")
+    parser.add_argument("--all-trains", action="store_true",
+                        help="in batch mode, also write trains without tickets (unless an itinerary sets min_seats)")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, metavar="DIR",
+                        help=f"profile CPU (cProfile) and memory (tracemalloc) per phase and write the reports to DIR "
+                             f"(default: {PROFILE_DIR})")
+    args = parser.parse_args()
+    if RESULTS_EXPORT_FILE and not can_append(RESULTS_EXPORT_FILE):
+        # 每次查询的结果都追加到这个文件，只能重写的格式会丢掉之前的结果
+        parser.error(f"TICKET_RESULTS_EXPORT={RESULTS_EXPORT_FILE}: results are appended after every query, "
+                     f"use one of: {', '.join(appendable_extensions())}")
+    if args.output and not can_export(args.output):
+        # 在查询之前检查，不要等到写出结果时才失败
+        parser.error(f"--output {args.output}: unsupported format, use one of: {', '.join(export_extensions())}")
+    if args.profile:
+        # 只在 --profile 时导入
+        import profiling
+        profiling.enable(args.profile)
+
     print("12306 Ticket Booking Automation Script (Educational Purposes Only)")
     print("=" * 70)
 
-    # 1. 初始化会话
-    main_session = requests.Session()
+    # 1. 初始化会话（共享会话，带连接池、超时、重试和限速）
+    main_session = shared_session()
 
     # 2. 获取省份数据 (可选，用于学习)
-    # provinces_df, main_session = get_provinces_data() # 注释掉，因为我们主要关注订票
+    # provinces, main_session = get_provinces_data() # 注释掉，因为我们主要关注订票
 
     # 3. 获取车站代码
     print("Loading station codes...")
-    station_codes = get_station_codes(main_session)
-    if not station_codes:
+    station_index = get_station_index(main_session)
+    if not station_index:
         print("Failed to load station codes. Exiting script.")
         exit()
 
+    # 批量查询和日期扫描模式：只查询，不登录也不预订
+    if args.batch:
+        ok = run_batch_mode(main_session, station_index, args.batch, args.output or "batch_results.jsonl",
+                            args.all_trains)
+        exit(0 if ok else 1)
+    if args.sweep:
+        ok = run_sweep_mode(main_session, station_index, *args.sweep, seats=args.seats, output_file=args.output)
+        exit(0 if ok else 1)
+    if args.transfers:
+        ok = run_transfer_mode(station_index, *args.transfers, seats=args.seats)
+        exit(0 if ok else 1)
+
     # 4. 用户输入
-    travel_date, from_code, to_code, from_name, to_name = get_user_input(station_codes)
+    travel_date, from_code, to_code, from_name, to_name = get_user_input(station_index)
 
     # 5. 登录 (预订所必需)
     is_logged_in = login_to_12306(main_session)
@@ -423,7 +453,7 @@ if __name__ == '__main__':
         exit()
 
     # 6. 搜索车票
-    selected_train = search_tickets(main_session, travel_date, from_code, to_code)
+    selected_train = search_tickets(main_session, travel_date, from_code, to_code, details=args.details)
 
     if selected_train:
         # 7. 预订 (直到支付)
@@ -0,0 +1,147 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 日期范围余票扫描：对一个车站对在一段日期内逐日查询，得到 日期 × 车次 × 座位类别 的余票矩阵。
+# 重叠的日期只查询一次；查询缓存 (query_cache) 中仍在有效期内的日期直接使用缓存，
+# 再次扫描 (refresh) 时只重新查询缓存已过期的日期。所有请求都经过共享会话的限速器，依次发送。
+#
+# 用法：
+#   sweep = AvailabilitySweep(session, "BJP", "SHH", seat_classes=("second", "first"))
+#   sweep.run(date_range("2026-10-20", "2026-10-26"))
+#   sweep.matrix.print_summary()
+#   ...
+#   sweep.refresh()          # 只重新查询已过期的日期
+
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+from query_cache import query_cache, query_key
+from ticket_parser import SEAT_CLASSES, parse_query_response
+from ticket_query import query_left_tickets
+from train_filter import TrainFilter
+from tracing import span, count
+
+
+def date_range(start, end):
+    """返回从 start 到 end（含）的日期字符串列表，格式 YYYY-MM-DD。"""
+    first = datetime.strptime(start, '%Y-%m-%d').date()
+    last = datetime.strptime(end, '%Y-%m-%d').date()
+    if last < first:
+        raise ValueError(f"End date {end} is before start date {start}.")
+    return [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+
+
+class AvailabilityMatrix:
+    """
+    日期 × 车次 × 座位类别 的余票矩阵。
+    每个日期保存 {车次: (各座位类别的余票数, ...)}，顺序与 seat_classes 一致；None 表示该车次不提供此座位。
+    """
+
+    def __init__(self, seat_classes):
+        self.seat_classes = tuple(seat_classes)
+        self.days = {}  # 日期 -> {车次: 余票元组}
+
+    @property
+    def dates(self):
+        return sorted(self.days)
+
+    def set_day(self, train_date, trains, rows):
+        """用一天的查询结果（rows 为筛选后的行号）替换该日期的数据。"""
+        codes = trains['station_train_code']
+        columns = [trains.seat_counts(seat_class) for seat_class in self.seat_classes]
+        self.days[train_date] = {codes[i]: tuple(column[i] for column in columns) for i in rows}
+
+    def trains(self):
+        """所有日期中出现过的车次（排序后）。"""
+        return sorted({code for day in self.days.values() for code in day})
+
+    def get(self, train_date, train_code, seat_class):
+        """某日期、某车次、某座位类别的余票数；没有该车次或不提供该座位时返回 None。"""
+        counts = self.days.get(train_date, {}).get(train_code)
+        return None if counts is None else counts[self.seat_classes.index(seat_class)]
+
+    def dates_with_seats(self, seat_class=None, min_seats=1):
+        """有车次满足最少余票的日期；seat_class 为 None 时任意座位类别均可。"""
+        indexes = range(len(self.seat_classes)) if seat_class is None else [self.seat_classes.index(seat_class)]
+        return [train_date for train_date in self.dates
+                if any((counts[k] or 0) >= min_seats for counts in self.days[train_date].values() for k in indexes)]
+
+    def to_records(self):
+        """逐行生成 {date, train, 座位类别...} 字典，用于导出。"""
+        for train_date in self.dates:
+            for code, counts in sorted(self.days[train_date].items()):
+                record = {"date": train_date, "train": code}
+                record.update(zip(self.seat_classes, counts))
+                yield record
+
+    def print_summary(self):
+        """打印每个日期中各座位类别有票的车次数。"""
+        header = "".join(f"{seat_class:>14}" for seat_class in self.seat_classes)
+        print(f"{'date':<12}{'trains':>8}{header}")
+        for train_date in self.dates:
+            day = self.days[train_date]
+            cells = "".join(f"{sum(1 for counts in day.values() if counts[k]):>14}"
+                            for k in range(len(self.seat_classes)))
+            print(f"{train_date:<12}{len(day):>8}{cells}")
+
+
+class AvailabilitySweep:
+    """对一个车站对扫描一组日期，结果保存在 matrix 中。"""
+
+    def __init__(self, session, from_code, to_code, seat_classes=None, train_filter=None, cache=query_cache):
+        self.session = session
+        self.from_code = from_code
+        self.to_code = to_code
+        self.seat_classes = tuple(seat_classes or SEAT_CLASSES)
+        # 默认保留所有车次（包括无票的），矩阵中记录 0
+        self.train_filter = train_filter or TrainFilter(min_seats=0)
+        self.cache = cache
+        self.matrix = AvailabilityMatrix(self.seat_classes)
+        self.fetched_at = {}  # 日期 -> 矩阵中该日期数据的更新时间
+        self.failed = {}  # 日期 -> 失败原因
+
+    def run(self, dates):
+        """扫描 dates（可以重复或与之前的扫描重叠），返回本次实际发送请求的日期列表。"""
+        queried = []
+        # 去重并保持顺序
+        for train_date in dict.fromkeys(dates):
+            if self._update(train_date):
+                queried.append(train_date)
+        return queried
+
+    def refresh(self):
+        """重新扫描已有的日期：缓存仍有效的日期不发送请求，只更新已过期的日期。"""
+        return self.run(sorted(set(self.matrix.days) | set(self.failed)))
+
+    def _update(self, train_date):
+        """更新一个日期，返回是否发送了请求。"""
+        key = query_key(train_date, self.from_code, self.to_code)
+        entry = self.cache.get_entry(key) if self.cache is not None else None
+        if entry is not None and entry[0] <= self.fetched_at.get(train_date, 0):
+            # 矩阵中的数据不比缓存旧，不需要重新解析
+            return False
+        queried = entry is None
+        with span("sweep.date", train_date=train_date, cached=not queried):
+            try:
+                if queried:
+                    result = query_left_tickets(self.session, train_date, self.from_code, self.to_code,
+                                                cache=self.cache, use_cached=False)
+                else:
+                    result = entry[1]
+                if not (result.get('status') == True and result.get('httpstatus') == 200):
+                    messages = result.get('messages', ['Unknown error'])
+                    raise ValueError(', '.join(messages) if isinstance(messages, list) else str(messages))
+                trains = parse_query_response(result)
+            except (ValueError, requests.exceptions.RequestException) as e:
+                # ValueError 包括 JSON 解码错误、QueryLayoutError 和接口返回的错误
+                self.failed[train_date] = str(e)
+                count("sweep.failed")
+                return queried
+        self.failed.pop(train_date, None)
+        self.matrix.set_day(train_date, trains, self.train_filter.apply(trains))
+        self.fetched_at[train_date] = time.time()
+        return queried
@@ -0,0 +1,160 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 批量查询（非交互）：从行程文件读取多条行程，全部用车站索引解析，
+# 依次通过共享的限速会话和查询缓存查询，把解析后的结果流式写入 JSON Lines / CSV 等文件。
+# 只做查询，不会进入任何预订步骤。
+#
+# 行程文件可以是 CSV（带表头）或 JSON Lines，字段：
+#   date   出发日期 YYYY-MM-DD
+#   from   出发站（中文站名、电报码、全拼或简拼）
+#   to     到达站
+#   seats  可选，座位类别（见 ticket_parser.SEAT_CLASSES），多个用空格、逗号或分号分隔
+# 以及可选的筛选条件（见 train_filter.TrainFilter）：
+#   min_seats, depart_after, depart_before, arrive_after, arrive_before (HH:MM),
+#   max_duration (HH:MM), train_types (如 GD), sort (departure / arrival / duration / seats)
+#
+# 例如 itineraries.csv：
+#   date,from,to,seats,depart_after,train_types
+#   2026-10-20,北京,上海,second first,07:00,G
+#   2026-10-21,beijing,SHH,,,
+
+import os
+import re
+import csv
+import json
+from collections import namedtuple
+from datetime import datetime
+
+import requests
+
+from exporters import open_exporter, train_records
+from ticket_parser import SEAT_CLASSES, QueryLayoutError, parse_query_response
+from train_filter import TrainFilter
+from ticket_query import query_left_tickets
+from tracing import span
+
+# 一条解析后的行程；line 为在行程文件中的行号（CSV 的表头是第 1 行）
+Itinerary = namedtuple("Itinerary", "line date from_name from_code to_name to_code train_filter")
+
+
+def read_itinerary_rows(path):
+    """读取行程文件，逐条返回 (行号, 字段字典)。按扩展名区分 CSV 与 JSON Lines。"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if extension in (".jsonl", ".json"):
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line_no, json.loads(line)
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                first = (row.get('date') or '').lstrip()
+                if first.startswith('#') or not any(row.values()):
+                    continue
+                yield reader.line_num, row
+
+
+def parse_seat_classes(text):
+    """把 'second, first' 这样的文字拆分为座位类别列表，未知类别抛出 ValueError。"""
+    if isinstance(text, (list, tuple)):
+        names = [str(name).strip() for name in text]
+    else:
+        names = re.split(r"[\s,;]+", (text or "").strip())
+    names = [name for name in names if name]
+    unknown = [name for name in names if name not in SEAT_CLASSES]
+    if unknown:
+        raise ValueError(f"unknown seat class {', '.join(unknown)} (choose from: {', '.join(SEAT_CLASSES)})")
+    return tuple(names)
+
+
+def _field(row, key):
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def build_filter(row, default_min_seats=1):
+    """根据行程中的筛选字段创建 TrainFilter，字段无效时抛出 ValueError。"""
+    min_seats = _field(row, 'min_seats')
+    depart = (_field(row, 'depart_after'), _field(row, 'depart_before'))
+    arrive = (_field(row, 'arrive_after'), _field(row, 'arrive_before'))
+    return TrainFilter(
+        seat_classes=parse_seat_classes(row.get('seats')),
+        min_seats=int(min_seats) if min_seats else default_min_seats,
+        depart_between=depart if any(depart) else None,
+        arrive_between=arrive if any(arrive) else None,
+        max_duration=_field(row, 'max_duration'),
+        train_types=re.findall(r"[A-Za-z]", _field(row, 'train_types') or ''),
+        sort_by=_field(row, 'sort') or "departure",
+    )
+
+
+def resolve_itineraries(rows, station_index, default_min_seats=1):
+    """
+    用车站索引解析所有行程，返回 (行程列表, 错误列表)；错误为 'Line N: 原因' 形式的文字。
+    default_min_seats 用于没有 min_seats 字段的行程；为 0 时包括无票的车次。
+    """
+    itineraries = []
+    errors = []
+    for line_no, row in rows:
+        try:
+            date_str = (row.get('date') or '').strip()
+            datetime.strptime(date_str, '%Y-%m-%d')
+        except ValueError:
+            errors.append(f"Line {line_no}: invalid date {row.get('date')!r}, expected YYYY-MM-DD")
+            continue
+        stations = []
+        for key in ('from', 'to'):
+            text = (row.get(key) or '').strip()
+            station = station_index.resolve(text)
+            if not station:
+                matches = [m.name for m in station_index.search(text)] if text else []
+                hint = f" (similar: {', '.join(matches)})" if matches else ""
+                errors.append(f"Line {line_no}: station {text!r} not found{hint}")
+                break
+            stations.append(station)
+        if len(stations) < 2:
+            continue
+        try:
+            train_filter = build_filter(row, default_min_seats)
+        except ValueError as e:
+            errors.append(f"Line {line_no}: {e}")
+            continue
+        itineraries.append(Itinerary(line_no, date_str, stations[0].name, stations[0].code,
+                                     stations[1].name, stations[1].code, train_filter))
+    return itineraries, errors
+
+
+def run_batch(session, itineraries, output_path):
+    """
+    依次查询所有行程，把符合筛选条件的车次按排序结果流式写入 output_path，返回写入的记录数。
+    某条行程查询失败时打印原因并继续下一条。
+    """
+    total = len(itineraries)
+    with open_exporter(output_path, name="trains") as exporter:
+        for n, itinerary in enumerate(itineraries, 1):
+            label = f"[{n}/{total}] {itinerary.date} {itinerary.from_name} -> {itinerary.to_name}"
+            try:
+                with span("batch.itinerary", line=itinerary.line) as s:
+                    result = query_left_tickets(session, itinerary.date, itinerary.from_code, itinerary.to_code)
+                    if not (result.get('status') == True and result.get('httpstatus') == 200):
+                        messages = result.get('messages', ['Unknown error'])
+                        print(f"{label}: search failed: {', '.join(messages) if isinstance(messages, list) else messages}")
+                        continue
+                    trains = parse_query_response(result)
+                    rows = itinerary.train_filter.apply(trains)
+                    exporter.write(train_records(trains, rows, itinerary=itinerary.line, train_date=itinerary.date,
+                                                 queried_at=datetime.now().isoformat(timespec='seconds')))
+                    s.set(trains=len(trains), matched=len(rows))
+                print(f"{label}: {len(trains)} trains, {len(rows)} matching")
+            except (ValueError, requests.exceptions.RequestException) as e:
+                # ValueError 包括 JSON 解码错误和 QueryLayoutError
+                kind = "layout" if isinstance(e, QueryLayoutError) else "request"
+                print(f"{label}: {kind} error: {e}")
+        return exporter.count
@@ -0,0 +1,496 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 解析与查找热点路径的基准测试，使用 fake_12306 生成的离线数据，不访问网络。
+# 结果以 JSON 输出（每个用例的耗时统计和峰值内存），可以与之前的结果比较以发现性能回退。
+#
+# 用法：
+#   python benchmark.py --size realistic --output bench.json
+#   python benchmark.py --size all --compare bench.json --threshold 0.2
+#   python benchmark.py --list
+#   python benchmark.py station_parse query_parse
+#   python benchmark.py --startup-report
+#   python benchmark.py --replay capture.sqlite      # 使用录制的真实响应（见 http_capture.py）
+#   python benchmark.py --profile profile            # 每个用例再运行一次，写出 CPU 和内存分析报告（见 profiling.py）
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from fake_12306 import make_stations, make_station_js, make_query_response, make_provinces
+from station_cache import parse_station_names
+from station_index import StationIndex
+from ticket_parser import parse_query_response, TrainResultSet
+from exporters import export_records, train_records
+
+# --- 配置 ---
+# realistic: 全国车站表规模、单日热门线路的车次数量
+# stress: 放大后的车站表、一个月的多日期查询
+SIZES = {
+    "realistic": {"stations": 3300, "trains": 200, "dates": 1, "provinces": 31},
+    "stress": {"stations": 10000, "trains": 600, "dates": 30, "provinces": 5000},
+}
+
+# 启动时间：两个入口脚本的导入耗时，以及启动阶段不应加载的重量级依赖
+STARTUP_MODULES = ("GetTicketsIfo", "BuyTicketest1")
+HEAVY_MODULES = ("pandas", "selenium", "openpyxl")
+
+# 注册的用例：(名称, 构建函数)。构建函数接收规模参数，返回 (被计时的函数, 每次调用包含的操作数)
+CASES = []
+
+
+def case(name):
+    """注册一个基准用例。"""
+    def decorator(build):
+        CASES.append((name, build))
+        return build
+    return decorator
+
+
+# --- 测试数据（按规模缓存，避免每个用例重复生成）---
+
+_fixtures = {}
+
+STATION_PATH = "/otn/resources/js/framework/station_name.js"
+QUERY_PATHS = ("/otn/leftTicket/queryZ", "/otn/leftTicket/query")
+PROVINCE_PATH = "/otn/userCommon/allProvince"
+
+
+def fixtures(size):
+    if "archive" in size:
+        return size["archive"]["stations"]
+    if size["stations"] not in _fixtures:
+        stations = make_stations(size["stations"])
+        _fixtures[size["stations"]] = (stations, make_station_js(stations))
+    return _fixtures[size["stations"]]
+
+
+def query_responses(size):
+    if "archive" in size:
+        return size["archive"]["queries"]
+    stations, _ = fixtures(size)
+    names = {row[2]: row[1] for row in stations}
+    return [make_query_response(size["trains"], "BJP", "SHH", f"2026-11-{day + 1:02d}", names)
+            for day in range(size["dates"])]
+
+
+def province_records(size):
+    if "archive" in size:
+        return size["archive"]["provinces"]
+    return make_provinces(size["provinces"])["data"]
+
+
+def recorded_size(path):
+    """用录制归档中的真实响应构建一个 'recorded' 规模；归档中没有的数据仍使用生成的数据。"""
+    from http_capture import CaptureArchive
+    archive = CaptureArchive(path)
+    generated = SIZES["realistic"]
+    bodies = archive.bodies(STATION_PATH)
+    js = bodies[-1].decode("utf-8") if bodies else None
+    stations = parse_station_names(js) if js else None
+    if not stations:
+        stations = make_stations(generated["stations"])
+        js = make_station_js(stations)
+    queries = []
+    for path in QUERY_PATHS:
+        for body in archive.bodies(path):
+            response = json.loads(body)
+            if response.get("status") == True:
+                queries.append(response)
+    if not queries:
+        names = {row[2]: row[1] for row in stations}
+        queries = [make_query_response(generated["trains"], "BJP", "SHH", "2026-11-01", names)]
+    bodies = archive.bodies(PROVINCE_PATH)
+    provinces = (json.loads(bodies[-1]).get("data") or []) if bodies else []
+    if not provinces:
+        provinces = make_provinces(generated["provinces"])["data"]
+    archive.close()
+    rows = sum(len(response["data"]["result"]) for response in queries)
+    return {"stations": len(stations), "trains": rows / len(queries), "dates": len(queries),
+            "provinces": len(provinces),
+            "archive": {"stations": (stations, js), "queries": queries, "provinces": provinces}}
+
+
+def lookup_queries(stations, count=1000):
+    """从车站表中取出一组站名、拼音和前缀作为查询输入。"""
+    step = max(1, len(stations) // count)
+    return stations[::step][:count]
+
+
+# --- 用例 ---
+
+@case("station_parse")
+def bench_station_parse(size):
+    _, js = fixtures(size)
+    return lambda: parse_station_names(js), 1
+
+
+@case("station_index_build")
+def bench_station_index_build(size):
+    stations, _ = fixtures(size)
+    return lambda: StationIndex(stations), 1
+
+
+@case("station_lookup_exact")
+def bench_station_lookup_exact(size):
+    stations, _ = fixtures(size)
+    index = StationIndex(stations)
+    names = [row[1] for row in lookup_queries(stations)]
+
+    def run():
+        for name in names:
+            index.get(name)
+    return run, len(names)
+
+
+@case("station_resolve_pinyin")
+def bench_station_resolve_pinyin(size):
+    stations, _ = fixtures(size)
+    index = StationIndex(stations)
+    queries = [row[3] for row in lookup_queries(stations)]
+
+    def run():
+        for query in queries:
+            index.resolve(query)
+    return run, len(queries)
+
+
+@case("station_search_prefix")
+def bench_station_search_prefix(size):
+    stations, _ = fixtures(size)
+    index = StationIndex(stations)
+    queries = [row[3][:3] for row in lookup_queries(stations)]
+
+    def run():
+        for query in queries:
+            index.search(query)
+    return run, len(queries)
+
+
+@case("station_search_fuzzy")
+def bench_station_search_fuzzy(size):
+    # 中文单字查询会走到子串扫描，是站名查找最慢的路径
+    stations, _ = fixtures(size)
+    index = StationIndex(stations)
+    queries = [row[1][-1] for row in lookup_queries(stations, 200)]
+
+    def run():
+        for query in queries:
+            index.search(query)
+    return run, len(queries)
+
+
+@case("query_parse")
+def bench_query_parse(size):
+    responses = query_responses(size)
+
+    def run():
+        trains = TrainResultSet()
+        for response in responses:
+            trains.extend(parse_query_response(response))
+        return trains
+    return run, round(size["trains"] * size["dates"])
+
+
+@case("seat_filter")
+def bench_seat_filter(size):
+    trains = TrainResultSet()
+    for response in query_responses(size):
+        trains.extend(parse_query_response(response))
+
+    def run():
+        # 每次使用新的结果集，保证类型化的列需要重新解析
+        fresh = TrainResultSet(trains.columns, trains.station_map)
+        available = [i for i in range(len(fresh)) if fresh.has_tickets(i)]
+        for i in available:
+            fresh.seats(i)
+        return available
+    return run, len(trains)
+
+
+@case("train_filter")
+def bench_train_filter(size):
+    from train_filter import TrainFilter
+    trains = TrainResultSet()
+    for response in query_responses(size):
+        trains.extend(parse_query_response(response))
+    trains_filter = TrainFilter(seat_classes=("second", "first", "hard_sleeper"), min_seats=2,
+                                depart_between=("06:00", "20:00"), max_duration="12:00",
+                                train_types="GDZTK", sort_by="duration")
+
+    def run():
+        # 每次使用新的结果集，保证类型化的列需要重新解析
+        fresh = TrainResultSet(trains.columns, trains.station_map)
+        return trains_filter.apply(fresh)
+    return run, len(trains)
+
+
+def _bench_province_export(export_format):
+    def build(size):
+        from province_store import save_provinces_data
+        if export_format == "parquet":
+            import pyarrow  # 没有安装时跳过该用例
+        records = province_records(size)
+        directory = tempfile.mkdtemp(prefix="bench-provinces-")
+
+        def run():
+            with redirect_stdout(io.StringIO()):
+                save_provinces_data(records, directory, export_format)
+        return run, len(records)
+    return build
+
+
+for _format in ("csv", "jsonl", "sqlite", "parquet", "xlsx"):
+    case(f"province_export_{_format}")(_bench_province_export(_format))
+
+
+@case("province_sync")
+def bench_province_sync(size):
+    from province_store import ProvinceStore
+    records = province_records(size)
+    store = ProvinceStore(os.path.join(tempfile.mkdtemp(prefix="bench-provinces-"), "provinces.sqlite"))
+    store.sync(records)
+    # 交替同步两个只差一条记录的快照，测量增量比较和写入
+    changed = [dict(record) for record in records]
+    changed[0]["allPin"] = changed[0].get("allPin", "") + "x"
+    snapshots = [changed, records]
+
+    def run():
+        snapshots.reverse()
+        return store.sync(snapshots[0])
+    return run, len(records)
+
+
+@case("province_lookup")
+def bench_province_lookup(size):
+    from province_store import ProvinceStore
+    records = province_records(size)
+    store = ProvinceStore(os.path.join(tempfile.mkdtemp(prefix="bench-provinces-"), "provinces.sqlite"))
+    store.sync(records)
+    queries = [record["chineseName"] for record in records[:1000]]
+
+    def run():
+        for query in queries:
+            store.get(query)
+    return run, len(queries)
+
+
+@case("query_export_jsonl")
+def bench_query_export_jsonl(size):
+    trains = TrainResultSet()
+    for response in query_responses(size):
+        trains.extend(parse_query_response(response))
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-trains-"), "trains.jsonl")
+    return lambda: export_records(train_records(trains), path), len(trains)
+
+
+def _import_in_subprocess(module, importtime=False):
+    """在新的解释器中导入 module，返回 (耗时秒, 已加载的重量级模块, stderr)。"""
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    start = time.perf_counter()
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {completed.stderr.strip().splitlines()[-1:]}")
+    return elapsed, json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def _bench_startup(module):
+    def build(size):
+        return lambda: _import_in_subprocess(module), 1
+    return build
+
+
+case("startup_interpreter")(_bench_startup("sys"))
+for _module in STARTUP_MODULES:
+    case(f"startup_import_{_module}")(_bench_startup(_module))
+
+
+def startup_report(top=15):
+    """
+    启动时间报告：每个入口脚本的导入耗时、导入最慢的模块（来自 python -X importtime），
+    以及启动阶段被加载的重量级依赖（应当为空）。
+    """
+    baseline, _, _ = _import_in_subprocess("sys")
+    report = {"interpreter_ms": round(baseline * 1000, 1), "modules": []}
+    for module in STARTUP_MODULES:
+        elapsed, heavy, stderr = _import_in_subprocess(module, importtime=True)
+        imports = []
+        for line in stderr.splitlines():
+            # 格式：import time: self [us] | cumulative | imported package（嵌套导入带缩进）
+            fields = line[len("import time:"):].split("|") if line.startswith("import time:") else []
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                imports.append((fields[2].strip(), int(fields[1])))
+        imports.sort(key=lambda item: item[1], reverse=True)
+        report["modules"].append({
+            "module": module,
+            "wall_ms": round(elapsed * 1000, 1),
+            "heavy_modules_loaded": heavy,
+            "slowest_imports_ms": [(name, round(us / 1000, 1)) for name, us in imports[:top]],
+        })
+    return report
+
+
+# --- 运行 ---
+
+def measure(fn, repeat):
+    """运行 repeat 次并返回每次的耗时（秒），之后再单独运行一次测量峰值内存。"""
+    fn()  # 预热
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc 会显著拖慢执行，所以内存单独测量
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, peak
+
+
+def run_cases(names=None, sizes=("realistic",), repeat=5, profiler=None):
+    """运行用例；传入 profiling.Profiler 时，每个用例在计时之后再运行一次，作为 <用例>.<规模> 阶段分析。"""
+    results = []
+    for size_name in sizes:
+        size = SIZES[size_name]
+        for name, build in CASES:
+            if names and name not in names:
+                continue
+            try:
+                fn, ops = build(size)
+            except ImportError as e:
+                print(f"Skipping {name}: {e}", file=sys.stderr)
+                continue
+            timings, peak = measure(fn, repeat)
+            if profiler is not None:
+                with profiler.phase(f"{name}.{size_name}"):
+                    fn()
+            median = statistics.median(timings)
+            result = {
+                "case": name,
+                "size": size_name,
+                "ops": ops,
+                "repeat": repeat,
+                "min_ms": round(min(timings) * 1000, 4),
+                "median_ms": round(median * 1000, 4),
+                "mean_ms": round(statistics.mean(timings) * 1000, 4),
+                "per_op_us": round(median * 1e6 / ops, 4) if ops else None,
+                "peak_kb": round(peak / 1024, 1),
+            }
+            results.append(result)
+            print(f"{name:<24} {size_name:<10} median {result['median_ms']:>10.3f} ms  "
+                  f"({result['per_op_us']} us/op)  peak {result['peak_kb']} KiB", file=sys.stderr)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """与之前的结果比较，返回中位数耗时变慢超过 threshold（比例）的用例列表。"""
+    previous = {(r["case"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result["case"], result["size"]))
+        if not old or not old["median_ms"]:
+            continue
+        ratio = result["median_ms"] / old["median_ms"] - 1
+        if ratio > threshold:
+            regressions.append({"case": result["case"], "size": result["size"],
+                                "before_ms": old["median_ms"], "after_ms": result["median_ms"],
+                                "change": round(ratio, 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for station parsing, lookup and query parsing.")
+    parser.add_argument("cases", nargs="*", help="case names to run (default: all)")
+    parser.add_argument("--size", choices=list(SIZES) + ["all"], default="realistic")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON file from a previous run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fail when a case's median is this much slower than the baseline (0.2 = 20%%)")
+    parser.add_argument("--replay", metavar="ARCHIVE",
+                        help="run the cases on responses recorded with TICKET_HTTP_CAPTURE instead of generated data")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="run each case once more under cProfile and tracemalloc and write per-case reports to DIR")
+    parser.add_argument("--list", action="store_true", help="list the available cases")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="report import time of the entry scripts; fails if pandas/Selenium load at startup")
+    args = parser.parse_args(argv)
+
+    if args.startup_report:
+        report = startup_report()
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 1 if any(module["heavy_modules_loaded"] for module in report["modules"]) else 0
+
+    if args.list:
+        for name, _ in CASES:
+            print(name)
+        return 0
+
+    sizes = list(SIZES) if args.size == "all" else [args.size]
+    if args.replay:
+        SIZES["recorded"] = recorded_size(args.replay)
+        sizes = ["recorded"]
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "replay": args.replay,
+        },
+    }
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        profiler = Profiler(args.profile)
+    report["results"] = run_cases(args.cases, sizes, args.repeat, profiler)
+    if profiler is not None:
+        profiler.print_summary(profiler.write(), file=sys.stderr)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report["results"], json.load(f), args.threshold)
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['case']} ({regression['size']}): "
+                  f"{regression['before_ms']} ms -> {regression['after_ms']} ms", file=sys.stderr)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
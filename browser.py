@@ -0,0 +1,94 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# Chrome 启动配置：可选的无头模式、页面加载策略、持久的用户数据目录（复用手动登录后的会话），
+# 以及查询页面上的资源屏蔽（图片、字体、第三方统计脚本）。
+# 启动时间和页面加载时间分别计时，分别记录为 chrome.launch 和 page.* 阶段。
+
+import os
+import time
+
+from config import CHROME_HEADLESS, CHROME_PAGE_LOAD, CHROME_PROFILE_DIR
+from tracing import span
+
+# 查询页面上屏蔽的请求（Chrome DevTools 的 URL 通配符）
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*hm.baidu.com*", "*cnzz.com*", "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+]
+
+# 减少首次启动和后台活动的开销
+CHROME_ARGUMENTS = (
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+)
+
+
+def chrome_options(headless=CHROME_HEADLESS, page_load_strategy=CHROME_PAGE_LOAD, profile_dir=CHROME_PROFILE_DIR):
+    """根据配置生成 ChromeOptions。"""
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.page_load_strategy = page_load_strategy
+    for argument in CHROME_ARGUMENTS:
+        options.add_argument(argument)
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1280,900")
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    return options
+
+
+def launch_chrome(headless=CHROME_HEADLESS, page_load_strategy=CHROME_PAGE_LOAD, profile_dir=CHROME_PROFILE_DIR):
+    """启动 Chrome，返回 (driver, 启动耗时秒数)。"""
+    from selenium import webdriver
+
+    # --- 重要：请在此处配置你的ChromeDriver路径 ---
+    # from selenium.webdriver.chrome.service import Service
+    # service = Service('/path/to/chromedriver') # Linux/Mac
+    # service = Service('C:\\path\\to\\chromedriver.exe') # Windows
+    # driver = webdriver.Chrome(service=service, options=options)
+    # 或者，如果ChromeDriver在系统PATH中
+    options = chrome_options(headless, page_load_strategy, profile_dir)
+    start = time.perf_counter()
+    with span("chrome.launch", headless=headless, page_load_strategy=page_load_strategy,
+              persistent_profile=bool(profile_dir)):
+        driver = webdriver.Chrome(options=options)
+    return driver, time.perf_counter() - start
+
+
+def is_headless(driver):
+    """浏览器是否以无头模式运行（通过 DevTools 读取 User-Agent）。无法判断时按配置 CHROME_HEADLESS。"""
+    from selenium.common.exceptions import WebDriverException
+
+    try:
+        return "HeadlessChrome" in driver.execute_cdp_cmd("Browser.getVersion", {})["userAgent"]
+    except (AttributeError, KeyError, WebDriverException):
+        return CHROME_HEADLESS
+
+
+def load_page(driver, url, phase):
+    """打开页面并返回加载耗时（秒），记录为 phase 阶段。"""
+    start = time.perf_counter()
+    with span(phase):
+        driver.get(url)
+    return time.perf_counter() - start
+
+
+def set_resource_blocking(driver, enabled, patterns=BLOCKED_URL_PATTERNS):
+    """开启或关闭资源屏蔽（通过 DevTools 协议）。浏览器不支持时打印警告并继续。"""
+    from selenium.common.exceptions import WebDriverException
+
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns) if enabled else []})
+    except (AttributeError, WebDriverException) as e:
+        print(f"Warning: could not change resource blocking: {e}")
@@ -0,0 +1,75 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+
+import os
+
+# --- 配置 ---
+# 所有配置都可以通过环境变量覆盖，方便在不修改代码的情况下调整行为
+
+# 12306 站点根地址。指向本地替身服务器（见 fake_12306.py）即可离线运行和做性能测试，例如：
+# TICKET_BASE_URL=http://127.0.0.1:8306 python GetTicketsIfo.py
+BASE_URL = os.environ.get("TICKET_BASE_URL", "https://kyfw.12306.cn").rstrip('/')
+
+# 本地缓存目录（车站表等）
+CACHE_DIR = os.environ.get("TICKET_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "12306"))
+
+# 车站表缓存的有效期（秒）。在有效期内直接使用本地缓存，不发送任何请求；
+# 过期后使用条件请求 (ETag/Last-Modified) 重新验证。设置为 0 表示每次都重新验证。
+STATION_CACHE_TTL = int(os.environ.get("TICKET_STATION_CACHE_TTL", 24 * 60 * 60))
+
+# 省份数据集（SQLite，见 province_store.py）及其有效期（秒）。有效期内直接使用本地数据，不发送请求
+PROVINCE_DB = os.environ.get("TICKET_PROVINCE_DB", os.path.join(CACHE_DIR, "provinces.sqlite"))
+PROVINCE_CACHE_TTL = int(os.environ.get("TICKET_PROVINCE_CACHE_TTL", 24 * 60 * 60))
+
+# 追踪记录文件（JSON Lines）。设置后开启分阶段计时，并在运行结束时打印汇总表
+TRACE_FILE = os.environ.get("TICKET_TRACE", "")
+
+# --profile 的输出目录（每个阶段一个 cProfile 文件，以及 cpu.txt / allocations.txt 报告）和报告中列出的条目数
+PROFILE_DIR = os.environ.get("TICKET_PROFILE_DIR", "profile")
+PROFILE_TOP = int(os.environ.get("TICKET_PROFILE_TOP", 20))
+
+# 省份数据导出格式：csv / jsonl / parquet / sqlite / xlsx（Excel 需要 openpyxl，Parquet 需要 pyarrow）
+EXPORT_FORMAT = os.environ.get("TICKET_EXPORT_FORMAT", "csv").lstrip('.').lower()
+
+# 查询结果导出文件（扩展名决定格式）。设置后每次查询的完整结果都会追加写入该文件
+RESULTS_EXPORT_FILE = os.environ.get("TICKET_RESULTS_EXPORT", "")
+
+# HTTP 请求的默认超时（秒）和失败后的最多重试次数（只重试幂等请求）
+HTTP_TIMEOUT = float(os.environ.get("TICKET_HTTP_TIMEOUT", 10))
+HTTP_RETRIES = int(os.environ.get("TICKET_HTTP_RETRIES", 2))
+
+# HTTP 录制与回放（见 http_capture.py）：CAPTURE 为录制归档文件，共享会话的所有请求都会记录到这里；
+# REPLAY 为回放归档文件，设置后共享会话不访问网络，直接返回录制的响应。都留空表示关闭
+HTTP_CAPTURE = os.environ.get("TICKET_HTTP_CAPTURE", "")
+HTTP_REPLAY = os.environ.get("TICKET_HTTP_REPLAY", "")
+
+# 余票查询结果缓存：有效期（秒）、内存中最多保存的条目数，以及可选的磁盘缓存文件（SQLite，留空表示不使用）
+QUERY_CACHE_TTL = float(os.environ.get("TICKET_QUERY_CACHE_TTL", 60))
+QUERY_CACHE_SIZE = int(os.environ.get("TICKET_QUERY_CACHE_SIZE", 256))
+QUERY_CACHE_DISK = os.environ.get("TICKET_QUERY_CACHE_DISK", "")
+
+# 车次详情缓存：经停站时刻表很少变化，有效期较长；票价有效期较短。磁盘缓存文件留空表示只缓存在内存中
+TIMETABLE_CACHE_TTL = float(os.environ.get("TICKET_TIMETABLE_CACHE_TTL", 7 * 24 * 60 * 60))
+TIMETABLE_CACHE_DISK = os.environ.get("TICKET_TIMETABLE_CACHE_DISK", os.path.join(CACHE_DIR, "timetables.sqlite"))
+FARE_CACHE_TTL = float(os.environ.get("TICKET_FARE_CACHE_TTL", 60 * 60))
+FARE_CACHE_DISK = os.environ.get("TICKET_FARE_CACHE_DISK", os.path.join(CACHE_DIR, "fares.sqlite"))
+
+# Chrome 启动配置（Selenium 流程）：
+# 无头模式（需要已登录的会话，否则会重新打开可见窗口让用户登录）
+CHROME_HEADLESS = os.environ.get("TICKET_CHROME_HEADLESS", "").lower() in ("1", "true", "yes")
+# 页面加载策略：normal（等待所有资源）/ eager（DOM 就绪即返回）/ none
+CHROME_PAGE_LOAD = os.environ.get("TICKET_CHROME_PAGE_LOAD", "eager")
+# 持久的用户数据目录，用于复用手动登录后的会话；设置为空字符串表示每次使用全新的临时配置
+CHROME_PROFILE_DIR = os.environ.get("TICKET_CHROME_PROFILE", os.path.join(CACHE_DIR, "chrome-profile"))
+# 查询页面上是否屏蔽图片、字体和第三方统计脚本
+CHROME_BLOCK_RESOURCES = os.environ.get("TICKET_CHROME_BLOCK_RESOURCES", "1").lower() in ("1", "true", "yes")
+
+# 余票历史库（SQLite）：每次从网络获取的查询结果都会批量追加到这里，用于查看余票变化趋势。
+# 设置为空字符串表示不记录
+HISTORY_DB = os.environ.get("TICKET_HISTORY_DB", os.path.join(CACHE_DIR, "history.sqlite"))
+
+# 换乘规划：同站换乘的最短换乘时间和最长等待时间（分钟）
+TRANSFER_MIN_CONNECTION = int(os.environ.get("TICKET_TRANSFER_MIN_CONNECTION", "20"))
+TRANSFER_MAX_WAIT = int(os.environ.get("TICKET_TRANSFER_MAX_WAIT", "360"))
@@ -0,0 +1,276 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 流式导出：省份数据、查询结果等记录按批写入 CSV / JSON Lines / Parquet / SQLite / Excel。
+# 记录逐批写出，不在内存中构建完整的 DataFrame。
+#
+# 用法：
+#   with open_exporter("provinces.csv") as exporter:
+#       exporter.write(records)          # 可以多次调用，每次写一批
+#   export_records(records, "provinces.sqlite", name="provinces")
+
+import os
+import csv
+import json
+
+# 每批写入的记录数
+BATCH_SIZE = 1000
+
+
+def flatten(record, prefix=""):
+    """把嵌套字典展开为一层，键名用 '.' 连接（与 pandas.json_normalize 相同）。"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+class Exporter:
+    """
+    导出器基类。子类实现 _open / _write_batch / _close；列名取自第一批记录（追加到已有 CSV 时取自文件的表头）。
+    不能加列的格式遇到列名以外的字段时抛出 ValueError，不会悄悄丢掉数据。
+    name 是数据集名称（SQLite 的表名、Excel 的工作表名）。
+    """
+
+    # 是否支持追加到已有文件
+    supports_append = False
+    # 后续批次出现新字段时能否加列
+    supports_new_fields = False
+
+    def __init__(self, path, append=False, name="records"):
+        if append and not self.supports_append:
+            raise ValueError(f"Cannot append to {path}: {os.path.splitext(path)[1]} files can only be rewritten. "
+                             f"Use one of: {', '.join(appendable_extensions())}")
+        self.path = path
+        self.append = append
+        self.name = name
+        self.fields = None
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def write(self, records):
+        """写入一批（或任意可迭代的）记录，内部按 BATCH_SIZE 分批。"""
+        batch = []
+        for record in records:
+            batch.append(flatten(record))
+            if len(batch) >= BATCH_SIZE:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self
+
+    def _flush(self, batch):
+        if self.fields is None:
+            self.fields = list(batch[0].keys())
+            self._open()
+        if not self.supports_new_fields:
+            known = set(self.fields)
+            extra = {key for record in batch for key in record.keys() - known}
+            if extra:
+                raise ValueError(f"Records for {self.path} have fields that are not in its columns: "
+                                 f"{', '.join(sorted(extra))}")
+        self._write_batch(batch)
+        self.count += len(batch)
+
+    def close(self):
+        if self.fields is not None:
+            self._close()
+            self.fields = None
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvExporter(Exporter):
+    """CSV（UTF-8 with BOM，Excel 可以直接打开中文）。"""
+
+    supports_append = True
+
+    def _open(self):
+        exists = self.append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if exists:
+            # 追加时沿用已有文件的表头，列的顺序保持一致
+            with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+                self.fields = next(csv.reader(f), None) or self.fields
+        self._file = open(self.path, "a" if self.append else "w", encoding="utf-8-sig" if not exists else "utf-8",
+                          newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields)
+        if not exists:
+            self._writer.writeheader()
+
+    def _write_batch(self, batch):
+        self._writer.writerows(batch)
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonLinesExporter(Exporter):
+    """JSON Lines，每行一条记录。"""
+
+    supports_append = True
+    supports_new_fields = True
+
+    def _open(self):
+        self._file = open(self.path, "a" if self.append else "w", encoding="utf-8")
+
+    def _write_batch(self, batch):
+        self._file.write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in batch))
+
+    def _close(self):
+        self._file.close()
+
+
+class SqliteExporter(Exporter):
+    """SQLite 表，每批一个事务；后续批次出现新字段时自动加列。"""
+
+    supports_append = True
+    supports_new_fields = True
+
+    def _open(self):
+        import sqlite3
+
+        self._conn = sqlite3.connect(self.path)
+        if not self.append:
+            self._conn.execute(f'DROP TABLE IF EXISTS "{self.name}"')
+        columns = ", ".join(f'"{field}"' for field in self.fields)
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.name}" ({columns})')
+        self._columns = {row[1] for row in self._conn.execute(f'PRAGMA table_info("{self.name}")')}
+
+    def _write_batch(self, batch):
+        fields = list(self.fields)
+        for record in batch:
+            for key in record:
+                if key not in self._columns:
+                    self._conn.execute(f'ALTER TABLE "{self.name}" ADD COLUMN "{key}"')
+                    self._columns.add(key)
+                    fields.append(key)
+                    self.fields.append(key)
+        placeholders = ", ".join("?" for _ in fields)
+        columns = ", ".join(f'"{field}"' for field in fields)
+        with self._conn:
+            self._conn.executemany(f'INSERT INTO "{self.name}" ({columns}) VALUES ({placeholders})',
+                                   ([record.get(field) for field in fields] for record in batch))
+
+    def _close(self):
+        self._conn.close()
+
+
+class ParquetExporter(Exporter):
+    """Parquet（需要 pyarrow），每批写成一个 row group。"""
+
+    def _open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow).") from None
+        self._pa = pa
+        self._schema = pa.schema([(field, pa.string()) for field in self.fields])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    def _write_batch(self, batch):
+        columns = {field: [None if record.get(field) is None else str(record.get(field)) for record in batch]
+                   for field in self.fields}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+class ExcelExporter(Exporter):
+    """Excel（需要 openpyxl），使用 write-only 模式逐行写入，内存占用不随行数增长。"""
+
+    def _open(self):
+        from openpyxl import Workbook
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(title=self.name[:31])
+        self._sheet.append(self.fields)
+
+    def _write_batch(self, batch):
+        for record in batch:
+            self._sheet.append([record.get(field) for field in self.fields])
+
+    def _close(self):
+        self._workbook.save(self.path)
+
+
+# 文件扩展名 -> 导出器
+EXPORTERS = {
+    ".csv": CsvExporter,
+    ".jsonl": JsonLinesExporter,
+    ".parquet": ParquetExporter,
+    ".sqlite": SqliteExporter,
+    ".db": SqliteExporter,
+    ".xlsx": ExcelExporter,
+}
+
+
+def export_extensions():
+    """支持的文件扩展名。"""
+    return list(EXPORTERS)
+
+
+def can_export(path):
+    """path 的扩展名是否对应一种导出格式（在查询之前检查输出文件参数）。"""
+    return os.path.splitext(path)[1].lower() in EXPORTERS
+
+
+def appendable_extensions():
+    """支持追加写入的文件扩展名。"""
+    return [extension for extension, exporter in EXPORTERS.items() if exporter.supports_append]
+
+
+def can_append(path):
+    """path 的格式是否支持追加（例如 TICKET_RESULTS_EXPORT 每次查询都追加写入）。"""
+    exporter = EXPORTERS.get(os.path.splitext(path)[1].lower())
+    return exporter is not None and exporter.supports_append
+
+
+def open_exporter(path, append=False, name="records"):
+    """根据文件扩展名创建导出器。"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORTERS:
+        raise ValueError(f"Unsupported export format '{extension}'. Choose one of: {', '.join(export_extensions())}")
+    return EXPORTERS[extension](path, append=append, name=name)
+
+
+def export_records(records, path, append=False, name="records"):
+    """把记录流式写入 path，返回写入的记录数。"""
+    with open_exporter(path, append=append, name=name) as exporter:
+        exporter.write(records)
+        return exporter.count
+
+
+def train_records(trains, rows=None, **extra):
+    """
+    把 TrainResultSet 逐行转换为字典（生成器，每次只保留一行），extra 为附加到每行的字段。
+    rows 为要输出的行号列表（例如筛选结果），默认输出全部行。
+    """
+    names = list(trains.columns)
+    columns = [trains.columns[name] for name in names]
+    if rows is not None:
+        columns = [[column[i] for i in rows] for column in columns]
+    for values in zip(*columns):
+        record = dict(extra)
+        record.update(zip(names, values))
+        yield record
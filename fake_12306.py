@@ -0,0 +1,485 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 本地 12306 替身服务器：在没有网络的情况下运行两个脚本并测量性能。
+# 提供 station_name.js、leftTicket/queryZ、czxx/queryByTrainNo（经停站）、leftTicket/queryTicketPrice（票价）、
+# login/checkUser、userCommon/allProvince、
+# leftTicket/init（最小可用的查询页面）和登录页面。数据默认随机生成（固定种子，可重复），
+# 也可以用 --fixtures 指定一个目录，按请求路径返回录制好的响应。
+#
+# 用法：
+#   python fake_12306.py --port 8306 --stations 3300 --trains 200 --latency 50 --error-rate 0.05
+#   TICKET_BASE_URL=http://127.0.0.1:8306 python GetTicketsIfo.py
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from email.utils import formatdate
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from ticket_parser import QUERY_FIELDS
+
+# --- 合成数据 ---
+
+# 用于拼出站名的汉字及其拼音
+_CHARS = [
+    ("北", "bei"), ("京", "jing"), ("上", "shang"), ("海", "hai"), ("天", "tian"), ("津", "jin"),
+    ("广", "guang"), ("州", "zhou"), ("深", "shen"), ("圳", "zhen"), ("杭", "hang"), ("武", "wu"),
+    ("汉", "han"), ("成", "cheng"), ("都", "du"), ("重", "chong"), ("庆", "qing"), ("长", "chang"),
+    ("沙", "sha"), ("郑", "zheng"), ("西", "xi"), ("安", "an"), ("太", "tai"), ("原", "yuan"),
+    ("济", "ji"), ("南", "nan"), ("青", "qing"), ("岛", "dao"), ("大", "da"), ("连", "lian"),
+    ("沈", "shen"), ("阳", "yang"), ("合", "he"), ("肥", "fei"), ("福", "fu"), ("昆", "kun"),
+    ("明", "ming"), ("兰", "lan"), ("宁", "ning"), ("贵", "gui"),
+]
+_SUFFIXES = [("", ""), ("北", "bei"), ("南", "nan"), ("东", "dong"), ("西", "xi")]
+
+# 省份（代码, 名称, 全拼, 简拼）
+_PROVINCES = [
+    ("11", "北京", "beijing", "bj"), ("12", "天津", "tianjin", "tj"), ("13", "河北", "hebei", "hb"),
+    ("14", "山西", "shanxi", "sx"), ("15", "内蒙古", "neimenggu", "nmg"), ("21", "辽宁", "liaoning", "ln"),
+    ("22", "吉林", "jilin", "jl"), ("23", "黑龙江", "heilongjiang", "hlj"), ("31", "上海", "shanghai", "sh"),
+    ("32", "江苏", "jiangsu", "js"), ("33", "浙江", "zhejiang", "zj"), ("34", "安徽", "anhui", "ah"),
+    ("35", "福建", "fujian", "fj"), ("36", "江西", "jiangxi", "jx"), ("37", "山东", "shandong", "sd"),
+    ("41", "河南", "henan", "hen"), ("42", "湖北", "hubei", "hub"), ("43", "湖南", "hunan", "hun"),
+    ("44", "广东", "guangdong", "gd"), ("45", "广西", "guangxi", "gx"), ("46", "海南", "hainan", "hain"),
+    ("50", "重庆", "chongqing", "cq"), ("51", "四川", "sichuan", "sc"), ("52", "贵州", "guizhou", "gz"),
+    ("53", "云南", "yunnan", "yn"), ("54", "西藏", "xizang", "xz"), ("61", "陕西", "shaanxi", "shx"),
+    ("62", "甘肃", "gansu", "gs"), ("63", "青海", "qinghai", "qh"), ("64", "宁夏", "ningxia", "nx"),
+    ("65", "新疆", "xinjiang", "xj"),
+]
+
+_SEAT_VALUES = ["有", "有", "无", "无", "", "--", "候补"] + [str(n) for n in range(1, 21)]
+
+
+# 三位大写字母电报码的数量，也是 make_stations 能生成的最多车站数
+MAX_STATIONS = 26 ** 3
+
+
+def _telecode(i):
+    """根据序号生成三位大写字母的电报码。"""
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return letters[(i // 676) % 26] + letters[(i // 26) % 26] + letters[i % 26]
+
+
+def make_stations(count, seed=12306):
+    """
+    生成 count 条车站记录（与 station_cache.STATION_FIELDS 顺序一致），前两条固定为北京和上海。
+    电报码为三位大写字母，count 超过 MAX_STATIONS 时抛出 ValueError。
+    """
+    if count > MAX_STATIONS:
+        raise ValueError(f"At most {MAX_STATIONS} stations can be generated (three-letter telecodes), got {count}.")
+    rng = random.Random(seed)
+    stations = [["bjp", "北京", "BJP", "beijing", "bj", "0"], ["sha", "上海", "SHH", "shanghai", "sh", "1"]]
+    names = {"北京", "上海"}
+    codes = {"BJP", "SHH"}
+    i = 0
+    while len(stations) < count:
+        (c1, p1), (c2, p2) = rng.choice(_CHARS), rng.choice(_CHARS)
+        suffix, suffix_py = rng.choice(_SUFFIXES)
+        name = c1 + c2 + suffix
+        if name in names:
+            if len(names) >= len(_CHARS) ** 2 * len(_SUFFIXES):
+                name = f"{name}{len(stations)}"  # 组合用尽后加序号，保证压力测试规模下站名唯一
+            else:
+                continue
+        code = _telecode(i)
+        i += 1
+        if code in codes:
+            continue
+        pinyin = p1 + p2 + suffix_py
+        short = p1[0] + p2[0] + (suffix_py[:1])
+        names.add(name)
+        codes.add(code)
+        stations.append([short[:3], name, code, pinyin, short, str(len(stations))])
+    return stations
+
+
+def make_station_js(stations):
+    """把车站记录拼成 station_name.js 的内容。"""
+    body = "".join("@" + "|".join(row) for row in stations)
+    return f"var station_names ='{body}';"
+
+
+def make_query_rows(count, from_code, to_code, train_date, seed=0):
+    """生成 count 行 queryZ 结果（'|' 分隔字符串），列布局与 ticket_parser.QUERY_FIELDS 一致。"""
+    rng = random.Random(f"{seed}-{train_date}-{from_code}-{to_code}")
+    width = len(QUERY_FIELDS) + 6  # 真实响应在已知列之后还有若干列
+    column = {name: i for i, name in enumerate(QUERY_FIELDS)}
+    rows = []
+    for n in range(count):
+        prefix = rng.choice("GDZTK")
+        number = f"{prefix}{rng.randint(1, 9999)}"
+        start = rng.randint(5 * 60, 23 * 60)
+        duration = rng.randint(40, 20 * 60)
+        arrive = (start + duration) % (24 * 60)
+        fields = [""] * width
+        fields[column["secret_str"]] = f"SECRET{n:06d}{train_date.replace('-', '')}"
+        fields[column["button_text"]] = "预订"
+        fields[column["train_no"]] = f"{n:06d}{number}0A"
+        fields[column["station_train_code"]] = number
+        fields[column["start_station_code"]] = from_code
+        fields[column["end_station_code"]] = to_code
+        fields[column["from_station_code"]] = from_code
+        fields[column["to_station_code"]] = to_code
+        fields[column["start_time"]] = f"{start // 60:02d}:{start % 60:02d}"
+        fields[column["arrive_time"]] = f"{arrive // 60:02d}:{arrive % 60:02d}"
+        fields[column["duration"]] = f"{duration // 60:02d}:{duration % 60:02d}"
+        fields[column["can_web_buy"]] = "Y"
+        fields[column["start_train_date"]] = train_date.replace("-", "")
+        fields[column["from_station_no"]] = "01"
+        fields[column["to_station_no"]] = f"{rng.randint(2, 20):02d}"
+        for name in ("swz_num", "zy_num", "ze_num", "wz_num") if prefix in "GD" else \
+                ("rw_num", "yw_num", "yz_num", "wz_num"):
+            fields[column[name]] = rng.choice(_SEAT_VALUES)
+        fields[column["seat_types"]] = "9MO" if prefix in "GD" else "431"
+        rows.append("|".join(fields))
+    return rows
+
+
+def make_query_response(count, from_code, to_code, train_date, station_names, seed=0):
+    """生成完整的 queryZ JSON 响应。"""
+    return {
+        "httpstatus": 200,
+        "status": True,
+        "messages": "",
+        "data": {
+            "flag": "1",
+            "result": make_query_rows(count, from_code, to_code, train_date, seed),
+            "map": {from_code: station_names.get(from_code, from_code), to_code: station_names.get(to_code, to_code)},
+        },
+    }
+
+
+def make_timetable(train_no, train_date, station_names, seed=0):
+    """生成 queryByTrainNo 响应：车次的经停站列表（站名、到达/发车时间、停留时间）。"""
+    rng = random.Random(f"{seed}-{train_no}-{train_date}")
+    names = rng.sample(sorted(station_names.values()), rng.randint(2, 12))
+    minute = rng.randint(5 * 60, 20 * 60)
+    stops = []
+    for n, name in enumerate(names, 1):
+        stopover = 0 if n in (1, len(names)) else rng.randint(2, 12)
+        arrive = "----" if n == 1 else f"{minute // 60 % 24:02d}:{minute % 60:02d}"
+        start = "----" if n == len(names) else f"{(minute + stopover) // 60 % 24:02d}:{(minute + stopover) % 60:02d}"
+        stops.append({"station_no": f"{n:02d}", "station_name": name, "arrive_time": arrive, "start_time": start,
+                      "stopover_time": f"{stopover}分钟" if stopover else "----", "isEnabled": True})
+        minute += stopover + rng.randint(20, 150)
+    return {"validateMessagesShowId": "_validatorMessage", "status": True, "httpstatus": 200,
+            "data": {"data": stops}, "messages": [], "validateMessages": {}}
+
+
+# queryTicketPrice 响应：座位类型代码 -> (价格键, 相对二等座/硬座的价格倍数)
+_FARE_KEYS = {"9": ("A9", 3.2), "P": ("P", 2.5), "M": ("M", 1.6), "O": ("O", 1.0), "6": ("A6", 3.0), "4": ("A4", 2.2),
+              "F": ("F", 2.0), "3": ("A3", 1.8), "2": ("A2", 1.3), "1": ("A1", 1.0)}
+
+
+def make_fares(train_no, from_no, to_no, seat_types, seed=0):
+    """生成 queryTicketPrice 响应：seat_types 中每个座位类型一个价格，另加无座。"""
+    rng = random.Random(f"{seed}-{train_no}-{from_no}-{to_no}")
+    base = rng.randint(20, 600)
+    data = {"train_no": train_no, "OT": []}
+    for code in seat_types:
+        if code in _FARE_KEYS:
+            key, factor = _FARE_KEYS[code]
+            data[key] = f"¥{base * factor:.1f}"
+    data["WZ"] = f"¥{base:.1f}"
+    return {"validateMessagesShowId": "_validatorMessage", "status": True, "httpstatus": 200,
+            "data": data, "messages": [], "validateMessages": {}}
+
+
+def make_provinces(count):
+    """生成 allProvince 的响应，count 超过真实省份数量时用带序号的名称补足（用于压力测试）。"""
+    data = []
+    for i in range(count):
+        code, name, pinyin, short = _PROVINCES[i % len(_PROVINCES)]
+        if i >= len(_PROVINCES):
+            code, name = f"{code}{i}", f"{name}{i}"
+        data.append({"chineseName": name, "allPin": pinyin, "simplePin": short,
+                     "stationTelecode": code, "initialPin": short[:1].upper(), "id": str(i)})
+    return {"validateMessagesShowId": "_validatorMessage", "status": True, "httpstatus": 200,
+            "data": data, "messages": [], "validateMessages": {}}
+
+
+# --- 页面 ---
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>登录 | 中国铁路12306</title></head>
+<body>
+<h1>12306 (local stand-in)</h1>
+<a id="J-login" href="#">立即登录</a>
+<script>
+  // 模拟人工登录：点击登录或等待 LOGIN_DELAY 毫秒后出现“我的12306”
+  function loggedIn() {
+    document.cookie = "tk=local-session; path=/";
+    var a = document.createElement("a"); a.href = "/otn/view/index.html"; a.textContent = "我的12306";
+    document.body.appendChild(a);
+  }
+  document.getElementById("J-login").onclick = function () { loggedIn(); return false; };
+  if (LOGIN_DELAY >= 0) setTimeout(loggedIn, LOGIN_DELAY);
+</script>
+</body></html>
+"""
+
+INDEX_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>我的12306</title></head>
+<body><a href="/otn/leftTicket/init">我的12306</a></body></html>
+"""
+
+CONFIRM_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>确认乘客 | 中国铁路12306</title></head>
+<body><h1>confirmPassenger (local stand-in)</h1></body></html>
+"""
+
+# 最小可用的查询页面：元素 ID 与真实页面一致，
+# 输入站名后出现候选列表，点击查询后调用 queryZ 并渲染 #queryLeftTable
+INIT_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>车票查询 | 中国铁路12306</title>
+<script src="/otn/resources/js/framework/station_name.js"></script>
+</head>
+<body>
+<input id="from_station_text" placeholder="请输入出发地"><input id="from_station" type="hidden">
+<div id="panel_cfx_fromStation"><ul></ul></div>
+<input id="to_station_text" placeholder="请输入目的地"><input id="to_station" type="hidden">
+<div id="panel_cfx_toStation"><ul></ul></div>
+<input id="train_date" readonly>
+<a id="query_ticket" href="javascript:">查询</a>
+<table id="queryLeftTable"><tbody></tbody></table>
+<script>
+  var stationCodes = {};
+  station_names.split("@").forEach(function (s) { var p = s.split("|"); if (p.length > 2) stationCodes[p[1]] = p[2]; });
+  function bindSuggest(textId, codeId, panelId) {
+    var input = document.getElementById(textId), list = document.querySelector("#" + panelId + " ul");
+    input.addEventListener("input", function () {
+      list.innerHTML = "";
+      var name = input.value;
+      if (stationCodes[name]) {
+        var li = document.createElement("li"), a = document.createElement("a");
+        a.href = "javascript:"; a.textContent = name;
+        a.onclick = function () { document.getElementById(codeId).value = stationCodes[name]; list.innerHTML = ""; };
+        li.appendChild(a); list.appendChild(li);
+      }
+    });
+  }
+  bindSuggest("from_station_text", "from_station", "panel_cfx_fromStation");
+  bindSuggest("to_station_text", "to_station", "panel_cfx_toStation");
+  var SEAT_CELLS = [["SWZ", 32], ["ZY", 31], ["ZE", 30], ["GR", 21], ["RW", 23], ["SRRB", 33],
+                    ["YW", 28], ["RZ", 24], ["YZ", 29], ["WZ", 26], ["QT", 22]];
+  var button = document.getElementById("query_ticket");
+  button.onclick = function () {
+    var from = document.getElementById("from_station").value || stationCodes[document.getElementById("from_station_text").value];
+    var to = document.getElementById("to_station").value || stationCodes[document.getElementById("to_station_text").value];
+    var date = document.getElementById("train_date").value;
+    button.style.display = "none";
+    var url = "/otn/leftTicket/queryZ?leftTicketDTO.train_date=" + encodeURIComponent(date) +
+              "&leftTicketDTO.from_station=" + from + "&leftTicketDTO.to_station=" + to + "&purpose_codes=ADULT";
+    fetch(url).then(function (r) { return r.json(); }).then(function (res) {
+      var body = document.querySelector("#queryLeftTable tbody"), map = res.data.map;
+      body.innerHTML = "";
+      res.data.result.forEach(function (item) {
+        var f = item.split("|"), tr = document.createElement("tr");
+        tr.id = "ticket_" + f[2];
+        var html = '<td><div class="train"><a class="number">' + f[3] + '</a></div>' +
+          '<div class="cdz"><strong class="start-s">' + (map[f[6]] || f[6]) + '</strong><strong class="end-s">' + (map[f[7]] || f[7]) + '</strong></div>' +
+          '<div class="cds"><strong class="start-t">' + f[8] + '</strong><strong class="color999">' + f[9] + '</strong></div>' +
+          '<div class="ls"><strong>' + f[10] + '</strong></div></td>';
+        SEAT_CELLS.forEach(function (c) { html += '<td id="' + c[0] + '_' + f[2] + '">' + (f[c[1]] || "--") + '</td>'; });
+        html += '<td class="no-br"><a class="btn72" href="/otn/confirmPassenger/initDc?secretStr=' + encodeURIComponent(f[0]) + '">预订</a></td>';
+        tr.innerHTML = html;
+        body.appendChild(tr);
+      });
+      button.style.display = "";
+    });
+  };
+</script>
+</body></html>
+"""
+
+
+# --- 服务器 ---
+
+class Fake12306Handler(BaseHTTPRequestHandler):
+    """处理请求；配置保存在 self.server 上（见 Fake12306Server）。"""
+
+    server_version = "Fake12306/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._handle()
+
+    def _send(self, status, body, content_type="application/json;charset=UTF-8", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _handle(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and server.rng.random() < server.error_rate:
+            self._send(503, {"status": False, "messages": ["网络可能存在问题，请您重试一下！"]},
+                       headers={"Retry-After": "1"})
+            return
+
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+        fixture = server.fixture_path(path)
+        if fixture:
+            with open(fixture, "rb") as f:
+                body = f.read()
+            content_type = "application/json;charset=UTF-8" if body[:1] in (b"{", b"[") else "text/html;charset=UTF-8"
+            self._send(200, body, content_type)
+            return
+
+        if path == "/otn/resources/js/framework/station_name.js":
+            if self.headers.get("If-None-Match") == server.station_etag:
+                self._send(304, b"", headers={"ETag": server.station_etag})
+                return
+            self._send(200, server.station_js, "application/javascript;charset=UTF-8",
+                       headers={"ETag": server.station_etag, "Last-Modified": server.started_at})
+        elif path in ("/otn/leftTicket/queryZ", "/otn/leftTicket/query"):
+            train_date = query.get("leftTicketDTO.train_date", "")
+            from_code = query.get("leftTicketDTO.from_station", "")
+            to_code = query.get("leftTicketDTO.to_station", "")
+            if not (train_date and from_code and to_code):
+                self._send(200, {"httpstatus": 200, "status": False, "messages": ["参数错误"]})
+                return
+            self._send(200, make_query_response(server.trains, from_code, to_code, train_date,
+                                                server.station_names, server.seed))
+        elif path == "/otn/czxx/queryByTrainNo":
+            self._send(200, make_timetable(query.get("train_no", ""), query.get("depart_date", ""),
+                                           server.station_names, server.seed))
+        elif path == "/otn/leftTicket/queryTicketPrice":
+            self._send(200, make_fares(query.get("train_no", ""), query.get("from_station_no", ""),
+                                       query.get("to_station_no", ""), query.get("seat_types", ""), server.seed))
+        elif path == "/otn/login/checkUser":
+            self._send(200, {"validateMessagesShowId": "_validatorMessage", "status": True, "httpstatus": 200,
+                             "data": {"flag": True}, "messages": [], "validateMessages": {}})
+        elif path == "/otn/userCommon/allProvince":
+            self._send(200, server.provinces)
+        elif path == "/otn/leftTicket/init":
+            self._send(200, INIT_PAGE, "text/html;charset=UTF-8")
+        elif path == "/otn/resources/login.html":
+            self._send(200, LOGIN_PAGE.replace("LOGIN_DELAY", str(server.login_delay_ms)), "text/html;charset=UTF-8")
+        elif path == "/otn/view/index.html":
+            # 与真实站点一样，未登录时跳转到登录页
+            if "tk=" not in self.headers.get("Cookie", ""):
+                self._send(302, "", "text/html;charset=UTF-8", {"Location": "/otn/resources/login.html"})
+            else:
+                self._send(200, INDEX_PAGE, "text/html;charset=UTF-8")
+        elif path.startswith("/otn/confirmPassenger/"):
+            self._send(200, CONFIRM_PAGE, "text/html;charset=UTF-8")
+        else:
+            self._send(404, {"status": False, "messages": [f"Unknown path {path}"]})
+
+
+class Fake12306Server(ThreadingHTTPServer):
+    """
+    本地替身服务器。
+    stations/trains/provinces 控制响应大小；latency 为每个请求注入的延迟（秒）；
+    error_rate 为随机返回 503 的概率；fixtures 为录制响应所在目录（按请求路径查找文件）。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8306, stations=3300, trains=60, provinces=31,
+                 latency=0.0, error_rate=0.0, fixtures=None, login_delay_ms=0, seed=0, verbose=False):
+        super().__init__((host, port), Fake12306Handler)
+        self.trains = trains
+        self.latency = latency
+        self.error_rate = error_rate
+        # 转换为绝对路径，fixture_path 才能判断请求路径是否在目录内
+        self.fixtures = os.path.abspath(fixtures) if fixtures else None
+        self.login_delay_ms = login_delay_ms
+        self.seed = seed
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.started_at = formatdate(usegmt=True)
+
+        station_rows = make_stations(stations, seed=12306 + seed)
+        self.station_names = {row[2]: row[1] for row in station_rows}
+        self.station_js = make_station_js(station_rows)
+        self.station_etag = f'"stations-{stations}-{seed}"'
+        self.provinces = make_provinces(provinces)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fixture_path(self, path):
+        """返回请求路径对应的录制文件（如果存在）。"""
+        if not self.fixtures:
+            return None
+        candidate = os.path.normpath(os.path.join(self.fixtures, path.lstrip("/")))
+        if os.path.commonpath([candidate, self.fixtures]) == self.fixtures and os.path.isfile(candidate):
+            return candidate
+        return None
+
+    def start(self):
+        """在后台线程中运行服务器（用于基准测试），返回 self。"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local 12306 stand-in server for offline testing and benchmarking.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8306)
+    parser.add_argument("--stations", type=int, default=3300, help=f"number of stations in station_name.js (at most {MAX_STATIONS})")
+    parser.add_argument("--trains", type=int, default=60, help="number of trains per queryZ response")
+    parser.add_argument("--provinces", type=int, default=31, help="number of allProvince records")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected latency per request, in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of answering 503")
+    parser.add_argument("--fixtures", help="directory of recorded responses, looked up by request path")
+    parser.add_argument("--login-delay", type=int, default=0,
+                        help="milliseconds before the login page shows '我的12306' (-1: only after clicking)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = Fake12306Server(args.host, args.port, stations=args.stations, trains=args.trains,
+                             provinces=args.provinces, latency=args.latency / 1000.0, error_rate=args.error_rate,
+                             fixtures=args.fixtures, login_delay_ms=args.login_delay, seed=args.seed,
+                             verbose=args.verbose)
+    print(f"Fake 12306 server listening on {server.base_url} "
+          f"({args.stations} stations, {args.trains} trains per query, started {datetime.now():%H:%M:%S})")
+    print(f"Run the scripts with: TICKET_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
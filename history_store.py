@@ -0,0 +1,238 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 余票历史库：每个从网络获取的 queryZ 结果作为一个快照追加到本地 SQLite 文件（见 config.HISTORY_DB），
+# 按 查询时间、乘车日期、车站对、车次、座位类别 建立索引，用于查询余票的变化趋势。
+# 记录时只把原始响应放进内存缓冲区，攒够一批（或程序退出时）才在一个事务中解析并写入，
+# 因此查询流程几乎没有额外开销。读取前会先写入缓冲区中的数据。
+#
+# 用法：
+#   python history_store.py train G101 --date 2026-10-20 --last 10
+#   python history_store.py sellout 2026-10-20 --from BJP --to SHH
+
+import os
+import time
+import atexit
+import argparse
+import threading
+from datetime import datetime
+
+from config import HISTORY_DB
+from ticket_parser import SEAT_CLASSES, QueryLayoutError, parse_query_response
+from tracing import span
+
+# 缓冲区中攒够多少个快照后写入一次
+FLUSH_EVERY = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    queried_at REAL NOT NULL,
+    train_date TEXT NOT NULL,
+    from_code TEXT NOT NULL,
+    to_code TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS availability (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    train_code TEXT NOT NULL,
+    seat_class TEXT NOT NULL,
+    seats INTEGER NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_trip ON snapshots (train_date, from_code, to_code, queried_at);
+CREATE INDEX IF NOT EXISTS availability_by_train ON availability (train_code, seat_class, snapshot_id);
+CREATE INDEX IF NOT EXISTS availability_by_snapshot ON availability (snapshot_id);
+"""
+
+
+class HistoryStore:
+    """余票快照的批量写入与按索引读取。线程安全。"""
+
+    def __init__(self, path=HISTORY_DB, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self._pending = []  # (查询时间, 乘车日期, 出发站, 到达站, 原始 JSON 响应)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            import sqlite3
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            # WAL + NORMAL：追加写入不需要每次同步到磁盘
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    # --- 写入 ---
+
+    def record_response(self, train_date, from_code, to_code, response_json, queried_at=None):
+        """登记一个 queryZ 响应（不解析，只放入缓冲区）。"""
+        with self._lock:
+            self._pending.append((queried_at or time.time(), train_date, from_code, to_code, response_json))
+            full = len(self._pending) >= self.flush_every
+        if full:
+            self.flush()
+
+    def flush(self):
+        """解析缓冲区中的所有快照并在一个事务中写入，返回写入的余票行数。"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            written = 0
+            with span("history.flush", snapshots=len(pending)) as s:
+                conn = self._connect()
+                with conn:
+                    for queried_at, train_date, from_code, to_code, response_json in pending:
+                        try:
+                            trains = parse_query_response(response_json)
+                        except QueryLayoutError as e:
+                            print(f"Warning: skipped a history snapshot with an unexpected layout: {e}")
+                            continue
+                        snapshot_id = conn.execute(
+                            "INSERT INTO snapshots (queried_at, train_date, from_code, to_code) VALUES (?, ?, ?, ?)",
+                            (queried_at, train_date, from_code, to_code)).lastrowid
+                        rows = self._availability_rows(snapshot_id, trains)
+                        conn.executemany("INSERT INTO availability (snapshot_id, train_code, seat_class, seats, raw) "
+                                         "VALUES (?, ?, ?, ?, ?)", rows)
+                        written += len(rows)
+                s.set(rows=written)
+            return written
+
+    @staticmethod
+    def _availability_rows(snapshot_id, trains):
+        codes = trains['station_train_code']
+        rows = []
+        for seat_class, column in SEAT_CLASSES.items():
+            counts = trains.seat_counts(seat_class)
+            raw = trains[column]
+            # 不提供的座位类别（None）不记录
+            rows.extend((snapshot_id, codes[i], seat_class, counts[i], raw[i])
+                        for i in range(len(trains)) if counts[i] is not None)
+        return rows
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- 读取 ---
+
+    def _query(self, sql, params):
+        self.flush()
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def train_history(self, train_code, train_date=None, seat_class=None, last=10):
+        """
+        某车次最近 last 个快照中的余票，按查询时间从新到旧：
+        [(查询时间, 乘车日期, 出发站, 到达站, 座位类别, 余票数, 原始文字)]。
+        """
+        # 先按索引取出该车次（该乘车日期）最近的 last 个快照，再取这些快照中的各座位类别
+        recent = "SELECT a.snapshot_id FROM availability a JOIN snapshots s ON s.id = a.snapshot_id WHERE a.train_code = ?"
+        params = [train_code]
+        if train_date:
+            recent += " AND s.train_date = ?"
+            params.append(train_date)
+        recent += " GROUP BY a.snapshot_id ORDER BY a.snapshot_id DESC LIMIT ?"
+        params.append(last)
+        sql = ("SELECT s.queried_at, s.train_date, s.from_code, s.to_code, a.seat_class, a.seats, a.raw "
+               "FROM availability a JOIN snapshots s ON s.id = a.snapshot_id "
+               f"WHERE a.train_code = ? AND a.snapshot_id IN ({recent})")
+        params.insert(0, train_code)
+        if seat_class:
+            sql += " AND a.seat_class = ?"
+            params.append(seat_class)
+        sql += " ORDER BY s.queried_at DESC, a.seat_class"
+        return self._query(sql, params)
+
+    def sellout_times(self, train_date, from_code=None, to_code=None, seat_class=None):
+        """
+        乘车日期 train_date 的各车次、各座位类别第一次从有票变为无票的时间：
+        [(车次, 出发站, 到达站, 座位类别, 售罄时间)]，按售罄时间排序。
+        """
+        where = ["s.train_date = ?"]
+        params = [train_date]
+        for column, value in (("s.from_code", from_code), ("s.to_code", to_code), ("a.seat_class", seat_class)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        sql = f"""
+            SELECT train_code, from_code, to_code, seat_class, MIN(queried_at) FROM (
+                SELECT a.train_code, s.from_code, s.to_code, a.seat_class, a.seats, s.queried_at,
+                       LAG(a.seats) OVER (PARTITION BY a.train_code, s.from_code, s.to_code, a.seat_class
+                                          ORDER BY s.queried_at) AS previous
+                FROM snapshots s JOIN availability a ON a.snapshot_id = s.id
+                WHERE {' AND '.join(where)}
+            )
+            WHERE seats = 0 AND previous > 0
+            GROUP BY train_code, from_code, to_code, seat_class
+            ORDER BY MIN(queried_at)
+        """
+        return self._query(sql, params)
+
+
+_history_store = None
+_history_lock = threading.Lock()
+
+
+def history_store():
+    """返回进程内共享的历史库（第一次调用时创建）；config.HISTORY_DB 为空时返回 None。"""
+    global _history_store
+    if not HISTORY_DB:
+        return None
+    with _history_lock:
+        if _history_store is None:
+            _history_store = HistoryStore(HISTORY_DB)
+            atexit.register(_history_store.close)
+        return _history_store
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the local ticket availability history.")
+    parser.add_argument("--db", default=HISTORY_DB, help=f"history database (default: {HISTORY_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train", help="availability of one train over the last snapshots")
+    train.add_argument("train_code")
+    train.add_argument("--date", help="travel date YYYY-MM-DD")
+    train.add_argument("--seat", choices=list(SEAT_CLASSES))
+    train.add_argument("--last", type=int, default=10, help="number of snapshots (default: 10)")
+    sellout = commands.add_parser("sellout", help="when seats for a travel date ran out")
+    sellout.add_argument("train_date")
+    sellout.add_argument("--from", dest="from_code")
+    sellout.add_argument("--to", dest="to_code")
+    sellout.add_argument("--seat", choices=list(SEAT_CLASSES))
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No history database at {args.db}.")
+        return 1
+    store = HistoryStore(args.db)
+    if args.command == "train":
+        rows = store.train_history(args.train_code, args.date, args.seat, args.last)
+        for queried_at, train_date, from_code, to_code, seat_class, seats, raw in rows:
+            print(f"{_format_time(queried_at)}  {train_date}  {from_code}->{to_code}  {seat_class:<22} {raw}")
+    else:
+        rows = store.sellout_times(args.train_date, args.from_code, args.to_code, args.seat)
+        for train_code, from_code, to_code, seat_class, sold_out_at in rows:
+            print(f"{train_code:<8} {from_code}->{to_code}  {seat_class:<22} sold out by {_format_time(sold_out_at)}")
+    if not rows:
+        print("No matching history.")
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
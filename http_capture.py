@@ -0,0 +1,301 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 录制与回放：把共享会话 (http_client.shared_session) 的真实请求/响应保存到一个紧凑的归档文件，
+# 之后在离线测试和基准测试中原样回放。
+# 归档是一个 SQLite 文件：响应体按内容的 SHA-256 去重，用 zlib 压缩后只保存一份；
+# 每次交互记录 方法、路径、查询参数、状态码、少量响应头和响应体摘要，并按 (方法, 路径, 查询参数) 建立索引。
+# 录制前会去掉 Cookie、登录令牌等请求参数，以及 JSON 响应中的个人信息字段；请求体不保存。
+#
+# 用法：
+#   TICKET_HTTP_CAPTURE=capture.sqlite python GetTicketsIfo.py --batch itineraries.csv   # 录制
+#   TICKET_HTTP_REPLAY=capture.sqlite python GetTicketsIfo.py --batch itineraries.csv    # 离线全速回放
+#   python http_capture.py summary capture.sqlite
+#   python http_capture.py export capture.sqlite fixtures/     # 导出为 fake_12306.py --fixtures 目录
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+from http.client import responses as HTTP_REASONS
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from http_client import POOL_CONNECTIONS, POOL_MAXSIZE, RateLimiter
+from tracing import count
+
+# 不录制的请求参数（登录令牌、防重复提交令牌、时间戳等）
+SENSITIVE_PARAMS = {"tk", "uamtk", "_json_att", "REPEAT_SUBMIT_TOKEN", "globalRepeatSubmitToken", "_"}
+# JSON 响应中替换为空字符串的字段（乘客和账户信息）。只用明确的字段名，车站、省份等公开数据保持原样
+SENSITIVE_KEYS = {
+    "user_name", "login_name", "username", "passenger_name", "passenger_id_no", "passenger_id_type_name",
+    "id_no", "idno", "mobile_no", "phone_no", "email", "address", "born_date", "sex_code", "apptk", "newapptk",
+    "uamtk", "tk",
+}
+# 账户接口的路径前缀：这些响应中的通用字段（例如 name）也是个人信息，额外替换 ACCOUNT_KEYS
+ACCOUNT_PATHS = ("/otn/login/", "/otn/index/", "/otn/modifyUser/", "/otn/userSecurity/")
+ACCOUNT_KEYS = SENSITIVE_KEYS | {"name", "user_type", "id_type_code"}
+# 只记录状态码、不保存响应体的路径前缀（页面中含有乘客或订单信息）
+PRIVATE_PATHS = ("/otn/confirmPassenger/", "/otn/passengers/", "/otn/queryOrder/", "/passport/")
+# 保存的响应头（Set-Cookie 等都不保存）
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After", "Location")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exchanges (
+    id INTEGER PRIMARY KEY,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    query TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    digest TEXT NOT NULL REFERENCES bodies(digest),
+    elapsed_ms REAL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exchanges_by_request ON exchanges (method, path, query);
+"""
+
+
+def request_key(method, url):
+    """把请求转换为 (方法, 路径, 规范化的查询参数)：参数排序，并去掉 SENSITIVE_PARAMS。"""
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SENSITIVE_PARAMS)
+    return method.upper(), parts.path, urlencode(params)
+
+
+def _scrub(value, keys):
+    if isinstance(value, dict):
+        return {k: ("" if k in keys and isinstance(v, (str, int, float)) else _scrub(v, keys))
+                for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub(v, keys) for v in value]
+    return value
+
+
+def sanitize_body(path, content, content_type):
+    """
+    去掉响应体中的个人信息：私密页面不保存响应体，JSON 中的 SENSITIVE_KEYS 替换为空字符串
+    （账户接口 ACCOUNT_PATHS 替换 ACCOUNT_KEYS）。
+    """
+    if path.startswith(PRIVATE_PATHS):
+        return b""
+    if "json" in (content_type or "") or content[:1] in (b"{", b"["):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return content
+        scrubbed = _scrub(data, ACCOUNT_KEYS if path.startswith(ACCOUNT_PATHS) else SENSITIVE_KEYS)
+        if scrubbed != data:
+            return json.dumps(scrubbed, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return content
+
+
+class CaptureArchive:
+    """录制归档的读写。线程安全。"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._cursors = {}  # 回放时同一请求有多个响应时依次返回
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM exchanges").fetchone()[0]
+
+    def record(self, method, url, status, headers, content, elapsed_ms=None):
+        """保存一次交互（先清理请求参数、响应头和响应体）。"""
+        method, path, query = request_key(method, url)
+        kept = {name: headers[name] for name in KEPT_HEADERS if name in headers}
+        body = sanitize_body(path, content or b"", kept.get("Content-Type"))
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock, self._conn:
+            # 相同的响应体只压缩和保存一次
+            if self._conn.execute("SELECT 1 FROM bodies WHERE digest = ?", (digest,)).fetchone() is None:
+                self._conn.execute("INSERT INTO bodies (digest, size, data) VALUES (?, ?, ?)",
+                                   (digest, len(body), zlib.compress(body, 6)))
+                count("capture.body_stored")
+            else:
+                count("capture.body_deduplicated")
+            self._conn.execute("INSERT INTO exchanges (method, path, query, status, headers, digest, elapsed_ms, "
+                               "recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (method, path, query, status, json.dumps(kept), digest, elapsed_ms, time.time()))
+
+    def _body(self, digest):
+        row = self._conn.execute("SELECT data FROM bodies WHERE digest = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]) if row else b""
+
+    def lookup(self, method, url, loose=False):
+        """
+        返回请求对应的录制响应 (状态码, 响应头字典, 响应体)，没有时返回 None。
+        同一请求录制了多次时按录制顺序轮流返回；loose 为 True 时查询参数不同也可以使用同一路径的响应。
+        """
+        key = request_key(method, url)
+        with self._lock:
+            rows = self._conn.execute("SELECT status, headers, digest FROM exchanges "
+                                      "WHERE method = ? AND path = ? AND query = ? ORDER BY id", key).fetchall()
+            if not rows and loose:
+                key = key[:2]
+                rows = self._conn.execute("SELECT status, headers, digest FROM exchanges "
+                                          "WHERE method = ? AND path = ? ORDER BY id", key).fetchall()
+            if not rows:
+                return None
+            n = self._cursors.get(key, 0)
+            self._cursors[key] = n + 1
+            status, headers, digest = rows[n % len(rows)]
+            return status, json.loads(headers), self._body(digest)
+
+    def bodies(self, path, method="GET"):
+        """按首次录制的顺序返回某个路径所有不同的响应体（用于基准测试）。"""
+        with self._lock:
+            digests = self._conn.execute("SELECT digest FROM exchanges WHERE method = ? AND path = ? AND status = 200 "
+                                         "GROUP BY digest ORDER BY MIN(id)", (method, path)).fetchall()
+            return [self._body(digest) for digest, in digests]
+
+    def summary(self):
+        """每个路径的 (方法, 路径, 交互数, 不同响应体数, 所有响应体的原始字节数, 去重压缩后的字节数)。"""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT e.method, e.path, COUNT(*), COUNT(DISTINCT e.digest), SUM(b.size),
+                       (SELECT SUM(LENGTH(data)) FROM bodies
+                        WHERE digest IN (SELECT digest FROM exchanges WHERE method = e.method AND path = e.path))
+                FROM exchanges e JOIN bodies b ON b.digest = e.digest
+                GROUP BY e.method, e.path ORDER BY COUNT(*) DESC
+            """).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CaptureAdapter(HTTPAdapter):
+    """正常发送请求，并把每次收到的响应（包括重试）记录到归档中。"""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.archive.record(request.method, request.url, response.status_code, response.headers, response.content,
+                            round(response.elapsed.total_seconds() * 1000, 3))
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """不访问网络，从归档中返回录制的响应；归档中没有的请求以 ConnectionError 失败。"""
+
+    def __init__(self, archive, loose=False):
+        super().__init__()
+        self.archive = archive
+        self.loose = loose
+
+    def send(self, request, **kwargs):
+        entry = self.archive.lookup(request.method, request.url, self.loose)
+        if entry is None:
+            count("replay.miss")
+            raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {request.url}",
+                                                      request=request)
+        count("replay.hit")
+        status, headers, body = entry
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = HTTP_REASONS.get(status, "")
+        return response
+
+    def close(self):
+        pass
+
+
+def install_capture(session, path):
+    """让会话在正常请求的同时录制到 path。返回归档对象。"""
+    archive = CaptureArchive(path)
+    adapter = CaptureAdapter(archive, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return archive
+
+
+def install_replay(session, path, loose=False):
+    """让会话从 path 回放录制的响应。回放时去掉限速和重试，按最快速度返回。返回归档对象。"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Capture archive {path} does not exist")
+    archive = CaptureArchive(path)
+    adapter = ReplayAdapter(archive, loose)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if hasattr(session, "limiter"):
+        session.limiter = RateLimiter(intervals={}, default_interval=0, global_interval=0)
+        session.retries = 0
+    return archive
+
+
+def export_fixtures(archive, directory):
+    """把每个 GET 路径最后一次成功的响应体写入 directory（fake_12306.py --fixtures 的目录结构），返回文件数。"""
+    written = 0
+    for method, path, *_ in archive.summary():
+        if method != "GET" or path.endswith("/"):
+            continue
+        bodies = archive.bodies(path)
+        if not bodies:
+            continue
+        target = os.path.normpath(os.path.join(directory, path.lstrip("/")))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(bodies[-1])
+        written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or export an HTTP capture archive.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summary", help="requests, distinct bodies and sizes per endpoint")
+    summary.add_argument("archive")
+    export = commands.add_parser("export", help="write the latest body per path as fake_12306 fixtures")
+    export.add_argument("archive")
+    export.add_argument("directory")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"Capture archive {args.archive} does not exist.")
+        return 1
+    archive = CaptureArchive(args.archive)
+    if args.command == "summary":
+        rows = archive.summary()
+        print(f"{'method':<7}{'path':<45}{'requests':>9}{'bodies':>8}{'raw KiB':>10}{'stored KiB':>12}")
+        for method, path, requests_count, bodies, raw, stored in rows:
+            print(f"{method:<7}{path:<45}{requests_count:>9}{bodies:>8}{raw / 1024:>10.1f}{stored / 1024:>12.1f}")
+        raw_total = sum(row[4] for row in rows)
+        print(f"Archive file: {os.path.getsize(args.archive) / 1024:.1f} KiB for {raw_total / 1024:.1f} KiB of responses.")
+    else:
+        print(f"Wrote {export_fixtures(archive, args.directory)} fixture files to {args.directory}.")
+    archive.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,193 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 共享的 HTTP 客户端：统一的请求头、连接池、超时、有限次数的重试（遵守 Retry-After），
+# 以及按接口限速的令牌桶。原来散落在各处的 time.sleep 反爬虫延迟都由限速器代替，
+# 所有请求（包括重试）都要先拿到令牌，因此请求频率不会超过原来的节奏。
+
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_TIMEOUT, HTTP_RETRIES, HTTP_CAPTURE, HTTP_REPLAY
+from tracing import span
+
+# --- 配置 ---
+# 使用更完整的请求头字典是模仿真实浏览器的常见做法。
+# Accept-Language 设置为中文，因为我们是在模拟访问中文网站
+BASE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",  # 优先中文，兼容英文
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Cache-Control": "max-age=0"
+}
+
+# 每个接口两次请求之间的最小间隔（秒），对应原来脚本中的 time.sleep
+ENDPOINT_INTERVALS = {
+    "/otn/leftTicket/queryZ": 2.0,
+    "/otn/leftTicket/query": 2.0,
+    "/otn/userCommon/allProvince": 3.0,
+    "/otn/czxx/queryByTrainNo": 1.0,
+    "/otn/leftTicket/queryTicketPrice": 1.0,
+    "/otn/leftTicket/submitOrderRequest": 1.0,
+}
+DEFAULT_INTERVAL = 1.0
+# 所有接口合计的最小间隔
+GLOBAL_INTERVAL = 0.5
+
+# 需要重试的状态码，以及允许自动重试的方法（只重试幂等请求）
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = ("GET", "HEAD", "OPTIONS")
+BACKOFF_BASE = 1.0  # 第 n 次重试前等待 BACKOFF_BASE * 2**n 秒
+MAX_RETRY_WAIT = 60.0
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+
+# --- 限速 ---
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，capacity 为桶容量（capacity=1 即最小间隔）。"""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now):
+        """预订一个令牌，返回需要等待的秒数（令牌可以透支，等待结束时正好补足）。"""
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """按接口路径限速，同时有一个全局令牌桶。线程安全。"""
+
+    def __init__(self, intervals=None, default_interval=DEFAULT_INTERVAL, global_interval=GLOBAL_INTERVAL):
+        self.intervals = dict(ENDPOINT_INTERVALS if intervals is None else intervals)
+        self.default_interval = default_interval
+        self.global_bucket = TokenBucket(1.0 / global_interval) if global_interval > 0 else None
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, endpoint):
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            interval = self.intervals.get(endpoint, self.default_interval)
+            bucket = self.buckets[endpoint] = TokenBucket(1.0 / interval) if interval > 0 else None
+        return bucket
+
+    def acquire(self, endpoint):
+        """阻塞直到允许向 endpoint 发送请求，返回实际等待的秒数。"""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(endpoint)
+            wait = bucket.reserve(now) if bucket else 0.0
+            if self.global_bucket:
+                wait = max(wait, self.global_bucket.reserve(now))
+        if wait > 0:
+            with span("http.rate_limit_wait", endpoint=endpoint, seconds=round(wait, 3)):
+                time.sleep(wait)
+        return wait
+
+
+# 所有会话共享一个限速器，这样即使创建了多个会话也不会加快请求节奏
+rate_limiter = RateLimiter()
+
+
+# --- 会话 ---
+
+def retry_after_seconds(response):
+    """解析 Retry-After 头（秒数或 HTTP 日期），没有或无法解析时返回 None。"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PoliteSession(requests.Session):
+    """带默认超时、限速和重试的会话。"""
+
+    def __init__(self, limiter=None, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES):
+        super().__init__()
+        self.limiter = limiter or rate_limiter
+        self.timeout = timeout
+        self.retries = retries
+        self.headers.update(BASE_HEADERS)
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        endpoint = urlsplit(url).path
+        retryable = method.upper() in RETRY_METHODS
+        attempt = 0
+        while True:
+            self.limiter.acquire(endpoint)
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not retryable or attempt >= self.retries:
+                    raise
+                wait = BACKOFF_BASE * 2 ** attempt
+            else:
+                if response.status_code not in RETRY_STATUSES or not retryable or attempt >= self.retries:
+                    return response
+                wait = retry_after_seconds(response)
+                if wait is None:
+                    wait = BACKOFF_BASE * 2 ** attempt
+                response.close()
+            attempt += 1
+            with span("http.retry_wait", endpoint=endpoint, attempt=attempt, seconds=round(wait, 3)):
+                time.sleep(min(wait, MAX_RETRY_WAIT))
+
+
+def create_session(**options):
+    """创建一个新的会话（共享全局限速器）。"""
+    return PoliteSession(**options)
+
+
+_shared_session = None
+_shared_lock = threading.Lock()
+
+
+def shared_session():
+    """
+    返回进程内共享的会话（第一次调用时创建），用于复用连接池和 Cookie。
+    设置了 HTTP_REPLAY / HTTP_CAPTURE 时会话从录制归档回放或同时录制（见 http_capture）。
+    """
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+            if HTTP_REPLAY or HTTP_CAPTURE:
+                from http_capture import install_capture, install_replay
+                if HTTP_REPLAY:
+                    install_replay(_shared_session, HTTP_REPLAY)
+                else:
+                    install_capture(_shared_session, HTTP_CAPTURE)
+        return _shared_session
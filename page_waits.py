@@ -0,0 +1,140 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 事件驱动的页面等待：在页面中安装 MutationObserver 和导航钩子（history.pushState /
+# popstate / hashchange），条件满足时通过 execute_async_script 的回调立即返回，
+# 不再每隔 0.5 秒向 WebDriver 轮询一次。返回值是页面内测得的从开始等待到条件满足的毫秒数。
+# 页面跳转（文档卸载）时自动在新页面上重新安装观察器，直到超时。
+#
+# 用法：
+#   arm(driver, "results", "document.querySelector('#queryLeftTable tbody tr')")  # 点击之前安装
+#   query_button.click()
+#   ms = wait_for(driver, "document.querySelector('#queryLeftTable tbody tr')", 20, key="results")
+#   wait_for_url(driver, "confirmPassenger", 300)
+
+import time
+
+# 单次 execute_async_script 的最长阻塞时间（秒）。
+# Selenium 客户端的 HTTP 超时默认为 120 秒，较长的等待会被拆成多次调用
+CHUNK_SECONDS = 60.0
+
+# 在页面中安装一个等待：条件 __CONDITION__ 在每次 DOM 变化或地址变化时重新计算，
+# 满足时记录时间并唤醒所有等待中的回调
+_INSTALL = """
+var waits = window.__ticketWaits = window.__ticketWaits || {};
+var key = arguments[0], checkNow = arguments[1];
+if (waits[key] && waits[key].observer) waits[key].observer.disconnect();
+var w = waits[key] = {start: performance.now(), met: null, resolvers: [], observer: null};
+var check = function () {
+  if (w.met !== null) return;
+  var ok = false;
+  try { ok = !!(__CONDITION__); } catch (e) { ok = false; }
+  if (!ok) return;
+  w.met = performance.now();
+  w.observer.disconnect();
+  w.resolvers.splice(0).forEach(function (r) { r({met: true, ms: w.met - w.start}); });
+};
+w.observer = new MutationObserver(check);
+w.observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+if (!window.__ticketHistoryHooked) {
+  window.__ticketHistoryHooked = true;
+  var notify = function () {
+    var all = window.__ticketWaits || {};
+    for (var k in all) if (all[k].check) all[k].check();
+  };
+  ['pushState', 'replaceState'].forEach(function (name) {
+    var original = history[name];
+    history[name] = function () { var result = original.apply(this, arguments); notify(); return result; };
+  });
+  window.addEventListener('popstate', notify);
+  window.addEventListener('hashchange', notify);
+}
+w.check = check;
+if (checkNow) check();
+"""
+
+# 等待已安装的条件：已满足则立即返回；否则登记回调，直到条件满足、页面卸载或本次调用超时
+_AWAIT = """
+var done = arguments[arguments.length - 1];
+var key = arguments[0], timeoutMs = arguments[2];
+var waits = window.__ticketWaits || {};
+if (!waits[key]) {
+  (function () { __INSTALL__ }).apply(null, [key, arguments[1]]);
+  waits = window.__ticketWaits;
+}
+var w = waits[key];
+var finish = function (result) {
+  clearTimeout(timer);
+  window.removeEventListener('pagehide', onHide);
+  if (result.met) delete waits[key];
+  done(result);
+};
+if (w.met !== null) { delete waits[key]; done({met: true, ms: w.met - w.start}); return; }
+var onHide = function () { finish({met: false, unloading: true, ms: performance.now() - w.start}); };
+var timer = setTimeout(function () {
+  var i = w.resolvers.indexOf(finish);
+  if (i >= 0) w.resolvers.splice(i, 1);
+  finish({met: false, ms: performance.now() - w.start});
+}, timeoutMs);
+w.resolvers.push(finish);
+window.addEventListener('pagehide', onHide);
+"""
+
+
+def _install_script(condition):
+    return _INSTALL.replace("__CONDITION__", condition)
+
+
+def _await_script(condition):
+    return _AWAIT.replace("__INSTALL__", _install_script(condition))
+
+
+def arm(driver, key, condition):
+    """
+    提前安装一个等待（例如在点击查询按钮之前），之后用同一个 key 调用 wait_for。
+    安装时不检查条件，只有之后的 DOM 变化才能满足它，因此上一次查询留下的结果不会被误认为新结果。
+    """
+    driver.execute_script(_install_script(condition), key, False)
+
+
+def wait_for(driver, condition, timeout, key=None, message=None):
+    """
+    阻塞直到 JavaScript 表达式 condition 为真，返回页面内测得的等待毫秒数；超时抛出 TimeoutException。
+    key 相同的等待如果已经用 arm() 安装，则沿用它（从安装时开始计时）。
+    """
+    from selenium.common.exceptions import TimeoutException, JavascriptException, ScriptTimeoutException
+
+    key = key or condition
+    script = _await_script(condition)
+    deadline = time.monotonic() + timeout
+    elapsed_ms = 0.0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutException(message or f"Condition not met within {timeout} s: {condition}")
+        chunk = min(remaining, CHUNK_SECONDS)
+        driver.set_script_timeout(chunk + 5)
+        try:
+            result = driver.execute_async_script(script, key, True, int(chunk * 1000))
+        except (JavascriptException, ScriptTimeoutException):
+            # 页面在等待期间跳转（文档卸载），在新页面上重新安装
+            result = None
+        if result and result.get("met"):
+            return round(elapsed_ms + result.get("ms", 0.0), 1)
+        if result and result.get("unloading"):
+            # 旧页面上已经等待的时间；新页面从重新安装时开始计时
+            elapsed_ms += result.get("ms", 0.0)
+
+
+def wait_for_url(driver, fragment, timeout, message=None):
+    """阻塞直到当前地址包含 fragment（整页跳转和 history 导航都能立即检测到），返回等待毫秒数。"""
+    condition = f"location.href.indexOf({fragment!r}) >= 0"
+    return wait_for(driver, condition, timeout, key=f"url:{fragment}",
+                    message=message or f"URL did not contain '{fragment}' within {timeout} s")
+
+
+def selector_condition(css):
+    """CSS 选择器存在的条件表达式。"""
+    return f"document.querySelector({css!r}) !== null"
@@ -0,0 +1,317 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 按阶段的 CPU 和内存分析（--profile）。计时阶段（tracing.span）只说明时间花在哪一步，
+# 这里用 cProfile（确定性分析）说明每一步中哪些函数耗时，用 tracemalloc 说明哪些代码行分配了内存。
+# 整个运行期间，每个线程的最外层阶段（例如 stations.get_index、batch.itinerary）使用各自的分析器，
+# 不在任何阶段中的部分记入 main。内存只在调用 attach() 的线程上按阶段统计：
+# 每次运行的峰值和净增加的内存，以及第一次运行中净增加最多的代码行（后台线程同时分配的内存也会计入）。
+# 快照按代码行分组的开销与已分配的块数成正比，所以每个阶段只在第一次运行时拍快照，分组留到写出报告时进行。
+# 结束时写出：
+#   <目录>/<阶段>.prof   每个阶段的 cProfile 数据（python -m pstats 或 snakeviz 查看）
+#   <目录>/cpu.txt       每个阶段累计耗时最多的函数
+#   <目录>/allocations.txt 每个阶段分配最多的代码行，以及退出时仍占用内存最多的代码行
+#
+# 用法：
+#   profiling.enable("profile")           # 整个运行，退出时写出报告（入口脚本的 --profile）
+#   profiler = Profiler("profile")        # 只分析指定的代码段（benchmark.py --profile）
+#   with profiler.phase("station_parse"):
+#       parse_station_names(js)
+#   profiler.write()
+
+import io
+import os
+import re
+import sys
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+from config import PROFILE_DIR, PROFILE_TOP
+from tracing import add_listener, remove_listener
+
+MAIN_PHASE = "main"
+
+# 不计入内存报告的分配（分析工具自身、导入机制）。按分组后的代码行过滤，逐块过滤太慢
+_EXCLUDED_FILES = {tracemalloc.__file__, __file__, "<unknown>"}
+_EXCLUDED_PREFIXES = ("<frozen importlib.",)
+
+
+def _file_name(phase):
+    return re.sub(r"[^\w.-]", "_", phase) or "phase"
+
+
+def _included(stat):
+    filename = stat.traceback[0].filename
+    return filename not in _EXCLUDED_FILES and not filename.startswith(_EXCLUDED_PREFIXES)
+
+
+def _site(filename, lineno):
+    """缩短文件路径：本目录下的文件只保留文件名。"""
+    relative = os.path.relpath(filename)
+    return f"{filename if relative.startswith('..') else relative}:{lineno}"
+
+
+class _Frame:
+    """线程中一个正在分析的阶段。"""
+
+    __slots__ = ("phase", "profile", "owner", "memory")
+
+    def __init__(self, phase, profile, owner, memory):
+        self.phase = phase
+        self.profile = profile
+        self.owner = owner  # 开始该阶段的 Span（phase() 开始的阶段为 None）
+        self.memory = memory  # (开始时的快照或 None, 开始时的内存, 是否由本阶段启动 tracemalloc)，不统计内存时为 None
+
+
+class Profiler:
+    """按阶段收集 cProfile 和 tracemalloc 数据。线程安全。"""
+
+    def __init__(self, directory=PROFILE_DIR, top=PROFILE_TOP):
+        self.directory = directory
+        self.top = top
+        self._profiles = {}  # 阶段 -> [cProfile.Profile]（每个线程一个，写出时合并）
+        self._memory = {}  # 阶段 -> {"calls", "peak", "net", "snapshots": 第一次运行开始和结束时的快照}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._owner = None  # attach() 所在的线程
+        self._own_tracemalloc = False
+        self._peak = 0
+        self._final = None  # detach() 时的内存快照
+        self._started = None
+        self._elapsed = None
+
+    # --- 阶段 ---
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _profile_for(self, phase):
+        profiles = getattr(self._local, "profiles", None)
+        if profiles is None:
+            profiles = self._local.profiles = {}
+        profile = profiles.get(phase)
+        if profile is None:
+            profile = profiles[phase] = cProfile.Profile()
+            with self._lock:
+                self._profiles.setdefault(phase, []).append(profile)
+        return profile
+
+    def _push(self, phase, owner=None, memory=False):
+        stack = self._stack()
+        if stack and stack[-1].profile:
+            stack[-1].profile.disable()
+        frame = _Frame(phase, self._profile_for(phase), owner, self._memory_begin(phase) if memory else None)
+        try:
+            frame.profile.enable()
+        except ValueError:
+            # 同一时间只能有一个分析器（例如 Python 3.12 起后台线程无法单独分析）
+            frame.profile = None
+        stack.append(frame)
+
+    def _pop(self):
+        stack = self._stack()
+        frame = stack.pop()
+        if frame.profile:
+            frame.profile.disable()
+        if frame.memory:
+            self._memory_end(frame.phase, *frame.memory)
+        if stack and stack[-1].profile:
+            try:
+                stack[-1].profile.enable()
+            except ValueError:
+                stack[-1].profile = None
+
+    @contextmanager
+    def phase(self, name):
+        """把代码段作为一个阶段分析 CPU 和内存（没有运行 tracemalloc 时只在代码段内运行）。"""
+        self._push(name, memory=True)
+        try:
+            yield self
+        finally:
+            self._pop()
+
+    # --- 内存 ---
+
+    def _memory_begin(self, phase):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        with self._lock:
+            first = phase not in self._memory
+        before = tracemalloc.take_snapshot() if first else None
+        size, peak = tracemalloc.get_traced_memory()
+        self._peak = max(self._peak, peak)
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            tracemalloc.reset_peak()
+        return before, size, started
+
+    def _memory_end(self, phase, before, start_size, started):
+        size, peak = tracemalloc.get_traced_memory()
+        self._peak = max(self._peak, peak)
+        after = tracemalloc.take_snapshot() if before is not None else None
+        if started:
+            tracemalloc.stop()
+        with self._lock:
+            memory = self._memory.setdefault(phase, {"calls": 0, "peak": 0, "net": 0, "snapshots": None})
+            memory["calls"] += 1
+            memory["peak"] = max(memory["peak"], peak - start_size)
+            memory["net"] += size - start_size
+            if after is not None and memory["snapshots"] is None:
+                memory["snapshots"] = (before, after)
+
+    def phase_allocations(self, phase, limit=None):
+        """阶段第一次运行中净增加内存最多的代码行：[(位置, 字节, 块数)]。"""
+        with self._lock:
+            snapshots = (self._memory.get(phase) or {}).get("snapshots")
+        if snapshots is None:
+            return []
+        before, after = snapshots
+        diff = [stat for stat in after.compare_to(before, "lineno") if stat.size_diff and _included(stat)]
+        diff.sort(key=lambda stat: abs(stat.size_diff), reverse=True)
+        return [(_site(stat.traceback[0].filename, stat.traceback[0].lineno), stat.size_diff, stat.count_diff)
+                for stat in diff[:limit or self.top]]
+
+    # --- 整个运行 ---
+
+    def attach(self):
+        """开始分析整个运行：当前线程进入 main 阶段，之后每个线程的最外层计时阶段各自分析。"""
+        self._owner = threading.get_ident()
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        self._push(MAIN_PHASE)
+        add_listener(self._enter, self._exit)
+
+    def detach(self):
+        """停止分析，记录退出时的内存快照。"""
+        remove_listener(self._enter, self._exit)
+        while self._stack():
+            self._pop()
+        if tracemalloc.is_tracing():
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            self._final = tracemalloc.take_snapshot()
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _enter(self, span):
+        stack = self._stack()
+        if threading.get_ident() == self._owner:
+            # 主线程：main 之下的最外层阶段
+            if len(stack) == 1:
+                self._push(span.phase, owner=span, memory=True)
+        elif not stack:
+            self._push(span.phase, owner=span)
+
+    def _exit(self, span):
+        stack = self._stack()
+        if stack and stack[-1].owner is span:
+            self._pop()
+
+    # --- 输出 ---
+
+    def stats(self):
+        """合并后的每个阶段的 pstats.Stats：{阶段: Stats}，没有调用记录的阶段不包括在内。"""
+        result = {}
+        with self._lock:
+            phases = {phase: list(profiles) for phase, profiles in self._profiles.items()}
+        for phase, profiles in phases.items():
+            merged = None
+            for profile in profiles:
+                profile.create_stats()
+                if not profile.stats:
+                    continue
+                if merged is None:
+                    merged = pstats.Stats(profile)
+                else:
+                    merged.add(profile)
+            if merged is not None:
+                result[phase] = merged
+        return result
+
+    def top_allocations(self, limit=None):
+        """退出时（detach 之后）占用内存最多的代码行：[(位置, 字节, 块数)]。"""
+        if self._final is None:
+            return []
+        stats = [stat for stat in self._final.statistics("lineno") if _included(stat)]
+        return [(_site(stat.traceback[0].filename, stat.traceback[0].lineno), stat.size, stat.count)
+                for stat in stats[:limit or self.top]]
+
+    def write(self):
+        """写出每个阶段的 .prof 文件和 cpu.txt / allocations.txt 报告，返回阶段汇总 [(阶段, 耗时秒, 调用次数)]。"""
+        os.makedirs(self.directory, exist_ok=True)
+        stats = self.stats()
+        phases = sorted(stats.items(), key=lambda item: item[1].total_tt, reverse=True)
+        for phase, phase_stats in phases:
+            phase_stats.dump_stats(os.path.join(self.directory, f"{_file_name(phase)}.prof"))
+
+        with open(os.path.join(self.directory, "cpu.txt"), "w", encoding="utf-8") as f:
+            for phase, phase_stats in phases:
+                f.write(f"=== {phase}: {phase_stats.total_tt:.3f} s, {phase_stats.total_calls} calls ===\n")
+                stream = io.StringIO()
+                phase_stats.stream = stream
+                phase_stats.sort_stats("cumulative").print_stats(self.top)
+                f.write(stream.getvalue().split("\n\n", 1)[-1].strip("\n") + "\n\n")
+
+        with open(os.path.join(self.directory, "allocations.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Peak traced memory: {self._peak / 1024:.1f} KiB\n\n")
+            with self._lock:
+                memory = sorted(self._memory.items(), key=lambda item: item[1]["peak"], reverse=True)
+            for phase, usage in memory:
+                f.write(f"=== {phase}: {usage['calls']} run(s), peak {usage['peak'] / 1024:.1f} KiB, "
+                        f"net {usage['net'] / 1024:+.1f} KiB; first run by line ===\n")
+                for site, size, blocks in self.phase_allocations(phase):
+                    f.write(f"{size / 1024:>+12.1f} KiB {blocks:>+9} blocks  {site}\n")
+                f.write("\n")
+            allocations = self.top_allocations()
+            if allocations:
+                f.write("=== still allocated at exit ===\n")
+                for site, size, blocks in allocations:
+                    f.write(f"{size / 1024:>12.1f} KiB {blocks:>9} blocks  {site}\n")
+        return [(phase, phase_stats.total_tt, phase_stats.total_calls) for phase, phase_stats in phases]
+
+    def print_summary(self, phases, file=None):
+        """打印 write() 返回的阶段汇总和内存占用。"""
+        file = file or sys.stdout
+        with self._lock:
+            memory = dict(self._memory)
+        print("\n--- Profile Summary ---", file=file)
+        if self._elapsed is not None:
+            print(f"Profiled {self._elapsed:.2f} s; peak traced memory {self._peak / 1024:.1f} KiB.", file=file)
+        print(f"{'phase':<36} {'profiled s':>10} {'calls':>10} {'peak KiB':>10} {'net KiB':>10}", file=file)
+        for phase, seconds, calls in phases:
+            usage = memory.get(phase)
+            peak = f"{usage['peak'] / 1024:.1f}" if usage else "-"
+            net = f"{usage['net'] / 1024:+.1f}" if usage else "-"
+            print(f"{phase:<36} {seconds:>10.3f} {calls:>10} {peak:>10} {net:>10}", file=file)
+        print(f"Profiles and reports written to {os.path.abspath(self.directory)} "
+              f"(cpu.txt, allocations.txt, <phase>.prof).", file=file)
+
+
+_profiler = None
+
+
+def enable(directory=PROFILE_DIR, top=PROFILE_TOP):
+    """开始分析整个运行，程序退出时写出报告并打印汇总。重复调用返回同一个分析器。"""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(directory, top)
+        _profiler.attach()
+        atexit.register(_finish)
+    return _profiler
+
+
+def _finish():
+    _profiler.detach()
+    _profiler.print_summary(_profiler.write())
@@ -0,0 +1,250 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 省份（代售点）数据集：把 allProvince 的结果保存在本地 SQLite 文件中（见 config.PROVINCE_DB），
+# 按 代码、名称、城市（响应中有城市字段时）建立索引，之后的查找都在本地完成。
+# 重新获取时与上一次的快照比较，只写入新增、变化和删除的记录；数据没有变化时不写任何内容。
+# 查找使用第一次访问时载入内存的字典，不需要再查询数据库。
+#
+# 用法：
+#   store = ProvinceStore()
+#   added, changed, removed = store.sync(content_json['data'])
+#   store.get("北京") / store.get("11") / store.by_pinyin("beijing") / store.in_city("广州")
+#   provinces, session = get_provinces_data()   # 两个入口脚本共用：有效期内使用本地数据，否则获取并增量更新
+
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+import requests
+
+from config import BASE_URL, EXPORT_FORMAT, PROVINCE_DB, PROVINCE_CACHE_TTL
+from exporters import export_records
+from http_client import BASE_HEADERS, shared_session
+from tracing import span
+
+# 记录中可能表示城市的字段（allProvince 的记录通常没有城市）
+CITY_KEYS = ("city", "cityName", "city_name")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS provinces (
+    key TEXT PRIMARY KEY,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    pinyin TEXT NOT NULL,
+    city TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS provinces_by_code ON provinces (code);
+CREATE INDEX IF NOT EXISTS provinces_by_name ON provinces (name);
+CREATE INDEX IF NOT EXISTS provinces_by_city ON provinces (city);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _record_key(record):
+    """记录的唯一键：优先用 id，没有时用代码和名称。"""
+    return str(record.get('id') or f"{record.get('stationTelecode', '')}:{record.get('chineseName', '')}")
+
+
+def _city(record):
+    for key in CITY_KEYS:
+        if record.get(key):
+            return str(record[key])
+    return ""
+
+
+def _digest(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class ProvinceStore:
+    """本地省份数据集。sync() 增量更新，get()/by_code()/by_name()/in_city() 在内存中查找。线程安全。"""
+
+    def __init__(self, path=PROVINCE_DB):
+        import sqlite3
+
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._loaded = None  # 载入内存的索引，数据变化后重新载入
+
+    # --- 更新 ---
+
+    def sync(self, records):
+        """
+        用新获取的完整记录列表更新数据集，返回 (新增数, 变化数, 删除数)。
+        整个快照与上一次相同时直接返回 (0, 0, 0)。
+        """
+        rows = {}
+        for record in records:
+            data = json.dumps(record, ensure_ascii=False, sort_keys=True)
+            rows[_record_key(record)] = (record, data, _digest(data))
+        snapshot = _digest("".join(sorted(digest for _, _, digest in rows.values())))
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('fetched_at', ?)", (str(now),))
+            previous = self._conn.execute("SELECT value FROM meta WHERE name = 'snapshot'").fetchone()
+            if previous and previous[0] == snapshot:
+                return 0, 0, 0
+            existing = dict(self._conn.execute("SELECT key, digest FROM provinces"))
+            upserts = []
+            added = changed = 0
+            for key, (record, data, digest) in rows.items():
+                old = existing.get(key)
+                if old == digest:
+                    continue
+                if old is None:
+                    added += 1
+                else:
+                    changed += 1
+                upserts.append((key, str(record.get('stationTelecode', '')), str(record.get('chineseName', '')),
+                                str(record.get('allPin', '')).lower(), _city(record), digest, data, now))
+            removed = [(key,) for key in existing if key not in rows]
+            self._conn.executemany("INSERT OR REPLACE INTO provinces (key, code, name, pinyin, city, digest, data, "
+                                   "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+            self._conn.executemany("DELETE FROM provinces WHERE key = ?", removed)
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('snapshot', ?)", (snapshot,))
+            if upserts or removed:
+                self._loaded = None
+            return added, changed, len(removed)
+
+    def fetched_at(self):
+        """上一次 sync() 的时间，从未获取过时为 None。"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'fetched_at'").fetchone()
+        return float(row[0]) if row else None
+
+    def is_fresh(self, ttl):
+        fetched_at = self.fetched_at()
+        return fetched_at is not None and time.time() - fetched_at < ttl
+
+    # --- 查找 ---
+
+    def _index(self):
+        """返回内存索引（第一次访问或数据变化后从数据库载入）。"""
+        loaded = self._loaded
+        if loaded is None:
+            with self._lock:
+                rows = self._conn.execute("SELECT code, name, pinyin, city, data FROM provinces ORDER BY code, name")
+                loaded = {"records": [], "code": {}, "name": {}, "pinyin": {}, "city": {}}
+                for code, name, pinyin, city, data in rows:
+                    record = json.loads(data)
+                    loaded["records"].append(record)
+                    loaded["code"].setdefault(code, record)
+                    loaded["name"].setdefault(name, record)
+                    loaded["pinyin"].setdefault(pinyin, record)
+                    if city:
+                        loaded["city"].setdefault(city, []).append(record)
+                self._loaded = loaded
+        return loaded
+
+    def __len__(self):
+        return len(self._index()["records"])
+
+    def records(self):
+        """所有记录（按代码排序）。"""
+        return list(self._index()["records"])
+
+    def by_code(self, code):
+        return self._index()["code"].get(code)
+
+    def by_name(self, name):
+        return self._index()["name"].get(name)
+
+    def by_pinyin(self, pinyin):
+        return self._index()["pinyin"].get(pinyin.lower())
+
+    def in_city(self, city):
+        """某个城市的所有记录（记录中没有城市字段时为空列表）。"""
+        return list(self._index()["city"].get(city, ()))
+
+    def get(self, text):
+        """按名称、代码或全拼查找一条记录，找不到时返回 None。"""
+        text = text.strip()
+        return self.by_name(text) or self.by_code(text) or self.by_pinyin(text)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_province_store = None
+_province_lock = threading.Lock()
+
+
+def province_store():
+    """返回进程内共享的省份数据集（第一次调用时打开），内存索引在多次查找之间复用。"""
+    global _province_store
+    with _province_lock:
+        if _province_store is None:
+            _province_store = ProvinceStore(PROVINCE_DB)
+        return _province_store
+
+
+# --- 获取 ---
+
+def save_provinces_data(records, directory='.', export_format=EXPORT_FORMAT):
+    """把省份数据流式写入带时间戳的文件（格式见 config.EXPORT_FORMAT），返回文件名；没有数据时返回 None。"""
+    if not records:
+        print("No province data found in the response.")
+        return None
+
+    curr_time = datetime.now()
+    timestamp = datetime.strftime(curr_time, '%Y-%m-%d_%H-%M-%S')
+    filename = os.path.join(directory, f"national_train_agency_provinces-{timestamp}.{export_format}")
+    with span("provinces.export", records=len(records), format=export_format):
+        count = export_records(records, filename, name="provinces")
+    print(f"Province data saved to {filename}!")
+    print(f"Retrieved {count} province records.")
+    return filename
+
+
+def get_provinces_data(refresh=False):
+    """
+    获取省份数据。本地数据集在 PROVINCE_CACHE_TTL 内直接使用，不发送请求；
+    过期或 refresh 为 True 时重新获取，与上一次的快照比较后增量更新，只有数据变化时才保存新的导出文件。
+    """
+    url = f"{BASE_URL}/otn/userCommon/allProvince"
+    try:
+        # 共享会话：连接池、超时、重试和限速（同一接口至少间隔 3 秒）见 http_client
+        session = shared_session()
+        store = province_store()
+        if not refresh and len(store) and store.is_fresh(PROVINCE_CACHE_TTL):
+            print(f"Using {len(store)} locally stored province records.")
+            return store.records(), session
+        with span("http.allProvince") as s:
+            response = session.get(url=url, headers=BASE_HEADERS, timeout=10)
+            s.http(response)
+        response.raise_for_status()
+        content_json = response.json()
+
+        provinces = content_json['data']
+        with span("provinces.sync", records=len(provinces)) as s:
+            added, changed, removed = store.sync(provinces)
+            s.set(added=added, changed=changed, removed=removed)
+        print(f"Province data: {added} added, {changed} changed, {removed} removed.")
+        if added or changed or removed:
+            save_provinces_data(provinces)
+        return provinces, session
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching province data: {e}")
+        return None, None
+    except KeyError as e:
+        print(f"Error parsing JSON response: Missing key {e}")
+        return None, None
+    except Exception as e:  # 捕获其他潜在错误
+        print(f"An unknown error occurred: {e}")
+        return None, None
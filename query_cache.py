@@ -0,0 +1,158 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 余票查询结果缓存：键为 (train_date, from_code, to_code, purpose_codes)，
+# 有较短的有效期 (TTL)，内存中按 LRU 淘汰，可选一层 SQLite 磁盘缓存。
+# 命中、未命中和过期都会通过 tracing.count 记录。
+# 磁盘缓存在第一次读写时才打开（导入模块不会创建文件，也不会加载 sqlite3）。
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from config import QUERY_CACHE_TTL, QUERY_CACHE_SIZE, QUERY_CACHE_DISK
+from tracing import count
+
+
+def query_key(train_date, from_code, to_code, purpose_codes="ADULT"):
+    """生成缓存键。"""
+    return (train_date, from_code.upper(), to_code.upper(), purpose_codes)
+
+
+class QueryCache:
+    """带 TTL 的 LRU 缓存，值为可 JSON 序列化的对象（queryZ 的原始响应）。线程安全。"""
+
+    def __init__(self, ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_SIZE, disk_path=QUERY_CACHE_DISK or None,
+                 name="query_cache"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.name = name
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._disk = None  # 磁盘缓存的连接，第一次使用时由 _open_disk() 打开
+
+    def _open_disk(self):
+        """返回磁盘缓存的连接（需要时打开），没有启用磁盘缓存时返回 None。调用方持有锁。"""
+        if self._disk is None and self.disk_path:
+            import sqlite3
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            self._disk = sqlite3.connect(self.disk_path, check_same_thread=False)
+            with self._disk:
+                self._disk.execute("CREATE TABLE IF NOT EXISTS entries "
+                                   "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)")
+        return self._disk
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _fresh(self, stored_at, now):
+        return now - stored_at < self.ttl
+
+    def get_entry(self, key):
+        """返回 (写入时间, 值)，没有或已过期时返回 None。"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[0], now):
+                    self._entries.move_to_end(key)
+                    count(f"{self.name}.hit", tier="memory")
+                    return entry
+                del self._entries[key]
+                count(f"{self.name}.expired")
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                self._store(key, entry)
+                count(f"{self.name}.hit", tier="disk")
+                return entry
+        count(f"{self.name}.miss")
+        return None
+
+    def get(self, key):
+        """返回缓存的值，没有或已过期时返回 None。"""
+        entry = self.get_entry(key)
+        return entry[1] if entry is not None else None
+
+    def put(self, key, value):
+        """写入一个值（同时写入磁盘缓存，如果启用）。"""
+        entry = (time.time(), value)
+        with self._lock:
+            self._store(key, entry)
+            disk = self._open_disk()
+            if disk is not None:
+                with disk:
+                    disk.execute("INSERT OR REPLACE INTO entries (key, stored_at, value) VALUES (?, ?, ?)",
+                                 (json.dumps(key), entry[0], json.dumps(value, ensure_ascii=False)))
+
+    def fresh_keys(self):
+        """返回所有仍在有效期内的 {键: 写入时间}（内存和磁盘），不计入命中统计。"""
+        now = time.time()
+        with self._lock:
+            keys = {}
+            disk = self._open_disk()
+            if disk is not None:
+                rows = disk.execute("SELECT key, stored_at FROM entries WHERE stored_at > ?", (now - self.ttl,))
+                keys.update((tuple(json.loads(key)), stored_at) for key, stored_at in rows)
+            keys.update((key, entry[0]) for key, entry in self._entries.items() if self._fresh(entry[0], now))
+            return keys
+
+    def peek(self, key):
+        """读取 (写入时间, 值) 但不改变 LRU 顺序、不计入统计；没有或已过期时返回 None。"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry[0], now):
+                return entry
+            disk = self._open_disk()
+            if disk is None:
+                return None
+            row = disk.execute("SELECT stored_at, value FROM entries WHERE key = ?", (json.dumps(key),)).fetchone()
+            if row is None or not self._fresh(row[0], now):
+                return None
+            return row[0], json.loads(row[1])
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            disk = self._open_disk()
+            if disk is not None:
+                with disk:
+                    disk.execute("DELETE FROM entries WHERE key = ?", (json.dumps(key),))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            disk = self._open_disk()
+            if disk is not None:
+                with disk:
+                    disk.execute("DELETE FROM entries")
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            count(f"{self.name}.evicted")
+
+    def _disk_get(self, key, now):
+        disk = self._open_disk()
+        if disk is None:
+            return None
+        row = disk.execute("SELECT stored_at, value FROM entries WHERE key = ?", (json.dumps(key),)).fetchone()
+        if row is None:
+            return None
+        if not self._fresh(row[0], now):
+            with disk:
+                disk.execute("DELETE FROM entries WHERE key = ?", (json.dumps(key),))
+            return None
+        return row[0], json.loads(row[1])
+
+
+# 进程内共享的查询缓存
+query_cache = QueryCache()
@@ -0,0 +1,54 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 只读地提取查询页面上已经渲染的 #queryLeftTable：一次 execute_script 调用读出所有行，
+# 转换为与 HTTP 查询相同的 TrainResultSet（见 ticket_parser.parse_table_rows），
+# 这样浏览器流程和 HTTP 流程共用同样的筛选和导出。
+# 逐个元素读取需要几百次 WebDriver 往返，这里只需要一次。
+
+from ticket_parser import TABLE_SEAT_CELLS, parse_table_rows
+from tracing import span
+
+# 在页面中读取所有车次行（id 为 ticket_<内部车次编号>），返回 JSON 可序列化的列表
+_EXTRACT_SCRIPT = """
+var prefixes = arguments[0], rows = [];
+var text = function (root, css) { var el = root.querySelector(css); return el ? el.textContent.trim() : ''; };
+var trs = document.querySelectorAll('#queryLeftTable tbody tr[id^="ticket_"]');
+for (var i = 0; i < trs.length; i++) {
+  var tr = trs[i], trainNo = tr.id.substring(7), seats = {};
+  for (var j = 0; j < prefixes.length; j++) {
+    var cell = document.getElementById(prefixes[j] + '_' + trainNo);
+    if (cell && tr.contains(cell)) seats[prefixes[j]] = cell.textContent.trim();
+  }
+  var secret = '', book = tr.querySelector('a.btn72, td.no-br a');
+  if (book) {
+    var source = book.getAttribute('href') || '', match = /[?&]secretStr=([^&]*)/.exec(source);
+    if (!match) match = /'([^']+)'/.exec(book.getAttribute('onclick') || '');
+    if (match) { try { secret = decodeURIComponent(match[1]); } catch (e) { secret = match[1]; } }
+  }
+  rows.push({
+    train_no: trainNo,
+    station_train_code: text(tr, 'a.number'),
+    from_station: text(tr, 'strong.start-s'),
+    to_station: text(tr, 'strong.end-s'),
+    start_time: text(tr, 'strong.start-t'),
+    arrive_time: text(tr, 'strong.color999'),
+    duration: text(tr, 'div.ls strong'),
+    button_text: book ? book.textContent.trim() : '',
+    secret_str: secret,
+    seats: seats
+  });
+}
+return rows;
+"""
+
+
+def extract_results(driver, station_index=None):
+    """读取页面上的查询结果表格，返回 TrainResultSet；station_index 用于把站名换回电报码。"""
+    with span("page.extract_results") as s:
+        rows = driver.execute_script(_EXTRACT_SCRIPT, list(TABLE_SEAT_CELLS)) or []
+        trains = parse_table_rows(rows, station_index.get if station_index else None)
+        s.set(rows=len(trains))
+    return trains
@@ -0,0 +1,165 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 页面元素定位器注册表：每个逻辑字段（出发站、到达站、日期、查询按钮、车站候选列表）
+# 有一组候选定位器。所有候选在一次 execute_script 调用中同时探测，
+# 命中的定位器会写入本地文件，下次排在最前面。
+# 页面结构变化时只需要一次快速探测，而不是一个接一个地等待超时。
+#
+# 用法：
+#   registry = SelectorRegistry()
+#   date_input = registry.probe(driver, "train_date")                     # 不等待，找不到返回 None
+#   link = registry.find(driver, "from_station_suggestion", timeout=10, name="北京")  # 等待，超时抛出 TimeoutException
+
+import os
+import json
+
+from config import CACHE_DIR
+from tracing import count
+
+# --- 配置 ---
+SELECTOR_CACHE_FILE = os.path.join(CACHE_DIR, "selectors.json")
+
+# 缓存文件格式版本。格式变化时递增，旧版本的缓存会被直接忽略
+CACHE_VERSION = 1
+
+# 逻辑字段 -> 候选定位器 (策略, 值)。策略为 id / css / xpath，值中的 {name} 在查找时替换为站名。
+# **重要**: 页面结构变化时，用浏览器开发者工具 (F12) 找到新的选择器并加到对应列表中
+SELECTORS = {
+    "from_station_text": [
+        ("id", "from_station_text"),
+        ("css", "input[placeholder='请输入出发地']"),
+        ("css", "input[name='leftTicketDTO.from_station_name']"),
+    ],
+    # 隐藏的电报码输入框
+    "from_station": [
+        ("id", "from_station"),
+        ("css", "input[name='leftTicketDTO.from_station']"),
+    ],
+    "to_station_text": [
+        ("id", "to_station_text"),
+        ("css", "input[placeholder='请输入目的地']"),
+        ("css", "input[name='leftTicketDTO.to_station_name']"),
+    ],
+    "to_station": [
+        ("id", "to_station"),
+        ("css", "input[name='leftTicketDTO.to_station']"),
+    ],
+    "train_date": [
+        ("id", "train_date"),
+        ("css", "input[name='leftTicketDTO.train_date']"),
+    ],
+    "query_ticket": [
+        ("id", "query_ticket"),
+        ("xpath", "//a[normalize-space(.)='查询']"),
+    ],
+    "from_station_suggestion": [
+        ("xpath", "//div[@id='panel_cfx_fromStation']//li[contains(., '{name}')]//a"),
+        ("xpath", "//div[@id='citem_fromStation']//li[contains(., '{name}')]//a"),
+        ("xpath", "//div[@id='panel_cfx_fromStation']//*[normalize-space(.)='{name}']"),
+    ],
+    "to_station_suggestion": [
+        ("xpath", "//div[@id='panel_cfx_toStation']//li[contains(., '{name}')]//a"),
+        ("xpath", "//div[@id='citem_toStation']//li[contains(., '{name}')]//a"),
+        ("xpath", "//div[@id='panel_cfx_toStation']//*[normalize-space(.)='{name}']"),
+    ],
+}
+
+# 隐藏的输入框不要求可见
+HIDDEN_FIELDS = ("from_station", "to_station")
+
+# 在页面中依次尝试所有候选，返回 [候选序号, 元素]；都找不到时返回 null
+_PROBE_SCRIPT = """
+var candidates = arguments[0], visible = arguments[1];
+for (var i = 0; i < candidates.length; i++) {
+  var how = candidates[i][0], what = candidates[i][1], el = null;
+  try {
+    if (how === 'id') el = document.getElementById(what);
+    else if (how === 'css') el = document.querySelector(what);
+    else if (how === 'xpath') el = document.evaluate(what, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  } catch (e) { el = null; }
+  if (el && (!visible || (el.getClientRects().length > 0 && !el.disabled))) return [i, el];
+}
+return null;
+"""
+
+
+class SelectorRegistry:
+    """按逻辑字段管理候选定位器，并记住上次命中的那一个。"""
+
+    def __init__(self, path=SELECTOR_CACHE_FILE, selectors=None):
+        self.path = path
+        self.selectors = {field: list(candidates) for field, candidates in (selectors or SELECTORS).items()}
+        self.learned = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cache.get('version') != CACHE_VERSION:
+            return {}
+        return {field: tuple(locator) for field, locator in cache.get('selectors', {}).items()}
+
+    def candidates(self, field):
+        """返回字段的候选定位器，上次命中的排在最前面。"""
+        candidates = list(self.selectors.get(field, ()))
+        learned = self.learned.get(field)
+        if learned:
+            if learned in candidates:
+                candidates.remove(learned)
+            candidates.insert(0, learned)
+        if not candidates:
+            raise KeyError(f"No selectors registered for '{field}'")
+        return candidates
+
+    def _remember(self, field, locator, index):
+        count("selectors.hit", field=field, index=index)
+        if index > 0:
+            count("selectors.fallback", field=field)
+        if self.learned.get(field) != locator:
+            self.learned[field] = locator
+            self._save()
+
+    def _save(self):
+        """原子地写入命中记录，写入失败只打印警告。"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'selectors': self.learned}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not write selector cache {self.path}: {e}")
+
+    def _probe(self, driver, field, values):
+        candidates = self.candidates(field)
+        script_args = [[how, what.format(**values) if values else what] for how, what in candidates]
+        found = driver.execute_script(_PROBE_SCRIPT, script_args, field not in HIDDEN_FIELDS)
+        if not found:
+            return None
+        index, element = found
+        self._remember(field, candidates[index], index)
+        return element
+
+    def probe(self, driver, field, **values):
+        """在一次 execute_script 调用中探测字段的所有候选，返回第一个找到的元素，找不到时返回 None。"""
+        element = self._probe(driver, field, values)
+        if element is None:
+            count("selectors.miss", field=field)
+        return element
+
+    def find(self, driver, field, timeout=10, poll=0.2, **values):
+        """反复探测直到找到元素，超时抛出 TimeoutException（与 WebDriverWait 一致）。"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=poll).until(
+                lambda d: self._probe(d, field, values))
+        except TimeoutException:
+            count("selectors.miss", field=field)
+            raise TimeoutException(f"Could not locate '{field}' with any of {len(self.candidates(field))} selectors")
@@ -0,0 +1,183 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 浏览器与 HTTP 会话之间的 Cookie 桥：用户在 Chrome 中登录后，把 12306 的 Cookie 复制到共享会话 (http_client)，
+# 之后的只读查询（车站表、经停站、login/checkUser 登录状态检查）直接用 HTTP 请求完成，不再打开页面。
+# 两个方向都只同步变化过的 Cookie：pull() 把浏览器中的新值交给会话，push() 把会话收到的新值
+# （例如服务器刷新的 JSESSIONID）写回浏览器，然后再交给用户在浏览器中继续操作。
+# 读取和写入浏览器 Cookie 优先使用 DevTools 协议（不需要先打开 12306 的页面），不支持时退回到 WebDriver 接口。
+#
+# 用法：
+#   bridge = SessionBridge(driver, shared_session())
+#   bridge.pull()            # 浏览器 -> 会话
+#   bridge.check_user()      # 通过 HTTP 检查登录状态
+#   bridge.push()            # 会话 -> 浏览器（回到浏览器操作之前）
+#   bridge.switch(driver)    # 换成另一个浏览器，下一次 push() 写入全部 Cookie
+
+import json
+from urllib.parse import urlsplit
+
+import requests
+
+from config import BASE_URL
+from http_client import BASE_HEADERS
+from tracing import span
+
+CHECK_USER_URL = f"{BASE_URL}/otn/login/checkUser"
+
+
+def _domain_matches(domain, host):
+    domain = domain.lstrip('.')
+    return host == domain or host.endswith('.' + domain)
+
+
+def _cookie_key(cookie):
+    return cookie['name'], cookie['domain'], cookie['path']
+
+
+def browser_cookies(driver, host):
+    """
+    读取浏览器中属于 host 的 Cookie（统一为 name/value/domain/path/secure/httpOnly/expires 字典）。
+    优先通过 DevTools 读取所有 Cookie；不支持时只能读到当前页面的 Cookie，页面不在 host 上时返回 None（无法判断）。
+    """
+    from selenium.common.exceptions import WebDriverException
+
+    try:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+    except (AttributeError, KeyError, WebDriverException):
+        try:
+            if urlsplit(driver.current_url).hostname != host:
+                return None
+            cookies = driver.get_cookies()
+        except WebDriverException:
+            return None
+    result = []
+    for cookie in cookies:
+        domain = cookie.get('domain') or host
+        if not _domain_matches(domain, host):
+            continue
+        # DevTools 用 expires（会话 Cookie 为 -1），WebDriver 用 expiry
+        expires = cookie.get('expires', cookie.get('expiry'))
+        result.append({'name': cookie['name'], 'value': cookie['value'], 'domain': domain,
+                       'path': cookie.get('path') or '/', 'secure': bool(cookie.get('secure')),
+                       'httpOnly': bool(cookie.get('httpOnly')),
+                       'expires': int(expires) if expires is not None and expires > 0 else None})
+    return result
+
+
+def set_browser_cookies(driver, cookies):
+    """把 Cookie 写入浏览器，返回写入的数量。DevTools 不可用时逐个 add_cookie（只能写入当前页面所在的域）。"""
+    from selenium.common.exceptions import WebDriverException
+
+    if not cookies:
+        return 0
+    params = []
+    for cookie in cookies:
+        param = {'name': cookie['name'], 'value': cookie['value'], 'domain': cookie['domain'],
+                 'path': cookie['path'], 'secure': cookie['secure'], 'httpOnly': cookie['httpOnly']}
+        if cookie['expires']:
+            param['expires'] = cookie['expires']
+        params.append(param)
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+        return len(params)
+    except (AttributeError, WebDriverException):
+        pass
+    written = 0
+    for cookie in cookies:
+        entry = {key: cookie[key] for key in ('name', 'value', 'path', 'secure', 'httpOnly')}
+        if cookie['expires']:
+            entry['expiry'] = cookie['expires']
+        try:
+            driver.add_cookie(entry)
+            written += 1
+        except WebDriverException as e:
+            print(f"Warning: could not copy cookie {cookie['name']} to the browser: {e}")
+    return written
+
+
+def session_cookies(session, host):
+    """会话中属于 host 的 Cookie（与 browser_cookies 相同的字典格式）。"""
+    result = []
+    for cookie in session.cookies:
+        domain = cookie.domain or host
+        if not _domain_matches(domain, host):
+            continue
+        result.append({'name': cookie.name, 'value': cookie.value, 'domain': domain, 'path': cookie.path or '/',
+                       'secure': bool(cookie.secure), 'httpOnly': cookie.has_nonstandard_attr('HttpOnly'),
+                       'expires': cookie.expires})
+    return result
+
+
+def check_user(session):
+    """
+    调用 login/checkUser 检查会话是否已登录。
+    返回 True / False；网络错误或响应无法解析时返回 None（无法判断）。
+    """
+    try:
+        with span("http.checkUser") as s:
+            response = session.post(CHECK_USER_URL, headers=BASE_HEADERS, data={'_json_att': ''})
+            s.http(response)
+        response.raise_for_status()
+        result = response.json()
+    except (requests.exceptions.RequestException, json.JSONDecodeError, ValueError) as e:
+        print(f"Warning: login check over HTTP failed: {e}")
+        return None
+    if not isinstance(result, dict) or result.get('status') is not True:
+        return None
+    return (result.get('data') or {}).get('flag') is True
+
+
+class SessionBridge:
+    """在一个 WebDriver 和一个 requests 会话之间同步 BASE_URL 所在站点的 Cookie。"""
+
+    def __init__(self, driver, session, base_url=BASE_URL):
+        self.driver = driver
+        self.session = session
+        self.host = urlsplit(base_url).hostname
+        self._synced = {}  # (name, domain, path) -> 两边上一次一致时的值
+
+    def pull(self):
+        """浏览器 -> 会话：复制浏览器中新增或变化的 Cookie，返回复制的数量；无法读取浏览器 Cookie 时返回 None。"""
+        with span("session_bridge.pull") as s:
+            cookies = browser_cookies(self.driver, self.host)
+            if cookies is None:
+                s.set(available=False)
+                return None
+            changed = 0
+            for cookie in cookies:
+                key = _cookie_key(cookie)
+                if self._synced.get(key) == cookie['value']:
+                    continue
+                rest = {'HttpOnly': None} if cookie['httpOnly'] else {}
+                self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'],
+                                         path=cookie['path'], secure=cookie['secure'], expires=cookie['expires'],
+                                         rest=rest)
+                self._synced[key] = cookie['value']
+                changed += 1
+            s.set(cookies=len(cookies), changed=changed)
+        return changed
+
+    def push(self):
+        """会话 -> 浏览器：把会话中新增或变化的 Cookie 写回浏览器，返回写入的数量。"""
+        with span("session_bridge.push") as s:
+            changed = [cookie for cookie in session_cookies(self.session, self.host)
+                       if self._synced.get(_cookie_key(cookie)) != cookie['value']]
+            written = set_browser_cookies(self.driver, changed)
+            if written == len(changed):
+                for cookie in changed:
+                    self._synced[_cookie_key(cookie)] = cookie['value']
+            s.set(changed=len(changed), written=written)
+        return written
+
+    def switch(self, driver):
+        """换成另一个浏览器（例如无头浏览器换成可见窗口）：之后的 push() 写入会话中的全部 Cookie。"""
+        self.driver = driver
+        self._synced.clear()
+
+    def check_user(self):
+        """先同步浏览器的 Cookie，再通过 HTTP 检查登录状态（见 check_user）。"""
+        self.pull()
+        return check_user(self.session)
@@ -0,0 +1,56 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 启动编排：互不依赖的启动步骤（加载车站表、启动 Chrome 并打开登录页）在一个小线程池中并行执行，
+# 交互式输入只在真正需要某个结果时才等待它。
+#
+# 用法：
+#   startup = Startup()
+#   startup.start("stations", get_station_index, session)
+#   startup.start("browser", open_login_page)
+#   ...                                  # 用户输入日期等
+#   station_index = startup.get("stations")   # 未完成时才阻塞
+
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+
+
+class Startup:
+    """按名称管理并行执行的启动步骤。"""
+
+    def __init__(self, max_workers=3):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._futures = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
+
+    def start(self, name, func, *args, **kwargs):
+        """在后台开始一个步骤，整个步骤记录为 startup.<name> 阶段。"""
+        def run():
+            with span(f"startup.{name}"):
+                return func(*args, **kwargs)
+        self._futures[name] = self._pool.submit(run)
+        return self._futures[name]
+
+    def ready(self, name):
+        """步骤是否已经完成（无论成功与否）。"""
+        return self._futures[name].done()
+
+    def get(self, name):
+        """返回步骤的结果，尚未完成时阻塞等待（等待时间记录为 startup.wait.<name>）；步骤中的异常会在这里重新抛出。"""
+        future = self._futures[name]
+        if future.done():
+            return future.result()
+        with span(f"startup.wait.{name}", kind="wait"):
+            return future.result()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,141 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+
+import os
+import json
+import time
+
+from config import BASE_URL, CACHE_DIR, STATION_CACHE_TTL
+from tracing import span
+
+# --- 配置 ---
+STATION_URL = f"{BASE_URL}/otn/resources/js/framework/station_name.js"
+STATION_CACHE_FILE = os.path.join(CACHE_DIR, "station_names.json")
+
+# 缓存文件格式版本。格式变化时递增，旧版本的缓存会被直接忽略
+CACHE_VERSION = 1
+
+# 每条车站记录保留的字段，顺序与 station_name.js 中一致
+# 例如：@bjb|北京北|VAP|beijingbei|bjb|0
+STATION_FIELDS = ("abbr", "name", "code", "pinyin", "short", "ordinal")
+
+
+# --- 解析 ---
+
+def parse_station_names(raw_data):
+    """解析 station_name.js 的内容，返回车站记录列表（每条为 STATION_FIELDS 顺序的列表）。"""
+    prefix = "var station_names ='"
+    if not raw_data.startswith(prefix):
+        return None
+    # 移除前缀和结尾的 "';"
+    end = raw_data.rfind("'")
+    stations_str = raw_data[len(prefix):end if end >= len(prefix) else len(raw_data)]
+
+    width = len(STATION_FIELDS)
+    rows = []
+    for station in stations_str.split('@'):
+        if station:
+            parts = station.split('|')
+            if len(parts) >= 5:  # 确保有足够的部分
+                row = parts[:width]
+                if len(row) < width:
+                    row.extend([''] * (width - len(row)))
+                rows.append(row)
+    return rows
+
+
+# --- 缓存文件 ---
+
+def load_cache(path=STATION_CACHE_FILE):
+    """读取本地车站缓存，文件不存在、损坏或版本不符时返回 None。"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get('version') != CACHE_VERSION or not cache.get('stations'):
+        return None
+    return cache
+
+
+def save_cache(cache, path=STATION_CACHE_FILE):
+    """原子地写入车站缓存（先写临时文件再替换），写入失败只打印警告。"""
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write station cache {path}: {e}")
+
+
+# --- 对外接口 ---
+
+def load_station_table(session, headers, cache_path=STATION_CACHE_FILE, ttl=STATION_CACHE_TTL, url=STATION_URL):
+    """
+    获取车站记录列表，优先使用本地缓存。
+    缓存未过期时直接返回；过期后发送条件请求重新验证（304 则继续使用缓存）；
+    请求失败时回退到缓存中的旧数据。完全无法获取时返回空列表。
+    """
+    with span("stations.load", url=url) as load_span:
+        return _load_station_table(session, headers, cache_path, ttl, url, load_span)
+
+
+def _load_station_table(session, headers, cache_path, ttl, url, load_span):
+    """load_station_table 的实现，load_span 用于记录数据来源（缓存/重新验证/网络）。"""
+    cache = load_cache(cache_path)
+    if cache and cache.get('url') != url:
+        # 缓存来自另一个站点（例如本地替身服务器），不能混用
+        cache = None
+    now = time.time()
+    if cache and now - cache.get('fetched_at', 0) < ttl:
+        load_span.set(source="cache", stations=len(cache['stations']))
+        return cache['stations']
+
+    request_headers = dict(headers)
+    if cache:
+        if cache.get('etag'):
+            request_headers['If-None-Match'] = cache['etag']
+        if cache.get('last_modified'):
+            request_headers['If-Modified-Since'] = cache['last_modified']
+        # 条件请求时不能让中间缓存直接返回旧内容
+        request_headers.pop('Cache-Control', None)
+
+    try:
+        with span("http.station_names", conditional=bool(cache)) as http_span:
+            response = session.get(url, headers=request_headers, timeout=10)
+            http_span.http(response)
+        if response.status_code == 304 and cache:
+            print("Station table not modified, using local cache.")
+            load_span.set(source="revalidated", stations=len(cache['stations']))
+            cache['fetched_at'] = now
+            save_cache(cache, cache_path)
+            return cache['stations']
+        response.raise_for_status()
+
+        with span("stations.parse"):
+            rows = parse_station_names(response.text)
+        if not rows:
+            raise ValueError("Failed to parse station code data.")
+
+        save_cache({
+            'version': CACHE_VERSION,
+            'url': url,
+            'fetched_at': now,
+            'etag': response.headers.get('ETag', ''),
+            'last_modified': response.headers.get('Last-Modified', ''),
+            'fields': list(STATION_FIELDS),
+            'stations': rows,
+        }, cache_path)
+        load_span.set(source="network", stations=len(rows))
+        return rows
+    except Exception as e:
+        if cache:
+            print(f"Error refreshing station codes: {e}. Using cached copy.")
+            load_span.set(source="stale-cache", stations=len(cache['stations']))
+            return cache['stations']
+        print(f"Error fetching station codes: {e}")
+        return []
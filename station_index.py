@@ -0,0 +1,154 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+
+from bisect import bisect_left
+from collections import namedtuple
+
+from station_cache import STATION_FIELDS
+
+# 一条完整的车站记录，字段顺序与 station_name.js 一致：
+# abbr(拼音首字母简码), name(中文站名), code(电报码), pinyin(全拼), short(简拼), ordinal(序号)
+Station = namedtuple('Station', STATION_FIELDS)
+
+# 搜索结果的排序等级，数值越小越靠前
+RANK_EXACT_NAME = 0
+RANK_EXACT_CODE = 1
+RANK_EXACT_SHORT = 2
+RANK_EXACT_PINYIN = 3
+RANK_PREFIX_NAME = 4
+RANK_PREFIX_PINYIN = 5
+RANK_PREFIX_SHORT = 6
+RANK_SUBSTRING = 7
+
+
+class _SortedKeys:
+    """有序字符串数组 + 对应的车站下标，用二分查找做前缀匹配。"""
+
+    def __init__(self, pairs):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [i for _, i in pairs]
+
+    def exact(self, key):
+        pos = bisect_left(self.keys, key)
+        result = []
+        while pos < len(self.keys) and self.keys[pos] == key:
+            result.append(self.ids[pos])
+            pos += 1
+        return result
+
+    def prefix(self, prefix, limit):
+        pos = bisect_left(self.keys, prefix)
+        result = []
+        while pos < len(self.keys) and self.keys[pos].startswith(prefix) and len(result) < limit:
+            result.append(self.ids[pos])
+            pos += 1
+        return result
+
+
+class StationIndex:
+    """
+    全国车站索引：支持按站名精确查找、电报码反查站名，
+    以及按站名/全拼/简拼的前缀搜索（带排序）。
+    提供与 dict 相同的 get(name) 接口，可以直接替换原来的 {站名: 代码} 字典。
+    """
+
+    def __init__(self, rows):
+        self.stations = [Station(*row) for row in rows]
+        self._by_name = {}
+        self._by_code = {}
+        for i, station in enumerate(self.stations):
+            # 站名或电报码重复时保留站表中的第一条
+            self._by_name.setdefault(station.name, i)
+            self._by_code.setdefault(station.code, i)
+        self._names = _SortedKeys((s.name, i) for i, s in enumerate(self.stations))
+        self._pinyin = _SortedKeys((s.pinyin.lower(), i) for i, s in enumerate(self.stations))
+        self._short = _SortedKeys((s.short.lower(), i) for i, s in enumerate(self.stations))
+        self._abbr = _SortedKeys((s.abbr.lower(), i) for i, s in enumerate(self.stations))
+
+    def __len__(self):
+        return len(self.stations)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    # --- 精确查找 ---
+
+    def get(self, name, default=None):
+        """按中文站名返回电报码，与 dict.get 用法相同。"""
+        i = self._by_name.get(name)
+        return self.stations[i].code if i is not None else default
+
+    def by_name(self, name):
+        """按中文站名返回完整的车站记录。"""
+        i = self._by_name.get(name)
+        return self.stations[i] if i is not None else None
+
+    def by_code(self, code):
+        """按电报码返回完整的车站记录。"""
+        i = self._by_code.get(code.upper())
+        return self.stations[i] if i is not None else None
+
+    def name_of(self, code, default=None):
+        """电报码反查中文站名。"""
+        station = self.by_code(code)
+        return station.name if station else default
+
+    def resolve(self, text):
+        """
+        把用户输入（站名、电报码、全拼或简拼）解析为唯一的车站记录。
+        没有匹配或匹配到多个车站时返回 None。
+        """
+        text = text.strip()
+        if not text:
+            return None
+        station = self.by_name(text)
+        if station:
+            return station
+        if text.isascii():
+            station = self.by_code(text)
+            if station:
+                return station
+            key = text.lower()
+            ids = set(self._pinyin.exact(key)) or set(self._short.exact(key)) or set(self._abbr.exact(key))
+            if len(ids) == 1:
+                return self.stations[ids.pop()]
+        return None
+
+    # --- 模糊搜索 ---
+
+    def search(self, query, limit=5):
+        """按相关度返回最多 limit 个车站记录：精确匹配 > 前缀匹配 > 子串匹配。"""
+        query = query.strip()
+        if not query:
+            return []
+        key = query.lower()
+        ranked = {}
+
+        def add(ids, rank):
+            for i in ids:
+                if i not in ranked or rank < ranked[i]:
+                    ranked[i] = rank
+
+        if query in self._by_name:
+            add([self._by_name[query]], RANK_EXACT_NAME)
+        if query.isascii():
+            if query.upper() in self._by_code:
+                add([self._by_code[query.upper()]], RANK_EXACT_CODE)
+            add(self._short.exact(key), RANK_EXACT_SHORT)
+            add(self._abbr.exact(key), RANK_EXACT_SHORT)
+            add(self._pinyin.exact(key), RANK_EXACT_PINYIN)
+            add(self._pinyin.prefix(key, limit), RANK_PREFIX_PINYIN)
+            add(self._short.prefix(key, limit), RANK_PREFIX_SHORT)
+        else:
+            add(self._names.prefix(query, limit), RANK_PREFIX_NAME)
+            # 前缀不够时再做一次子串扫描（只比较站名，全国站表下也在毫秒以内）
+            if len(ranked) < limit:
+                add((i for i, s in enumerate(self.stations) if query in s.name), RANK_SUBSTRING)
+
+        # 同等级内：站名短的优先（“北京”排在“北京南”前），再按站表序号
+        order = sorted(ranked, key=lambda i: (ranked[i], len(self.stations[i].name), i))
+        return [self.stations[i] for i in order[:limit]]
+
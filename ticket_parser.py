@@ -0,0 +1,302 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+
+import re
+
+# --- 字段布局 ---
+# leftTicket/query* 返回的 data.result 中每一项都是一个用 '|' 分隔的长字符串。
+# 下面是各列的含义（按下标顺序）。data.map 只是 {电报码: 站名} 的对照表，
+# 不包含列定义，所以列布局使用这里的已知结构，并用 data.map 和时间格式校验每个响应，
+# 一旦服务器调整了列顺序就会报错，而不是悄悄读出错位的数据。
+QUERY_FIELDS = (
+    "secret_str",             # 0  预订所需密钥
+    "button_text",            # 1  按钮文字（预订）
+    "train_no",               # 2  内部车次编号，如 240000G1010C
+    "station_train_code",     # 3  车次，如 G101
+    "start_station_code",     # 4  始发站
+    "end_station_code",       # 5  终点站
+    "from_station_code",      # 6  出发站
+    "to_station_code",        # 7  到达站
+    "start_time",             # 8  发车时间 HH:MM
+    "arrive_time",            # 9  到达时间 HH:MM
+    "duration",               # 10 历时 HH:MM
+    "can_web_buy",            # 11 是否可网购 Y/N/IS_TIME_NOT_BUY
+    "yp_info",                # 12 余票信息（加密）
+    "start_train_date",       # 13 始发日期 YYYYMMDD
+    "train_seat_feature",     # 14
+    "location_code",          # 15
+    "from_station_no",        # 16 出发站在经停表中的序号
+    "to_station_no",          # 17 到达站在经停表中的序号
+    "is_support_card",        # 18
+    "controlled_train_flag",  # 19
+    "gg_num",                 # 20
+    "gr_num",                 # 21 高级软卧
+    "qt_num",                 # 22 其他
+    "rw_num",                 # 23 软卧/一等卧
+    "rz_num",                 # 24 软座
+    "tz_num",                 # 25 特等座
+    "wz_num",                 # 26 无座
+    "yb_num",                 # 27
+    "yw_num",                 # 28 硬卧/二等卧
+    "yz_num",                 # 29 硬座
+    "ze_num",                 # 30 二等座
+    "zy_num",                 # 31 一等座
+    "swz_num",                # 32 商务座
+    "srrb_num",               # 33 动卧
+    "yp_ex",                  # 34 余票座位代码
+    "seat_types",             # 35 座位类型代码，查询票价时使用（如 OM9）
+)
+
+# 座位类别 -> 列名
+SEAT_CLASSES = {
+    "business": "swz_num",          # 商务座
+    "special": "tz_num",            # 特等座
+    "first": "zy_num",              # 一等座
+    "second": "ze_num",             # 二等座
+    "premium_soft_sleeper": "gr_num",  # 高级软卧
+    "soft_sleeper": "rw_num",       # 软卧
+    "emu_sleeper": "srrb_num",      # 动卧
+    "hard_sleeper": "yw_num",       # 硬卧
+    "soft_seat": "rz_num",          # 软座
+    "hard_seat": "yz_num",          # 硬座
+    "no_seat": "wz_num",            # 无座
+    "other": "qt_num",              # 其他
+}
+
+# 查询页面 #queryLeftTable 中余票单元格的 id 前缀 -> 列名（单元格 id 为 前缀_内部车次编号，如 ZE_240000G1010C）
+TABLE_SEAT_CELLS = {
+    "SWZ": "swz_num",
+    "TZ": "tz_num",
+    "ZY": "zy_num",
+    "ZE": "ze_num",
+    "GR": "gr_num",
+    "RW": "rw_num",
+    "SRRB": "srrb_num",
+    "YW": "yw_num",
+    "RZ": "rz_num",
+    "YZ": "yz_num",
+    "WZ": "wz_num",
+    "QT": "qt_num",
+}
+
+# '有' 表示余票充足（12306 不公开具体数量），按一个足够大的数处理
+SEAT_PLENTY = 99
+
+_HHMM = re.compile(r"^\d{2}:\d{2}$")
+
+
+class QueryLayoutError(ValueError):
+    """查询结果的列布局与已知结构不一致（通常是 12306 调整了返回格式）。"""
+
+
+# --- 类型转换 ---
+
+def parse_hhmm(text):
+    """把 'HH:MM' 转换为分钟数，格式不对时返回 None。历时可能超过 24 小时，也用同样的格式。"""
+    if not text or ':' not in text:
+        return None
+    hours, _, minutes = text.partition(':')
+    if not (hours.isdigit() and minutes.isdigit()):
+        return None
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_availability(text):
+    """
+    把余票字段转换为整数：
+    '有' -> SEAT_PLENTY，'无'/'候补' -> 0，数字 -> 对应张数，
+    ''/'--'/'*' 等表示该车次不提供此座位类别 -> None。
+    """
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    if text == '有':
+        return SEAT_PLENTY
+    if text in ('无', '候补'):
+        return 0
+    return None
+
+
+# --- 结果集 ---
+
+class TrainResultSet:
+    """
+    按列存储的一批查询结果：每个字段一个列表，不为每一行分配字典。
+    数值列（时间、历时、各座位余票）在第一次访问时整列解析并缓存。
+    """
+
+    __slots__ = ("columns", "station_map", "_typed")
+
+    def __init__(self, columns=None, station_map=None):
+        self.columns = columns if columns is not None else {name: [] for name in QUERY_FIELDS}
+        self.station_map = station_map if station_map is not None else {}
+        self._typed = {}
+
+    def __len__(self):
+        return len(self.columns["secret_str"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def extend(self, other):
+        """追加另一批结果（例如多个日期的查询），原地合并。"""
+        for name in QUERY_FIELDS:
+            self.columns[name].extend(other.columns[name])
+        self.station_map.update(other.station_map)
+        self._typed.clear()
+        return self
+
+    # --- 整列类型化访问 ---
+
+    def _typed_column(self, key, column, convert):
+        values = self._typed.get(key)
+        if values is None:
+            values = [convert(v) for v in self.columns[column]]
+            self._typed[key] = values
+        return values
+
+    def minutes(self, column):
+        """返回时间类列（start_time/arrive_time/duration）的分钟数列表。"""
+        return self._typed_column(column, column, parse_hhmm)
+
+    def seat_counts(self, seat_class):
+        """返回某个座位类别（见 SEAT_CLASSES）的余票数列表，None 表示不提供该座位。"""
+        column = SEAT_CLASSES[seat_class]
+        return self._typed_column(column, column, parse_availability)
+
+    # --- 单行访问 ---
+
+    def seats(self, i):
+        """返回第 i 行所有提供的座位类别及原始余票文字，如 {'second': '有', 'first': '5'}。"""
+        result = {}
+        for seat_class, column in SEAT_CLASSES.items():
+            if parse_availability(self.columns[column][i]) is not None:
+                result[seat_class] = self.columns[column][i]
+        return result
+
+    def has_tickets(self, i):
+        """第 i 行是否有任意座位类别有票。"""
+        return any(self.seat_counts(seat_class)[i] for seat_class in SEAT_CLASSES)
+
+    def station_name(self, code):
+        """用响应中的 data.map 把电报码转换为站名。"""
+        return self.station_map.get(code, code)
+
+    def take(self, rows):
+        """返回只包含 rows 中各行（按给定顺序）的新结果集。"""
+        columns = {name: [values[i] for i in rows] for name, values in self.columns.items()}
+        return TrainResultSet(columns, dict(self.station_map))
+
+    def to_dict(self, i):
+        """把第 i 行转换为字典（只在需要单独传递某一行时使用）。"""
+        return {name: self.columns[name][i] for name in QUERY_FIELDS}
+
+
+# --- 解析 ---
+
+def _validate_row(fields, station_map):
+    """检查一行数据是否符合已知布局，不符合时抛出 QueryLayoutError。"""
+    if len(fields) < len(QUERY_FIELDS):
+        raise QueryLayoutError(f"Expected at least {len(QUERY_FIELDS)} fields, got {len(fields)}.")
+    for name in ("start_time", "arrive_time", "duration"):
+        value = fields[QUERY_FIELDS.index(name)]
+        if not _HHMM.match(value):
+            raise QueryLayoutError(f"Column '{name}' does not look like HH:MM: {value!r}")
+    if station_map:
+        for name in ("from_station_code", "to_station_code"):
+            value = fields[QUERY_FIELDS.index(name)]
+            if value not in station_map:
+                raise QueryLayoutError(f"Column '{name}' is not a station code from data.map: {value!r}")
+
+
+def parse_query_result(raw_rows, station_map=None):
+    """
+    把 data.result 中的 '|' 分隔字符串整体解析为 TrainResultSet。
+    只校验第一行的布局（同一个响应中所有行结构相同），然后按列转置。
+    """
+    station_map = station_map or {}
+    rows = [item.split('|') for item in raw_rows if item]
+    result_set = TrainResultSet(station_map=dict(station_map))
+    if not rows:
+        return result_set
+    _validate_row(rows[0], station_map)
+    width = len(QUERY_FIELDS)
+    for row in rows:
+        if len(row) < width:
+            raise QueryLayoutError(f"Row has {len(row)} fields, expected at least {width}.")
+    for idx, name in enumerate(QUERY_FIELDS):
+        result_set.columns[name] = [row[idx] for row in rows]
+    return result_set
+
+
+def parse_query_response(response_json):
+    """解析完整的 queryZ JSON 响应（包含 data.result 与 data.map）。"""
+    data = response_json.get('data') or {}
+    return parse_query_result(data.get('result') or [], data.get('map') or {})
+
+
+def parse_table_rows(rows, station_codes=None):
+    """
+    把从页面 #queryLeftTable 读出的行（见 results_table）转换为与 HTTP 查询相同的 TrainResultSet。
+    页面上只有站名，station_codes(站名) 用于换回电报码（例如 StationIndex.get），找不到时保留站名。
+    页面上没有的列（yp_info、经停序号等）为空字符串。
+    """
+    result_set = TrainResultSet()
+    columns = result_set.columns
+    station_map = result_set.station_map
+    for row in rows:
+        values = dict.fromkeys(QUERY_FIELDS, '')
+        for name in ("secret_str", "button_text", "train_no", "station_train_code",
+                     "start_time", "arrive_time", "duration"):
+            values[name] = row.get(name) or ''
+        for key in ("from_station", "to_station"):
+            name = row.get(key) or ''
+            code = (station_codes(name) if station_codes else None) or name
+            station_map[code] = name
+            values[f"{key}_code"] = code
+        for prefix, text in (row.get("seats") or {}).items():
+            column = TABLE_SEAT_CELLS.get(prefix)
+            if column:
+                # 页面用 '--' 显示接口中的空字段（不提供该座位）
+                values[column] = '' if text == '--' else text
+        for name in QUERY_FIELDS:
+            columns[name].append(values[name])
+    return result_set
+
+
+# --- 汇总 ---
+
+
+def available_trains(trains, rows=None):
+    """
+    列出有票的车次，每个车次一个字典（HTTP 查询和浏览器页面共用）。
+    rows 为筛选后的行号（见 train_filter.TrainFilter），默认为所有有票的行。
+    """
+    if rows is None:
+        # 简单判断是否有票 (数字表示票数，'无'表示无票，'有'表示有票但数量较多)
+        rows = [i for i in range(len(trains)) if trains.has_tickets(i)]
+    available = []
+    for i in rows:
+        available.append({
+            'index': i+1,
+            'secretStr': trains['secret_str'][i],  # 预订所需密钥
+            'train_no': trains['station_train_code'][i],  # 车次
+            'from_station': trains.station_name(trains['from_station_code'][i]),
+            'to_station': trains.station_name(trains['to_station_code'][i]),
+            'start_time': trains['start_time'][i],  # 发车时间
+            'arrive_time': trains['arrive_time'][i],  # 到达时间
+            'duration': trains['duration'][i],  # 历时
+            'second_class': trains['ze_num'][i],  # 二等座
+            'seats': trains.seats(i)
+        })
+    return available
+
+
+def print_available_trains(available):
+    """打印有票车次列表，编号从 1 开始。"""
+    for n, train in enumerate(available, 1):
+        seat_text = ", ".join(f"{seat_class}: {count}" for seat_class, count in train['seats'].items())
+        print(f"{n}. Train: {train['train_no']}, Departs: {train['start_time']}, Arrives: {train['arrive_time']}, Duration: {train['duration']}, Seats: {seat_text}")
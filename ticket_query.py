@@ -0,0 +1,53 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+
+from config import BASE_URL
+from history_store import history_store
+from http_client import BASE_HEADERS
+from query_cache import query_cache, query_key
+from tracing import span
+
+# 实际的查询API URL (可能需要根据12306更新进行调整)
+# 查询Z开头的车次
+QUERY_URL = f"{BASE_URL}/otn/leftTicket/queryZ"
+# 查询其他车次
+# QUERY_URL_OTHER = f"{BASE_URL}/otn/leftTicket/query"
+
+
+def query_left_tickets(session, train_date, from_code, to_code, purpose_codes='ADULT', cache=query_cache,
+                       use_cached=True):
+    """
+    查询余票，返回 queryZ 的 JSON 响应。
+    成功的响应按 (日期, 出发站, 到达站, 乘客类型) 缓存，有效期内重复查询不会再发送请求。
+    use_cached 为 False 时总是发送请求（调用方已经查过缓存），但仍然写入缓存。
+    从网络获取的成功响应同时登记到余票历史库（见 history_store），缓存命中不重复记录。
+    网络错误和非 JSON 响应以 requests 的异常抛出。
+    """
+    key = query_key(train_date, from_code, to_code, purpose_codes)
+    if cache is not None and use_cached:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    # 查询参数
+    params = {
+        'leftTicketDTO.train_date': train_date,
+        'leftTicketDTO.from_station': from_code,
+        'leftTicketDTO.to_station': to_code,
+        'purpose_codes': purpose_codes  # ADULT: 成人票
+    }
+    with span("http.queryZ", train_date=train_date, from_code=from_code, to_code=to_code) as s:
+        response = session.get(QUERY_URL, params=params, headers=BASE_HEADERS)
+        s.http(response)
+    response.raise_for_status()
+    result = response.json()
+
+    if result.get('status') == True and result.get('httpstatus') == 200:
+        if cache is not None:
+            cache.put(key, result)
+        history = history_store()
+        if history is not None:
+            history.record_response(train_date, from_code, to_code, result)
+    return result
@@ -0,0 +1,230 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 轻量级的分阶段计时与追踪。
+# 设置环境变量 TICKET_TRACE=trace.jsonl 后，每个阶段（车站加载、启动 Chrome、等待登录、
+# 页面加载、每个 WebDriverWait、每个 HTTP 请求）都会以一行 JSON 写入该文件，
+# 程序结束时打印汇总表。未开启时 span() 返回一个共享的空对象，几乎没有开销。
+# add_listener() 注册的回调在每个阶段开始和结束时调用（例如 profiling 按阶段切换 CPU 分析器），
+# 注册了回调时即使没有追踪文件也会创建阶段。
+#
+# 用法：
+#   with span("http.queryZ") as s:
+#       response = session.get(...)
+#       s.http(response)
+#   with span("wait.results", kind="wait", timeout=20):
+#       WebDriverWait(driver, 20).until(...)
+
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+
+from config import TRACE_FILE
+
+_lock = threading.Lock()
+_local = threading.local()
+_trace_file = None
+_stats = {}  # phase -> [次数, 总耗时, 最大耗时, 失败次数]
+_counters = {}  # 计数器，例如缓存命中/未命中
+_listeners = ()  # [(on_enter, on_exit)]，见 add_listener
+
+
+class Span:
+    """一个计时阶段。作为上下文管理器使用，退出时写出一条记录。"""
+
+    __slots__ = ("phase", "kind", "attrs", "start", "parent")
+
+    def __init__(self, phase, kind, attrs):
+        self.phase = phase
+        self.kind = kind
+        self.attrs = attrs
+        self.parent = None
+        self.start = 0.0
+
+    def set(self, **attrs):
+        """附加字段（例如字节数、状态码、缓存命中情况）。"""
+        self.attrs.update(attrs)
+        return self
+
+    def http(self, response):
+        """记录一个 requests 响应的状态码和传输字节数。"""
+        self.attrs["http_status"] = response.status_code
+        self.attrs["bytes"] = len(response.content)
+        return self
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].phase if stack else None
+        stack.append(self)
+        for on_enter, _ in _listeners:
+            on_enter(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        for _, on_exit in _listeners:
+            on_exit(self)
+        status = "ok" if exc_type is None else "error"
+        record = {
+            "ts": round(time.time(), 3),
+            "phase": self.phase,
+            "kind": self.kind,
+            "duration_ms": round(duration * 1000, 3),
+            "status": status,
+        }
+        if self.parent:
+            record["parent"] = self.parent
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"[:300]
+        if self.kind == "wait":
+            # 等待条件的结果：满足 / 超时 / 其他异常
+            record["outcome"] = "met" if exc_type is None else (
+                "timeout" if exc_type.__name__ == "TimeoutException" else "error")
+        record.update(self.attrs)
+        _write(record, duration, status)
+        return False
+
+
+class _NullSpan:
+    """追踪关闭时使用的空对象，所有操作都不做任何事。"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        return self
+
+    def http(self, response):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _write(record, duration, status):
+    with _lock:
+        stats = _stats.setdefault(record["phase"], [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += duration
+        stats[2] = max(stats[2], duration)
+        if status != "ok":
+            stats[3] += 1
+        if _trace_file:
+            _trace_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            _trace_file.flush()
+
+
+# --- 对外接口 ---
+
+def enabled():
+    return _trace_file is not None
+
+
+def span(phase, kind="phase", **attrs):
+    """创建一个计时阶段；追踪关闭时返回空对象。"""
+    if _trace_file is None and not _listeners:
+        return _NULL_SPAN
+    return Span(phase, kind, attrs)
+
+
+def traced(phase, kind="phase"):
+    """装饰器：把整个函数调用记录为一个阶段。"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace_file is None and not _listeners:
+                return func(*args, **kwargs)
+            with Span(phase, kind, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1, **attrs):
+    """累加一个计数器（例如 query_cache.hit / query_cache.miss），并写出一条记录。"""
+    if _trace_file is None:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+        record = {"ts": round(time.time(), 3), "counter": name, "amount": amount}
+        record.update(attrs)
+        _trace_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        _trace_file.flush()
+
+
+def counters():
+    """返回所有计数器的当前值。"""
+    with _lock:
+        return dict(_counters)
+
+
+def summary():
+    """返回每个阶段的汇总：[(阶段, 次数, 总耗时ms, 平均ms, 最大ms, 失败次数)]，按总耗时降序。"""
+    with _lock:
+        rows = [(phase, n, total * 1000, total * 1000 / n, peak * 1000, errors)
+                for phase, (n, total, peak, errors) in _stats.items()]
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows
+
+
+def print_summary():
+    """打印运行结束时的汇总表。"""
+    rows = summary()
+    totals = counters()
+    if not rows and not totals:
+        return
+    print("\n--- Timing Summary ---")
+    print(f"{'phase':<36} {'count':>6} {'total ms':>11} {'mean ms':>10} {'max ms':>10} {'errors':>7}")
+    for phase, n, total, mean, peak, errors in rows:
+        print(f"{phase:<36} {n:>6} {total:>11.1f} {mean:>10.1f} {peak:>10.1f} {errors:>7}")
+    for name, value in sorted(totals.items()):
+        print(f"{name:<36} {value:>6}")
+
+
+def add_listener(on_enter, on_exit):
+    """注册阶段开始/结束时的回调，两个回调都接收 Span（Span.parent 为 None 表示线程中的最外层阶段）。"""
+    global _listeners
+    with _lock:
+        _listeners = _listeners + ((on_enter, on_exit),)
+
+
+def remove_listener(on_enter, on_exit):
+    global _listeners
+    with _lock:
+        _listeners = tuple(listener for listener in _listeners if listener != (on_enter, on_exit))
+
+
+def enable(path):
+    """开启追踪，把记录追加写入 path，并在程序退出时打印汇总表。"""
+    global _trace_file
+    if _trace_file is not None:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _trace_file = open(path, "a", encoding="utf-8")
+    atexit.register(_close)
+
+
+def _close():
+    global _trace_file
+    print_summary()
+    if _trace_file is not None:
+        _trace_file.close()
+        _trace_file = None
+
+
+if TRACE_FILE:
+    enable(TRACE_FILE)
@@ -0,0 +1,196 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 车次详情：为查询结果中的车次补充经停站时刻表 (czxx/queryByTrainNo) 和票价 (leftTicket/queryTicketPrice)。
+# 一个结果集中需要的查询先按车次和日期去重，缓存中没有的再依次通过共享会话发送。
+# 时刻表很少变化，缓存在磁盘上并有较长的有效期 (TIMETABLE_CACHE_TTL)；票价的有效期较短 (FARE_CACHE_TTL)。
+# 同一批车次再次查看时不发送任何请求。
+#
+# 用法：
+#   details = enrich(session, trains, rows, "2026-10-20")
+#   print_train_details(available_trains(trains, rows), details)
+
+import re
+from collections import namedtuple
+from itertools import zip_longest
+
+import requests
+
+from config import BASE_URL, TIMETABLE_CACHE_TTL, TIMETABLE_CACHE_DISK, FARE_CACHE_TTL, FARE_CACHE_DISK
+from http_client import BASE_HEADERS
+from query_cache import QueryCache
+from tracing import span, count
+
+TIMETABLE_URL = f"{BASE_URL}/otn/czxx/queryByTrainNo"
+FARE_URL = f"{BASE_URL}/otn/leftTicket/queryTicketPrice"
+
+# queryTicketPrice 响应中的价格键 -> 座位类别（见 ticket_parser.SEAT_CLASSES）
+FARE_KEYS = {
+    "A9": "business",
+    "P": "special",
+    "M": "first",
+    "O": "second",
+    "A6": "premium_soft_sleeper",
+    "A4": "soft_sleeper",
+    "F": "emu_sleeper",
+    "A3": "hard_sleeper",
+    "A2": "soft_seat",
+    "A1": "hard_seat",
+    "WZ": "no_seat",
+}
+# 结果中没有 seat_types 列时（例如从页面表格读取），按提供的座位类别推出座位类型代码
+SEAT_TYPE_CODES = {
+    "business": "9",
+    "special": "P",
+    "first": "M",
+    "second": "O",
+    "premium_soft_sleeper": "6",
+    "soft_sleeper": "4",
+    "emu_sleeper": "F",
+    "hard_sleeper": "3",
+    "soft_seat": "2",
+    "hard_seat": "1",
+}
+
+# 一个经停站；arrive_time / depart_time 在始发站、终点站为 None
+Stop = namedtuple("Stop", "station_no station_name arrive_time depart_time stopover")
+# 一个车次的详情；查询失败的部分为 None
+TrainDetails = namedtuple("TrainDetails", "stops fares")
+
+_PRICE = re.compile(r"(\d+(?:\.\d+)?)")
+
+timetable_cache = QueryCache(ttl=TIMETABLE_CACHE_TTL, max_entries=2048, disk_path=TIMETABLE_CACHE_DISK or None,
+                             name="timetable_cache")
+fare_cache = QueryCache(ttl=FARE_CACHE_TTL, max_entries=2048, disk_path=FARE_CACHE_DISK or None,
+                        name="fare_cache")
+
+
+def _get_json(session, url, params, phase):
+    """发送 GET 请求并返回 JSON；接口返回失败时抛出 ValueError。"""
+    with span(phase, **params) as s:
+        response = session.get(url, params=params, headers=BASE_HEADERS)
+        s.http(response)
+    response.raise_for_status()
+    result = response.json()
+    if not (result.get('status') == True and result.get('httpstatus') == 200):
+        messages = result.get('messages') or ['Unknown error']
+        raise ValueError(', '.join(messages) if isinstance(messages, list) else str(messages))
+    return result
+
+
+def parse_timetable(result):
+    """把 queryByTrainNo 响应转换为 Stop 列表。"""
+    stops = []
+    for item in (result.get('data') or {}).get('data') or []:
+        times = [None if value in ('', '----') else value
+                 for value in (item.get('arrive_time'), item.get('start_time'), item.get('stopover_time'))]
+        stops.append(Stop(item.get('station_no', ''), item.get('station_name', ''), *times))
+    return stops
+
+
+def parse_fares(result):
+    """把 queryTicketPrice 响应转换为 {座位类别: 价格（元）}。"""
+    fares = {}
+    for key, value in (result.get('data') or {}).items():
+        seat_class = FARE_KEYS.get(key)
+        match = _PRICE.search(value) if seat_class and isinstance(value, str) else None
+        if match:
+            fares[seat_class] = float(match.group(1))
+    return fares
+
+
+def _seat_types(trains, i):
+    seat_types = trains['seat_types'][i]
+    if seat_types:
+        return seat_types
+    return "".join(SEAT_TYPE_CODES[seat_class] for seat_class in trains.seats(i) if seat_class in SEAT_TYPE_CODES)
+
+
+def _lookup(session, cache, key, url, params, phase):
+    """先查缓存，没有时发送请求并缓存成功的响应。"""
+    result = cache.get(key)
+    if result is None:
+        result = _get_json(session, url, params, phase)
+        cache.put(key, result)
+    return result
+
+
+def enrich(session, trains, rows=None, train_date=None, timetables=True, fares=True):
+    """
+    为结果集中 rows 各行（默认全部）查询经停站和票价，返回 {行号: TrainDetails}。
+    train_date 为乘车日期 YYYY-MM-DD（默认取各行的始发日期）。
+    相同的车次只查询一次；某个查询失败时打印原因，该部分为 None。
+    """
+    rows = range(len(trains)) if rows is None else rows
+    # 先为每一行生成缓存键，相同的键只查询一次；时刻表按 (车次, 日期)，票价还要区分区间和座位类型
+    timetable_keys = {}
+    timetable_params = {}
+    fare_keys = {}
+    for i in rows:
+        day = train_date or _iso_date(trains['start_train_date'][i])
+        train_no = trains['train_no'][i]
+        if timetables:
+            key = timetable_keys[i] = (train_no, day)
+            if key not in timetable_params:
+                timetable_params[key] = {'train_no': train_no, 'from_station_telecode': trains['from_station_code'][i],
+                                         'to_station_telecode': trains['to_station_code'][i], 'depart_date': day}
+        if fares:
+            fare_keys[i] = (train_no, trains['from_station_no'][i], trains['to_station_no'][i], _seat_types(trains, i),
+                            day)
+
+    # 两个接口分别限速，交替发送两类请求，一个接口等待间隔时另一个接口的请求可以先发出
+    lookups = []
+    for key, params in timetable_params.items():
+        lookups.append((key, params, timetable_cache, TIMETABLE_URL, "http.queryByTrainNo", parse_timetable))
+    fare_lookups = []
+    for key in dict.fromkeys(fare_keys.values()):
+        train_no, from_no, to_no, seat_types, day = key
+        params = {'train_no': train_no, 'from_station_no': from_no, 'to_station_no': to_no,
+                  'seat_types': seat_types, 'train_date': day}
+        fare_lookups.append((key, params, fare_cache, FARE_URL, "http.queryTicketPrice", parse_fares))
+    results = {}
+    with span("details.enrich", rows=len(rows), timetables=len(lookups), fares=len(fare_lookups)):
+        for lookup in _interleave(lookups, fare_lookups):
+            key, params, cache, url, phase, parse = lookup
+            results[(phase, key)] = _fetch(session, cache, key, url, params, phase, parse)
+    return {i: TrainDetails(results.get(("http.queryByTrainNo", timetable_keys.get(i))),
+                            results.get(("http.queryTicketPrice", fare_keys.get(i))))
+            for i in rows}
+
+
+def _interleave(first, second):
+    """交替取出两个列表中的元素。"""
+    for pair in zip_longest(first, second):
+        for item in pair:
+            if item is not None:
+                yield item
+
+
+def _fetch(session, cache, key, url, params, phase, parse):
+    try:
+        return parse(_lookup(session, cache, key, url, params, phase))
+    except (ValueError, requests.exceptions.RequestException) as e:
+        # ValueError 包括 JSON 解码错误和接口返回的错误
+        count(f"{phase}.failed")
+        print(f"Warning: {phase.split('.', 1)[1]} failed for train {params['train_no']}: {e}")
+        return None
+
+
+def _iso_date(yyyymmdd):
+    return f"{yyyymmdd[:4]}-{yyyymmdd[4:6]}-{yyyymmdd[6:8]}" if len(yyyymmdd) == 8 else yyyymmdd
+
+
+def print_train_details(available, details):
+    """在有票车次列表（见 ticket_parser.available_trains）下打印票价和经停站。"""
+    for n, train in enumerate(available, 1):
+        info = details.get(train['index'] - 1)
+        if info is None:
+            continue
+        if info.fares:
+            fare_text = ", ".join(f"{seat_class} ¥{price:.1f}" for seat_class, price in info.fares.items())
+            print(f"   {n}. Fares: {fare_text}")
+        if info.stops:
+            stop_text = " -> ".join(f"{stop.station_name} {stop.depart_time or stop.arrive_time}" for stop in info.stops)
+            print(f"   {n}. Stops ({len(info.stops)}): {stop_text}")
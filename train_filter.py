@@ -0,0 +1,124 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 声明式的车次筛选与排序：座位类别、最少余票、出发/到达时间段、最长历时、车次类型 (G/D/Z/T/K)。
+# 条件在创建 TrainFilter 时编译成一组按列计算的谓词，对 TrainResultSet 的整列
+# （已类型化的分钟数和余票数）依次缩小候选行号，最后按指定的键排序。
+# 多日期合并后的大结果集也只需要对每个条件扫描一次候选行，不为每行构建字典。
+#
+# 用法：
+#   trains_filter = TrainFilter(seat_classes=("second", "first"), min_seats=2,
+#                               depart_between=("07:00", "12:00"), max_duration="06:00",
+#                               train_types="GD", sort_by="duration")
+#   rows = trains_filter.apply(trains)   # 排好序的行号
+#   subset = trains.take(rows)
+
+from ticket_parser import SEAT_CLASSES, parse_hhmm
+
+# 排序键：departure / arrival / duration 升序，seats 按所选座位类别的最大余票数降序
+SORT_KEYS = ("departure", "arrival", "duration", "seats")
+
+
+def _minutes(value, what):
+    """把 'HH:MM' 或分钟数转换为分钟数，格式不对时抛出 ValueError。"""
+    if isinstance(value, int):
+        return value
+    minutes = parse_hhmm(str(value).strip())
+    if minutes is None:
+        raise ValueError(f"Invalid {what} {value!r}, expected HH:MM")
+    return minutes
+
+
+def _window(value, what):
+    """把 ('07:00', '12:00') 转换为分钟区间；任意一端为 None 表示不限。"""
+    if value is None:
+        return None
+    start, end = value
+    return (None if start is None else _minutes(start, what),
+            None if end is None else _minutes(end, what))
+
+
+def _in_window(window):
+    """生成判断分钟数是否在区间内的函数；开始晚于结束时表示跨过午夜（例如 22:00-02:00）。"""
+    start, end = window
+    if start is not None and end is not None and start > end:
+        return lambda m: m is not None and (m >= start or m <= end)
+    lo = 0 if start is None else start
+    hi = 24 * 60 if end is None else end
+    return lambda m: m is not None and lo <= m <= hi
+
+
+class TrainFilter:
+    """编译后的筛选条件。创建时校验并编译，之后可以对任意多个结果集调用 apply()。"""
+
+    def __init__(self, seat_classes=None, min_seats=1, depart_between=None, arrive_between=None,
+                 max_duration=None, train_types=None, sort_by="departure", limit=None):
+        self.seat_classes = tuple(seat_classes or ())
+        unknown = [name for name in self.seat_classes if name not in SEAT_CLASSES]
+        if unknown:
+            raise ValueError(f"Unknown seat class {', '.join(unknown)} (choose from: {', '.join(SEAT_CLASSES)})")
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {sort_by!r} (choose from: {', '.join(SORT_KEYS)})")
+        self.min_seats = min_seats
+        self.depart_between = _window(depart_between, "departure time")
+        self.arrive_between = _window(arrive_between, "arrival time")
+        self.max_duration = None if max_duration is None else _minutes(max_duration, "duration")
+        # 'GD' / ['G', 'D'] 都可以；车次以这些前缀开头才保留
+        self.train_types = tuple(t.upper() for t in (train_types or ()))
+        self.sort_by = sort_by
+        self.limit = limit
+        self._predicates = self._compile()
+
+    def _compile(self):
+        """按代价从低到高排列谓词。每个谓词接收 (结果集, 候选行号)，返回缩小后的候选行号。"""
+        predicates = []
+        if self.train_types:
+            prefixes = self.train_types
+
+            def by_type(trains, rows):
+                codes = trains['station_train_code']
+                return [i for i in rows if codes[i].startswith(prefixes)]
+            predicates.append(by_type)
+        for column, window in (("start_time", self.depart_between), ("arrive_time", self.arrive_between)):
+            if window is not None:
+                def by_time(trains, rows, column=column, test=_in_window(window)):
+                    minutes = trains.minutes(column)
+                    return [i for i in rows if test(minutes[i])]
+                predicates.append(by_time)
+        if self.max_duration is not None:
+            limit = self.max_duration
+
+            def by_duration(trains, rows):
+                minutes = trains.minutes("duration")
+                return [i for i in rows if minutes[i] is not None and minutes[i] <= limit]
+            predicates.append(by_duration)
+        # 没有指定座位类别时，任意类别满足最少余票即可；min_seats 为 0 时不限余票
+        if self.min_seats > 0:
+            seat_classes = self.seat_classes or tuple(SEAT_CLASSES)
+            min_seats = self.min_seats
+
+            def by_seats(trains, rows):
+                columns = [trains.seat_counts(seat_class) for seat_class in seat_classes]
+                return [i for i in rows if any((column[i] or 0) >= min_seats for column in columns)]
+            predicates.append(by_seats)
+        return predicates
+
+    def _sort_key(self, trains):
+        if self.sort_by == "seats":
+            columns = [trains.seat_counts(seat_class) for seat_class in (self.seat_classes or SEAT_CLASSES)]
+            return lambda i: -max(column[i] or 0 for column in columns)
+        column = {"departure": "start_time", "arrival": "arrive_time", "duration": "duration"}[self.sort_by]
+        minutes = trains.minutes(column)
+        return lambda i: (minutes[i] is None, minutes[i] or 0)
+
+    def apply(self, trains):
+        """返回满足所有条件的行号，按 sort_by 排序（相同时保持原顺序），最多 limit 个。"""
+        rows = list(range(len(trains)))
+        for predicate in self._predicates:
+            rows = predicate(trains, rows)
+            if not rows:
+                return []
+        rows = sorted(rows, key=self._sort_key(trains))
+        return rows[:self.limit] if self.limit else rows
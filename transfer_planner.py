@@ -0,0 +1,252 @@
+# -----------------------------------------------------------------------------------
+# 免责声明：此脚本仅用于学习Python爬虫技术
+# 不得将其用于商业目的或在12306.cn上自动购买真实车票
+# -----------------------------------------------------------------------------------
+#
+# 换乘规划：直达车次无票时，在已缓存的查询结果中寻找一次或两次换乘的行程。
+# 查询缓存 (query_cache) 中的每个结果都被拆成若干"区段"（某车次从一站到另一站，带绝对发车/到达时间和余票），
+# 按 出发站 和 (出发站, 到达站) 建立按发车时间排序的索引。索引只在缓存内容变化时增量更新，
+# 之后每次规划只是在索引上做二分查找和按发车时间倒序的剪枝扫描，不会为候选换乘站发送任何请求。
+# 换乘只在同一车站进行，两段之间至少间隔 TRANSFER_MIN_CONNECTION 分钟，最多等待 TRANSFER_MAX_WAIT 分钟。
+#
+# 用法：
+#   transfer_graph.update()                       # 从查询缓存同步（只解析新增或更新的结果）
+#   journeys = transfer_graph.plan("BJP", "SHH", "2026-10-20", seat_classes=("second",))
+#   print_journeys(journeys, transfer_graph, "2026-10-20")
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple, defaultdict
+from datetime import date
+
+from config import TRANSFER_MIN_CONNECTION, TRANSFER_MAX_WAIT
+from query_cache import query_cache
+from ticket_parser import SEAT_CLASSES, QueryLayoutError, parse_query_response
+from tracing import span
+
+# 一个区段；depart / arrive 为绝对分钟数（公元日序号 × 1440 + 当天分钟），seats 与 SEAT_CLASSES 顺序一致
+Leg = namedtuple("Leg", "train_code train_no train_date from_code to_code depart arrive seats")
+# 一个行程：依次乘坐的区段
+Journey = namedtuple("Journey", "legs depart arrive")
+
+_SEAT_ORDER = tuple(SEAT_CLASSES)
+
+
+def _day_minutes(train_date):
+    return date.fromisoformat(train_date).toordinal() * 1440
+
+
+def legs_from_response(train_date, response_json):
+    """把一个 queryZ 响应拆成区段列表，同时返回响应中的 {电报码: 站名}。"""
+    trains = parse_query_response(response_json)
+    base = _day_minutes(train_date)
+    starts = trains.minutes("start_time")
+    durations = trains.minutes("duration")
+    counts = [trains.seat_counts(seat_class) for seat_class in _SEAT_ORDER]
+    codes, numbers = trains['station_train_code'], trains['train_no']
+    from_codes, to_codes = trains['from_station_code'], trains['to_station_code']
+    legs = []
+    for i in range(len(trains)):
+        if starts[i] is None or durations[i] is None:
+            continue
+        depart = base + starts[i]
+        legs.append(Leg(codes[i], numbers[i], train_date, from_codes[i], to_codes[i], depart, depart + durations[i],
+                        tuple(column[i] for column in counts)))
+    return legs, trains.station_map
+
+
+class _Timetable:
+    """按发车时间排序的区段列表及其发车时间（用于二分查找）。"""
+
+    __slots__ = ("departs", "legs")
+
+    def __init__(self, legs):
+        self.legs = sorted(legs, key=lambda leg: leg.depart)
+        self.departs = [leg.depart for leg in self.legs]
+
+    def between(self, earliest, latest):
+        """发车时间在 [earliest, latest] 内的区段。"""
+        return self.legs[bisect_left(self.departs, earliest):bisect_right(self.departs, latest)]
+
+
+class TransferGraph:
+    """由缓存的查询结果构成的区段图。可以反复 update() 和 plan()，线程安全。"""
+
+    def __init__(self):
+        self._sources = {}  # 缓存键 -> (写入时间, 区段列表)
+        self.station_names = {}
+        self._departures = None  # 出发站 -> _Timetable
+        self._pairs = None  # (出发站, 到达站) -> _Timetable
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(legs) for _, legs in self._sources.values())
+
+    def add_response(self, key, response_json, stored_at=0):
+        """加入（或替换）一个缓存键对应的查询结果；key 为 query_key(...)。"""
+        legs, station_map = legs_from_response(key[0], response_json)
+        with self._lock:
+            self._sources[key] = (stored_at, legs)
+            self.station_names.update(station_map)
+            self._departures = self._pairs = None
+
+    def update(self, cache=query_cache, purpose_codes="ADULT"):
+        """
+        与查询缓存同步：只解析新增或更新过的结果，去掉已过期的结果。
+        返回重新解析的结果数；没有变化时索引保持不变。
+        """
+        with span("transfer.update") as s:
+            fresh = {key: stored_at for key, stored_at in cache.fresh_keys().items() if key[3] == purpose_codes}
+            with self._lock:
+                expired = [key for key in self._sources if key not in fresh]
+                for key in expired:
+                    del self._sources[key]
+                changed = [key for key, stored_at in fresh.items()
+                           if self._sources.get(key, (None,))[0] != stored_at]
+                if expired:
+                    self._departures = self._pairs = None
+            parsed = 0
+            for key in changed:
+                entry = cache.peek(key)
+                if entry is None:
+                    continue
+                result = entry[1]
+                if not (result.get('status') == True and result.get('httpstatus') == 200):
+                    continue
+                try:
+                    self.add_response(key, result, entry[0])
+                except QueryLayoutError as e:
+                    print(f"Warning: skipped a cached result with an unexpected layout: {e}")
+                    continue
+                parsed += 1
+            s.set(results=len(fresh), parsed=parsed, expired=len(expired))
+        return parsed
+
+    def _index(self):
+        """需要时重建索引（调用方持有锁）。同一区段出现在多个查询结果中时只保留最新的一份。"""
+        if self._pairs is not None:
+            return
+        unique = {}
+        for _, legs in sorted(self._sources.values(), key=lambda source: source[0]):
+            for leg in legs:
+                unique[(leg.train_no, leg.from_code, leg.to_code, leg.depart)] = leg
+        by_station = defaultdict(list)
+        by_pair = defaultdict(list)
+        for leg in unique.values():
+            by_station[leg.from_code].append(leg)
+            by_pair[(leg.from_code, leg.to_code)].append(leg)
+        self._departures = {code: _Timetable(legs) for code, legs in by_station.items()}
+        self._pairs = {pair: _Timetable(legs) for pair, legs in by_pair.items()}
+
+    def plan(self, from_code, to_code, train_date, max_transfers=2, min_connection=TRANSFER_MIN_CONNECTION,
+             max_wait=TRANSFER_MAX_WAIT, seat_classes=None, min_seats=1, limit=10):
+        """
+        规划 train_date 当天从 from_code 出发到 to_code 的行程（包括直达），最多 max_transfers 次换乘。
+        每一段都要在 seat_classes（默认任意类别）中有至少 min_seats 张余票。
+        只返回帕累托最优的行程（没有另一个行程出发更晚、到达更早且换乘更少），按到达时间排序，最多 limit 个。
+        """
+        indexes = [_SEAT_ORDER.index(seat_class) for seat_class in (seat_classes or _SEAT_ORDER)]
+
+        def has_seats(leg):
+            return min_seats <= 0 or any((leg.seats[k] or 0) >= min_seats for k in indexes)
+
+        with span("transfer.plan", from_code=from_code, to_code=to_code, train_date=train_date) as s:
+            with self._lock:
+                self._index()
+                departures, pairs = self._departures, self._pairs
+
+            def earliest(timetable, leg, bound):
+                """timetable 中可以从 leg 换乘、到达早于 bound 的区段里最早到达的一个；没有时返回 None。"""
+                best = None
+                if timetable is not None:
+                    for nxt in timetable.between(leg.arrive + min_connection, leg.arrive + max_wait):
+                        if nxt.arrive < bound and nxt.train_no != leg.train_no and has_seats(nxt):
+                            best, bound = nxt, nxt.arrive
+                return best
+
+            day = _day_minutes(train_date)
+            origin = departures.get(from_code)
+            firsts = origin.between(day, day + 1439) if origin else []
+            # 按发车时间从晚到早扫描第一段（类似 CSA 的 profile 扫描）：bound[t] 为已扫描的行程中
+            # 换乘不超过 t 次的最早到达时间，更早出发的行程只有到达得更早才不被支配，
+            # 所以每个第一段在每个换乘次数下只需要保留最早到达的一个后续组合，其余分支直接剪掉。
+            inf = float("inf")
+            bound = [inf] * 3
+            candidates = []
+            for first in reversed(firsts):
+                if not has_seats(first) or first.to_code == from_code:
+                    continue
+                if first.to_code == to_code:
+                    found = [(first,)]
+                else:
+                    found = []
+                    if max_transfers >= 1:
+                        second = earliest(pairs.get((first.to_code, to_code)), first, bound[1])
+                        if second is not None:
+                            found.append((first, second))
+                    if max_transfers >= 2 and first.to_code in departures:
+                        best = None
+                        for second in departures[first.to_code].between(first.arrive + min_connection,
+                                                                        first.arrive + max_wait):
+                            limit_2 = best[-1].arrive if best else bound[2]
+                            if (second.arrive + min_connection >= limit_2 or second.train_no == first.train_no
+                                    or second.to_code in (from_code, to_code, first.from_code)
+                                    or not has_seats(second)):
+                                continue
+                            third = earliest(pairs.get((second.to_code, to_code)), second, limit_2)
+                            if third is not None:
+                                best = (first, second, third)
+                        if best is not None:
+                            found.append(best)
+                for legs in found:
+                    candidates.append(legs)
+                    for t in range(len(legs) - 1, len(bound)):
+                        bound[t] = min(bound[t], legs[-1].arrive)
+            journeys = _pareto(candidates)[:limit]
+            s.set(candidates=len(candidates), journeys=len(journeys))
+        return journeys
+
+
+def _pareto(candidates):
+    """去掉被支配的行程，按 (到达时间, 换乘次数, 出发时间倒序) 排序。"""
+    # 按出发时间从晚到早扫描；best[t] 为已扫描行程中换乘不超过 t 次的最早到达时间
+    ordered = sorted(candidates, key=lambda legs: (-legs[0].depart, legs[-1].arrive, len(legs)))
+    best = [None] * 3
+    kept = []
+    for legs in ordered:
+        transfers = len(legs) - 1
+        arrive = legs[-1].arrive
+        if best[transfers] is not None and best[transfers] <= arrive:
+            continue
+        kept.append(Journey(legs, legs[0].depart, arrive))
+        for t in range(transfers, len(best)):
+            if best[t] is None or arrive < best[t]:
+                best[t] = arrive
+    kept.sort(key=lambda journey: (journey.arrive, len(journey.legs), -journey.depart))
+    return kept
+
+
+def _clock(minutes, base):
+    """把绝对分钟数格式化为 HH:MM，不在 base 当天时加上 +N 天。"""
+    days, minute = divmod(minutes - base, 1440)
+    text = f"{minute // 60:02d}:{minute % 60:02d}"
+    return f"{text}+{days}" if days else text
+
+
+def print_journeys(journeys, graph, train_date):
+    """打印规划结果：每个行程一行总览，每一段一行详情。"""
+    base = _day_minutes(train_date)
+    name = graph.station_names.get
+    for n, journey in enumerate(journeys, 1):
+        total = journey.arrive - journey.depart
+        transfers = len(journey.legs) - 1
+        print(f"{n}. {_clock(journey.depart, base)} -> {_clock(journey.arrive, base)}  "
+              f"({total // 60}h{total % 60:02d}m, {transfers} transfer{'s' if transfers != 1 else ''})")
+        for leg in journey.legs:
+            seats = ", ".join(f"{seat_class} {count}" for seat_class, count in zip(_SEAT_ORDER, leg.seats) if count)
+            print(f"     {leg.train_code:<7} {name(leg.from_code, leg.from_code)} {_clock(leg.depart, base)} -> "
+                  f"{name(leg.to_code, leg.to_code)} {_clock(leg.arrive, base)}  [{seats}]")
+
+
+# 进程内共享的换乘图，多次规划之间复用
+transfer_graph = TransferGraph()